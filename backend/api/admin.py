@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Dict, Any
+import asyncio
+import logging
+from backend.services.supabase_service import SupabaseService
+from backend.services.metrics_service import MetricsService
+from backend.utils.auth import require_role
+
+router = APIRouter(prefix="/admin")
+logger = logging.getLogger("AdminAPI")
+
+supabase = SupabaseService()
+
+@router.get("/metrics")
+async def admin_metrics(days: int = Query(7, ge=1, le=90), user: Dict[str, Any] = Depends(require_role(["admin"]))) -> Dict[str, Any]:
+    metrics = await asyncio.to_thread(supabase.fetch_admin_metrics, days)
+    if metrics is None:
+        raise HTTPException(status_code=503, detail="Analytics temporarily unavailable")
+    metrics["latency"] = MetricsService.mean_http_latency("/analyze")
+    return metrics
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, Request, BackgroundTasks
-from typing import Dict, Any, Optional
-from datetime import datetime
+from fastapi import APIRouter, Depends, Request, BackgroundTasks, HTTPException, Query, Response
+from fastapi.responses import JSONResponse
+from typing import Dict, Any, Optional, List, Tuple
+from datetime import datetime, timezone
+from uuid import UUID
+import base64
+import binascii
 import logging
 import os
-from backend.schemas.request_schema import AnalyzeRequest, ChatRequest
+import re
+from backend.schemas.request_schema import AnalyzeRequest, BatchAnalyzeRequest, ChatRequest
 from backend.schemas.response_schema import AnalyzeResponse
 from backend.schemas.internal_models import RiskLevel
 from backend.core.feature_engineering import preprocess_input
@@ -15,18 +20,20 @@ from backend.services.supabase_service import SupabaseService
 from backend.services.notification_service import NotificationService
 from backend.services.alert_service import AlertService
 from backend.services.audit_logger import AuditLogger
-from backend.utils.auth import Auth, get_user_id
+from backend.services.explanation_store import record_explanation
+from backend.services.retry_policy import clear_deadline
+from backend.services.history_cache import HistoryCache
+from backend.utils.auth import Auth, get_access_token, get_user_id
 from backend.config import settings
 from backend.services.metrics_service import MetricsService
 import time
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from backend.utils.rate_limit import limiter
 
 from backend.services.conversation_service import ConversationService, ChatState
 
 router = APIRouter()
 logger = logging.getLogger("AnalyzeAPI")
-limiter = Limiter(key_func=get_remote_address)
+chat_limit = limiter.shared_limit(settings.RATE_LIMIT_CHAT, scope="chat")
 
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
@@ -38,6 +45,26 @@ audit_logger = AuditLogger()
 notification_service = NotificationService(supabase)
 alert_service = AlertService(supabase)
 conv_service = ConversationService()
+history_cache = HistoryCache(ttl=settings.HISTORY_CACHE_TTL)
+
+# Trend-chart score for each risk label.
+RISK_SCORES = {"LOW": 10, "MEDIUM": 35, "HIGH": 70, "CRITICAL": 95}
+# recorded_at as PostgREST returns it; checked by shape, not parsed, since the fraction may have 1-6 digits.
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d{1,6})?(Z|[+-]\d{2}(:?\d{2})?)?")
+
+def encode_history_cursor(recorded_at: str, row_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{recorded_at}|{row_id}".encode()).decode().rstrip("=")
+
+def decode_history_cursor(cursor: str) -> Tuple[str, str]:
+    """(recorded_at, id) from an `encode_history_cursor` token; ValueError if it is not one."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("cursor is not base64")
+    recorded_at, _, row_id = raw.partition("|")
+    if not _TIMESTAMP.fullmatch(recorded_at):
+        raise ValueError("cursor has no timestamp")
+    return recorded_at, str(UUID(row_id))
 
 try:
     ml_engine = MLEngine()
@@ -54,31 +81,77 @@ if settings.GEMINI_API_KEY:
     except Exception as e:
         logger.error(f"Gemini Engine failed: {e}")
 
-async def async_clinical_augmentation(input_id: str, user_id: str, data: AnalyzeRequest, final_risk: RiskLevel, rule_res: Any, ml_res: Any):
+async def async_clinical_augmentation(input_id: str, user_id: str, data: AnalyzeRequest, final_risk: RiskLevel, rule_res: Any, ml_res: Any, explain: bool = True):
+    # Runs after the response is sent, so it is not bound by the request deadline.
+    clear_deadline()
     explanation = {"reasoning": "Generating..."}
-    if gemini_engine:
+    if gemini_engine and explain:
         try:
             explanation = await asyncio.wait_for(
                 asyncio.to_thread(gemini_engine.explain, data, final_risk, rule_res, ml_res),
                 timeout=20.0 
             )
-            supabase.client.table("engine_results").update({
-                "gemini_explanation": explanation,
-                "analysis_status": "completed"
-            }).eq("input_id", input_id).execute()
+            record_explanation(input_id, explanation)
         except asyncio.TimeoutError:
             logger.warning(f"Gemini Timeout for input {input_id}")
             explanation = {"reasoning": "Clinical explanation timed out."}
+            record_explanation(input_id, explanation, status="timed_out")
         except Exception as e:
             logger.error(f"Async Gemini failed: {e}")
     
     if final_risk in [RiskLevel.HIGH, RiskLevel.CRITICAL]:
-        notification_service.check_and_alert(input_id, user_id, data, final_risk)
-        alert_service.trigger_clinical_alert(input_id, user_id, final_risk)
+        if await alert_service.trigger_clinical_alert(input_id, user_id, final_risk):
+            notification_service.check_and_alert(input_id, user_id, data, final_risk)
+
+async def batch_clinical_augmentation(flagged: List[Tuple[str, Dict[str, Any]]], user_id: str):
+    """
+    Post-response work for /analyze/batch as a single task: every flagged row
+    still raises its alert, but only the BATCH_EXPLAIN_MAX most severe rows get
+    a Gemini explanation and at most BATCH_AUGMENT_CONCURRENCY rows run at once.
+    """
+    flagged = sorted(flagged, key=lambda entry: entry[1]["final_risk"] != RiskLevel.CRITICAL)
+    semaphore = asyncio.Semaphore(settings.BATCH_AUGMENT_CONCURRENCY)
+
+    async def augment(rank: int, input_id: str, item: Dict[str, Any]):
+        explain = rank < settings.BATCH_EXPLAIN_MAX
+        if not explain:
+            record_explanation(input_id, {"reasoning": "Not generated: batch explanation limit reached."}, status="skipped")
+        async with semaphore:
+            await async_clinical_augmentation(input_id, user_id, item["data"], item["final_risk"], item["rule_res"], item["ml_res"], explain=explain)
+
+    outcomes = await asyncio.gather(*(augment(rank, input_id, item) for rank, (input_id, item) in enumerate(flagged)), return_exceptions=True)
+    for (input_id, _), outcome in zip(flagged, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(f"Batch augmentation failed for input {input_id}: {outcome}")
+
+async def publish_worklist_update(user_id: str, final_risk: RiskLevel):
+    """Pushes the patient's new latest risk to the doctor worklist index on every worker (not to WebSocket clients)."""
+    from backend.websocket_manager import manager
+    try:
+        await manager.broadcast({"type": "WORKLIST_UPDATE", "updates": [{
+            "patient_id": user_id,
+            "risk": final_risk.value,
+            "assessed_at": datetime.now(timezone.utc).isoformat()
+        }]})
+    except Exception as e:
+        logger.error(f"Worklist update broadcast failed: {e}")
+
+def describe_fusion(rule_result: Any, ml_result: Any, final_risk: RiskLevel) -> str:
+    if not ml_result:
+        return "Rule Engine Authority (ML Offline)"
+    if final_risk == rule_result.risk_level and final_risk != ml_result.predicted_risk:
+        return "Rule Engine Authority override"
+    if final_risk == ml_result.predicted_risk and final_risk != rule_result.risk_level:
+        return "ML Engine Escalation"
+    return "Aligned"
 
 @router.post("/analyze")
-@limiter.limit("10/minute")
+@limiter.limit(settings.RATE_LIMIT_ANALYZE)
 async def analyze(request: Request, data: AnalyzeRequest, background_tasks: BackgroundTasks, user_id: str = Depends(get_user_id)) -> AnalyzeResponse:
+    return await run_analysis(request, data, background_tasks, user_id)
+
+async def run_analysis(request: Optional[Request], data: AnalyzeRequest, background_tasks: BackgroundTasks, user_id: str) -> AnalyzeResponse:
+    """Runs the engines and persists the result; shared by /analyze and chat finalization."""
     correlation_id = getattr(request.state, "correlation_id", f"anl_{int(time.time())}") if request else f"chat_{int(time.time())}"
     
     r_start = time.time()
@@ -99,14 +172,7 @@ async def analyze(request: Request, data: AnalyzeRequest, background_tasks: Back
     final_risk = fuse_risk(rule_result, ml_result)
     clinical_confidence = calculate_clinical_confidence(rule_result, ml_result)
     
-    fusion_reason = "Aligned"
-    if ml_result:
-        if final_risk == rule_result.risk_level and final_risk != ml_result.predicted_risk:
-            fusion_reason = "Rule Engine Authority override"
-        elif final_risk == ml_result.predicted_risk and final_risk != rule_result.risk_level:
-            fusion_reason = "ML Engine Escalation"
-    elif not ml_result:
-        fusion_reason = "Rule Engine Authority (ML Offline)"
+    fusion_reason = describe_fusion(rule_result, ml_result, final_risk)
     
     ip_address = request.client.host if request and request.client else "internal_bot"
     db_start = time.time()
@@ -123,7 +189,11 @@ async def analyze(request: Request, data: AnalyzeRequest, background_tasks: Back
     )
     MetricsService.record_latency("db", time.time() - db_start)
     
+    audit_logger.log_assessment(rule_result, ml_result, final_risk, user_id=user_id, input_id=input_id, ip=ip_address)
+    history_cache.invalidate(user_id)
+    
     if input_id:
+        await publish_worklist_update(user_id, final_risk)
         background_tasks.add_task(async_clinical_augmentation, input_id, user_id, data, final_risk, rule_result, ml_result)
     else:
         MetricsService.record_error("db", "ATOMIC_SAVE_FAILED")
@@ -161,40 +231,112 @@ async def analyze(request: Request, data: AnalyzeRequest, background_tasks: Back
         certification_disclaimer=disclaimer
     )
 
+def _score_batch(items: List[AnalyzeRequest], correlation_id: str) -> List[Dict[str, Any]]:
+    scored = []
+    for data in items:
+        rule_result = rule_engine.evaluate(data)
+        ml_result = None
+        if ml_engine:
+            try:
+                ml_result = ml_engine.predict(data)
+            except Exception as e:
+                logger.error(f"[{correlation_id}] ML Prediction failed: {e}")
+                MetricsService.record_error("ml", type(e).__name__)
+        final_risk = fuse_risk(rule_result, ml_result)
+        scored.append({
+            "data": data, "rule_res": rule_result, "ml_res": ml_result, "final_risk": final_risk,
+            "fusion_reason": describe_fusion(rule_result, ml_result, final_risk)
+        })
+    return scored
+
+@router.post("/analyze/batch")
+@limiter.limit(settings.RATE_LIMIT_BATCH)
+async def analyze_batch(request: Request, batch: BatchAnalyzeRequest, background_tasks: BackgroundTasks, user_id: str = Depends(get_user_id)):
+    """Scores an upload of readings and persists them with one bulk RPC per chunk."""
+    correlation_id = getattr(request.state, "correlation_id", f"batch_{int(time.time())}")
+    start = time.time()
+    loop = asyncio.get_event_loop()
+    scored = await loop.run_in_executor(executor, _score_batch, batch.items, correlation_id)
+
+    ip_address = request.client.host if request.client else "internal_bot"
+    explanation = {"status": "async_pending", "correlation_id": correlation_id}
+    db_start = time.time()
+    input_ids = await asyncio.to_thread(supabase.save_analysis_bulk, [
+        {"user_id": user_id, "data": item["data"], "rule_res": item["rule_res"], "ml_res": item["ml_res"],
+         "final_risk": item["final_risk"].value, "explanation": explanation,
+         "fusion_reason": item["fusion_reason"], "ip": ip_address}
+        for item in scored
+    ])
+    MetricsService.record_latency("db", time.time() - db_start)
+    history_cache.invalidate(user_id)
+
+    results = []
+    flagged = []
+    for input_id, item in zip(input_ids, scored):
+        if input_id and item["final_risk"] in (RiskLevel.HIGH, RiskLevel.CRITICAL):
+            flagged.append((input_id, item))
+        results.append({"input_id": input_id, "final_risk": item["final_risk"].value})
+    if flagged:
+        background_tasks.add_task(batch_clinical_augmentation, flagged, user_id)
+    saved = [item for input_id, item in zip(input_ids, scored) if input_id]
+    if saved:
+        await publish_worklist_update(user_id, saved[-1]["final_risk"])
+    MetricsService.record_request(200, endpoint="/analyze/batch")
+    return {"results": results, "metadata": {"correlation_id": correlation_id, "count": len(results), "latency": round(time.time() - start, 3)}}
+
 @router.get("/history")
-async def get_history(user_id: str = Depends(get_user_id)):
-    """Fetches real assessment history for the user from Supabase."""
-    try:
-        # Pull from engine_results joined with patient_inputs if possible, or just engine_results
-        # For simplicity, we query engine_results which contains final_risk and created_at
-        res = await asyncio.to_thread(
-            supabase.client.table("engine_results").select(
-                "id, final_risk, created_at, input_id"
-            ).order("created_at", desc=True).limit(20).execute
-        )
-        
-        history = []
-        # Map RiskLevel strings to scores for the trend chart
-        risk_scores = {"LOW": 10, "MEDIUM": 35, "HIGH": 70, "CRITICAL": 95}
-        
-        for item in (res.data or []):
-            risk_label = item.get("final_risk", "LOW").upper()
-            history.append({
-                "date": item.get("created_at", "").split("T")[0],
-                "risk_score": risk_scores.get(risk_label, 10),
+async def get_history(request: Request, before: Optional[str] = None, limit: int = Query(50, ge=1), user_id: str = Depends(get_user_id),
+                      access_token: str = Depends(get_access_token)):
+    """
+    The caller's risk timeline, one keyset page at a time. `before` is the
+    opaque `next_before` cursor of the previous page; items are returned
+    oldest-first within the page for the trend chart.
+    """
+    limit = min(limit, settings.HISTORY_PAGE_MAX)
+    cursor = None
+    if before:
+        try:
+            cursor = decode_history_cursor(before)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid history cursor")
+
+    cache_key = (before, limit)
+    cached = history_cache.get(user_id, cache_key)
+    if cached:
+        etag, body = cached
+    else:
+        rows = await asyncio.to_thread(supabase.fetch_risk_history_page, user_id, limit + 1, cursor, access_token)
+        if rows is None:
+            logger.error(f"History Fetch Failed for {user_id}")
+            return {"items": [], "next_before": None}
+        page = rows[:limit]
+        items = []
+        for item in page:
+            risk_label = (item.get("final_risk") or "LOW").upper()
+            recorded_at = item.get("recorded_at") or ""
+            items.append({
+                "date": recorded_at.split("T")[0],
+                "recorded_at": recorded_at,
+                "input_id": item.get("input_id"),
+                "risk_score": RISK_SCORES.get(risk_label, 10),
                 "risk_label": risk_label
             })
-        return history[::-1] # Chronological order
-    except Exception as e:
-        logger.error(f"History Fetch Failed: {e}")
-        return []
+        next_before = encode_history_cursor(page[-1]["recorded_at"], page[-1]["id"]) if len(rows) > limit else None
+        body = {"items": items[::-1], "next_before": next_before}
+        etag = history_cache.put(user_id, cache_key, body)
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    return JSONResponse(body, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
 
 @router.get("/chat/init")
-async def init_chat(user_id: str = Depends(get_user_id)):
+@chat_limit
+async def init_chat(request: Request, user_id: str = Depends(get_user_id)):
     session = await conv_service.get_or_create_session(user_id)
     return {"session_id": session["id"], "state": session["current_state"], "data": session["collected_data"]}
 
 @router.post("/chat/message")
-async def chat_message(data: ChatRequest, user_id: str = Depends(get_user_id)):
+@chat_limit
+async def chat_message(request: Request, data: ChatRequest, user_id: str = Depends(get_user_id)):
     response, next_state = await conv_service.process_message(user_id, data.session_id, data.message)
     return {"response": response, "next_state": next_state.value}
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Dict, Any, Optional, Literal
+from datetime import datetime, timezone
+import asyncio
+import logging
+from backend.services.supabase_service import SupabaseService
+from backend.services.worklist_index import worklist_index
+from backend.utils.auth import require_role
+from backend.config import settings
+
+router = APIRouter(prefix="/doctor")
+logger = logging.getLogger("DoctorAPI")
+
+supabase = SupabaseService()
+
+@router.get("/patients")
+async def doctor_patients(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    sort: Literal["risk", "alerts", "last_assessed", "name"] = "risk",
+    since: Optional[datetime] = None,
+    user: Dict[str, Any] = Depends(require_role(["doctor", "admin"]))
+) -> Dict[str, Any]:
+    # Taken before the query so a client polling with since=as_of never misses a change.
+    as_of = datetime.now(timezone.utc).isoformat()
+    rows = await asyncio.to_thread(
+        supabase.fetch_doctor_worklist, str(user.get("sub")), limit, offset, sort, since.isoformat() if since else None
+    )
+    if rows is None:
+        raise HTTPException(status_code=503, detail="Worklist temporarily unavailable")
+    total = rows[0]["total_count"] if rows else 0
+    items = [{k: v for k, v in row.items() if k != "total_count"} for row in rows]
+    return {
+        "items": items,
+        "total": total,
+        "next_offset": offset + len(items) if offset + len(items) < total else None,
+        "as_of": as_of
+    }
+
+@router.get("/metrics")
+async def doctor_metrics(days: int = Query(7, ge=1, le=90), user: Dict[str, Any] = Depends(require_role(["doctor", "admin"]))) -> Dict[str, Any]:
+    """Department-wide aggregates for the provider dashboard, from the same rollups as /admin/metrics."""
+    metrics = await asyncio.to_thread(supabase.fetch_admin_metrics, days)
+    if metrics is None:
+        raise HTTPException(status_code=503, detail="Analytics temporarily unavailable")
+    return metrics
+
+@router.get("/worklist")
+async def doctor_worklist(
+    top: int = Query(20, ge=1, le=settings.WORKLIST_TOP_MAX),
+    user: Dict[str, Any] = Depends(require_role(["doctor", "admin"]))
+) -> Dict[str, Any]:
+    """Live triage order from the in-memory index; the DB is only read to seed or re-seed it."""
+    items = await worklist_index.top(str(user.get("sub")), top)
+    if items is None:
+        raise HTTPException(status_code=503, detail="Worklist temporarily unavailable")
+    return {"items": items, "count": len(items)}
@@ -7,18 +7,91 @@ class Config:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
     SUPABASE_URL = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
+    # Public anon key for RLS-scoped clients; SUPABASE_KEY is the service role and bypasses RLS.
+    SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY", "")
+    READ_REPLICA_URL = os.getenv("READ_REPLICA_URL", "")
+    READ_REPLICA_KEY = os.getenv("READ_REPLICA_KEY", "")
+    REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "2.0"))
+    REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5.0"))
+    READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "10.0"))
+    # Hedged reads: opt-in duplicate requests for idempotent reads slower than their p95.
+    HEDGED_READS_ENABLED = os.getenv("HEDGED_READS_ENABLED", "false").lower() == "true"
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+    HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.05"))
+    HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "50"))
+    HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.01"))
+    HEDGE_MAX_WORKERS = int(os.getenv("HEDGE_MAX_WORKERS", "32"))
     ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@hospital.com")
     ENV = os.getenv("ENV", "development")
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_SUCCESS_SAMPLE_RATE = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "1.0"))
+    # Must be set in the environment before the workers start; prometheus_client reads it at import.
+    PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
     SMTP_SERVER = os.getenv("SMTP_SERVER", "")
     SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
     SMTP_USER = os.getenv("SMTP_USER", "")
     SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+    SMTP_FROM = os.getenv("SMTP_FROM", "")
+    SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+    SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", "60.0"))
+    SMTP_MAX_RETRIES = int(os.getenv("SMTP_MAX_RETRIES", "3"))
+    SMTP_DIGEST_WINDOW = float(os.getenv("SMTP_DIGEST_WINDOW", "0"))
     SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+    SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL", "")
+    JWKS_REFRESH_INTERVAL = float(os.getenv("JWKS_REFRESH_INTERVAL", "300"))
+    AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+    ROLE_JWT_CLAIM = os.getenv("ROLE_JWT_CLAIM", "user_role")
+    ROLE_CACHE_TTL = float(os.getenv("ROLE_CACHE_TTL", "60"))
+    ROLE_CACHE_NEGATIVE_TTL = float(os.getenv("ROLE_CACHE_NEGATIVE_TTL", "10"))
+    PROFILE_CHANGE_CHANNEL = os.getenv("PROFILE_CHANGE_CHANNEL", "littleheart_profile_changes")
+
+    RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "sqlite:///tmp/littleheart-ratelimit.db")
+    # Limits are checked on the event loop, so SQLite lock waits must stay short; past it the request is let through.
+    RATE_LIMIT_BUSY_TIMEOUT = float(os.getenv("RATE_LIMIT_BUSY_TIMEOUT", "0.05"))
+    RATE_LIMIT_ANALYZE = os.getenv("RATE_LIMIT_ANALYZE", "10/minute")
+    RATE_LIMIT_BATCH = os.getenv("RATE_LIMIT_BATCH", "2/minute")
+    RATE_LIMIT_CHAT = os.getenv("RATE_LIMIT_CHAT", "60/minute")
     
     POOL_MAX_SIZE = int(os.getenv("POOL_MAX_SIZE", "50"))
     POOL_TIMEOUT = float(os.getenv("POOL_TIMEOUT", "30.0"))
+    HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", "30"))
+    HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", "200"))
+    BULK_SAVE_CHUNK_SIZE = int(os.getenv("BULK_SAVE_CHUNK_SIZE", "500"))
+    # /analyze/batch: Gemini explanations per upload (most severe first) and how many run at once.
+    BATCH_EXPLAIN_MAX = int(os.getenv("BATCH_EXPLAIN_MAX", "20"))
+    BATCH_AUGMENT_CONCURRENCY = int(os.getenv("BATCH_AUGMENT_CONCURRENCY", "4"))
+    SCOPED_CLIENT_POOL_SIZE = int(os.getenv("SCOPED_CLIENT_POOL_SIZE", "256"))
+    WORKLIST_RESEED_INTERVAL = float(os.getenv("WORKLIST_RESEED_INTERVAL", "300"))
+    WORKLIST_SEED_PAGE = int(os.getenv("WORKLIST_SEED_PAGE", "1000"))
+    WORKLIST_TOP_MAX = int(os.getenv("WORKLIST_TOP_MAX", "200"))
     GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "20.0"))
+    DATABASE_URL = os.getenv("DATABASE_URL", "")
+    REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "10.0"))
+    RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+    RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.1"))
+    RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "2.0"))
+
+    ALERT_BUS_BACKEND = os.getenv("ALERT_BUS_BACKEND", "memory")
+    ALERT_BUS_SOCKET = os.getenv("ALERT_BUS_SOCKET", "/tmp/littleheart-alerts.sock")
+    ALERT_BUS_CHANNEL = os.getenv("ALERT_BUS_CHANNEL", "littleheart_alerts")
+    ALERT_REPLAY_BUFFER_SIZE = int(os.getenv("ALERT_REPLAY_BUFFER_SIZE", "500"))
+    WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5.0"))
+    WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "1000"))
+    ALERT_COALESCE_WINDOW = float(os.getenv("ALERT_COALESCE_WINDOW", "600"))
+    ALERT_COALESCE_FLUSH_INTERVAL = float(os.getenv("ALERT_COALESCE_FLUSH_INTERVAL", "15"))
+
+    SINK_SPOOL_DIR = os.getenv("SINK_SPOOL_DIR", "/tmp/littleheart-spool")
+    SINK_MAX_ROWS = int(os.getenv("SINK_MAX_ROWS", "50000"))
+    SINK_MAX_BACKOFF = float(os.getenv("SINK_MAX_BACKOFF", "60.0"))
+    SINK_MAX_RETRY_AGE = float(os.getenv("SINK_MAX_RETRY_AGE", "3600"))
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+    AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "2.0"))
+    EXPLANATION_BATCH_SIZE = int(os.getenv("EXPLANATION_BATCH_SIZE", "100"))
+    EXPLANATION_FLUSH_INTERVAL = float(os.getenv("EXPLANATION_FLUSH_INTERVAL", "2.0"))
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "/tmp/littleheart-archive")
+    ARCHIVE_KEEP_MONTHS = int(os.getenv("ARCHIVE_KEEP_MONTHS", "6"))
+    ARCHIVE_DROP_DETACHED = os.getenv("ARCHIVE_DROP_DETACHED", "false").lower() == "true"
     
     VERSION_MANIFEST = {
         "api": "4.0.0-dev",
@@ -20,6 +20,18 @@ CREATE OR REPLACE TRIGGER on_auth_user_created
   AFTER INSERT ON auth.users
   FOR EACH ROW EXECUTE PROCEDURE public.handle_new_user();
 
+CREATE OR REPLACE FUNCTION public.notify_profile_change()
+RETURNS TRIGGER AS $$
+BEGIN
+  PERFORM pg_notify('littleheart_profile_changes', json_build_object('payload', json_build_object('user_id', COALESCE(NEW.id, OLD.id)))::text);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER on_profile_changed
+  AFTER UPDATE OF role, is_active OR DELETE ON public.user_profiles
+  FOR EACH ROW EXECUTE PROCEDURE public.notify_profile_change();
+
 CREATE TABLE IF NOT EXISTS public.patient_inputs (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
     user_id UUID REFERENCES public.user_profiles(id) NOT NULL,
@@ -63,6 +75,37 @@ CREATE TABLE IF NOT EXISTS public.engine_results (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Gemini explanations arrive after the result row is written. They are kept
+-- here, insert-only, so engine_results is never rewritten; the latest row per
+-- input wins.
+CREATE TABLE IF NOT EXISTS public.assessment_explanations (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    input_id UUID REFERENCES public.patient_inputs(id) ON DELETE CASCADE NOT NULL,
+    explanation JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'completed',
+    model_version TEXT DEFAULT 'gemini-2.0-flash',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE OR REPLACE VIEW public.engine_results_explained WITH (security_invoker = true) AS
+SELECT
+    r.id, r.input_id, r.rule_risk, r.rule_score, r.rule_flags,
+    r.ml_risk, r.ml_probabilities, r.ml_confidence,
+    COALESCE(x.explanation, r.gemini_explanation) AS gemini_explanation,
+    r.final_risk, r.fusion_reason,
+    COALESCE(x.status, r.analysis_status) AS analysis_status,
+    r.rule_engine_version, r.ml_model_version,
+    COALESCE(x.model_version, r.gemini_model_version) AS gemini_model_version,
+    r.created_at
+FROM public.engine_results r
+LEFT JOIN LATERAL (
+    SELECT e.explanation, e.status, e.model_version
+    FROM public.assessment_explanations e
+    WHERE e.input_id = r.input_id
+    ORDER BY e.created_at DESC
+    LIMIT 1
+) x ON TRUE;
+
 CREATE TABLE IF NOT EXISTS public.chat_sessions (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
     user_id UUID REFERENCES public.user_profiles(id) NOT NULL,
@@ -74,14 +117,48 @@ CREATE TABLE IF NOT EXISTS public.chat_sessions (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- audit_logs and chat_messages are range-partitioned by month on created_at.
+-- This creates the `<parent>_pYYYY_MM` partitions (UTC months) from p_from,
+-- default this month, through p_months_ahead months ahead. Partitions get RLS
+-- with no policies, so they can only be read through the parent. The archival
+-- job calls this on every run; it is also safe to schedule with pg_cron.
+CREATE OR REPLACE FUNCTION public.ensure_monthly_partitions(p_parent TEXT, p_from DATE DEFAULT NULL, p_months_ahead INT DEFAULT 3)
+RETURNS INT AS $$
+DECLARE
+  v_month DATE := date_trunc('month', COALESCE(p_from, (NOW() AT TIME ZONE 'UTC')::date))::date;
+  v_last DATE := (date_trunc('month', (NOW() AT TIME ZONE 'UTC')::date) + make_interval(months => p_months_ahead))::date;
+  v_name TEXT;
+  v_created INT := 0;
+BEGIN
+  WHILE v_month <= v_last LOOP
+    v_name := format('%s_p%s', p_parent, to_char(v_month, 'YYYY_MM'));
+    IF to_regclass(format('public.%I', v_name)) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE public.%I PARTITION OF public.%I FOR VALUES FROM (%L) TO (%L)',
+        v_name, p_parent, v_month::timestamp AT TIME ZONE 'UTC', (v_month + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+      );
+      EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', v_name);
+      v_created := v_created + 1;
+    END IF;
+    v_month := (v_month + interval '1 month')::date;
+  END LOOP;
+  RETURN v_created;
+END;
+$$ LANGUAGE plpgsql SET search_path = public;
+
 CREATE TABLE IF NOT EXISTS public.chat_messages (
-    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    id UUID DEFAULT gen_random_uuid() NOT NULL,
     session_id UUID REFERENCES public.chat_sessions(id) ON DELETE CASCADE NOT NULL,
     sender TEXT NOT NULL CHECK (sender IN ('user', 'system')),
     content TEXT NOT NULL,
     metadata JSONB DEFAULT '{}',
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS public.chat_messages_default PARTITION OF public.chat_messages DEFAULT;
+ALTER TABLE public.chat_messages_default ENABLE ROW LEVEL SECURITY;
+SELECT public.ensure_monthly_partitions('chat_messages');
 
 CREATE TABLE IF NOT EXISTS public.alerts (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
@@ -90,46 +167,325 @@ CREATE TABLE IF NOT EXISTS public.alerts (
     alert_type TEXT NOT NULL,
     status TEXT CHECK (status IN ('pending', 'sent', 'acknowledged', 'failed')) DEFAULT 'pending',
     notified_provider_id UUID REFERENCES public.user_profiles(id),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    occurrence_count INT NOT NULL DEFAULT 1,
+    last_seen_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+ALTER TABLE public.alerts ADD COLUMN IF NOT EXISTS occurrence_count INT NOT NULL DEFAULT 1;
+ALTER TABLE public.alerts ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+ALTER TABLE public.alerts ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
+CREATE SEQUENCE IF NOT EXISTS public.alert_event_seq;
+
+-- Alert bus seq: microseconds since the epoch, bumped past the last value
+-- issued, so it shares one increasing space with the API's local fallback.
+CREATE OR REPLACE FUNCTION public.next_alert_event_seq()
+RETURNS BIGINT AS $$
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('public.alert_event_seq'));
+  RETURN setval('public.alert_event_seq', GREATEST(
+    nextval('public.alert_event_seq'),
+    (EXTRACT(EPOCH FROM clock_timestamp()) * 1000000)::BIGINT
+  ));
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.alert_coalesce_window()
+RETURNS INTERVAL AS $$
+  SELECT COALESCE(NULLIF(current_setting('littleheart.alert_coalesce_window', true), ''), '10 minutes')::interval;
+$$ LANGUAGE sql STABLE;
+
+-- Statement-level: one set-based pass per INSERT, however many results it
+-- carries. Hits are grouped per patient and risk. CRITICAL hits merge into the
+-- patient's pending CRITICAL alert inside the window (or open one); HIGH hits
+-- then merge into the newest pending HIGH or CRITICAL alert, including one
+-- opened by this statement, or open a HIGH alert. occurrence_count grows by
+-- the number of merged hits.
 CREATE OR REPLACE FUNCTION public.create_alert_if_high()
 RETURNS TRIGGER AS $$
 BEGIN
-  IF NEW.final_risk IN ('HIGH', 'CRITICAL') THEN
-    INSERT INTO public.alerts (input_id, user_id, alert_type)
-    VALUES (
-        NEW.input_id,
-        (SELECT user_id FROM public.patient_inputs WHERE id = NEW.input_id),
-        'High Risk Detected'
-    );
-  END IF;
-  RETURN NEW;
+  WITH hits AS (
+    SELECT i.user_id, count(*) AS hits, (array_agg(n.input_id ORDER BY n.created_at, n.id))[1] AS first_input
+    FROM new_results n JOIN public.patient_inputs i ON i.id = n.input_id
+    WHERE n.final_risk = 'CRITICAL'
+    GROUP BY i.user_id
+  ),
+  target AS (
+    SELECT h.*, a.id AS alert_id
+    FROM hits h
+    LEFT JOIN LATERAL (
+      SELECT id FROM public.alerts
+      WHERE user_id = h.user_id AND status = 'pending' AND alert_type = 'CRITICAL_RISK_DETECTED'
+        AND created_at > NOW() - public.alert_coalesce_window()
+      ORDER BY created_at DESC LIMIT 1
+    ) a ON TRUE
+  ),
+  merged AS (
+    UPDATE public.alerts al
+    SET occurrence_count = al.occurrence_count + t.hits, last_seen_at = NOW()
+    FROM target t WHERE al.id = t.alert_id
+    RETURNING al.id
+  )
+  INSERT INTO public.alerts (input_id, user_id, alert_type, occurrence_count)
+  SELECT first_input, user_id, 'CRITICAL_RISK_DETECTED', hits FROM target WHERE alert_id IS NULL;
+
+  WITH hits AS (
+    SELECT i.user_id, count(*) AS hits, (array_agg(n.input_id ORDER BY n.created_at, n.id))[1] AS first_input
+    FROM new_results n JOIN public.patient_inputs i ON i.id = n.input_id
+    WHERE n.final_risk = 'HIGH'
+    GROUP BY i.user_id
+  ),
+  target AS (
+    SELECT h.*, a.id AS alert_id
+    FROM hits h
+    LEFT JOIN LATERAL (
+      SELECT id FROM public.alerts
+      WHERE user_id = h.user_id AND status = 'pending'
+        AND alert_type IN ('HIGH_RISK_DETECTED', 'CRITICAL_RISK_DETECTED')
+        AND created_at > NOW() - public.alert_coalesce_window()
+      ORDER BY created_at DESC LIMIT 1
+    ) a ON TRUE
+  ),
+  merged AS (
+    UPDATE public.alerts al
+    SET occurrence_count = al.occurrence_count + t.hits, last_seen_at = NOW()
+    FROM target t WHERE al.id = t.alert_id
+    RETURNING al.id
+  )
+  INSERT INTO public.alerts (input_id, user_id, alert_type, occurrence_count)
+  SELECT first_input, user_id, 'HIGH_RISK_DETECTED', hits FROM target WHERE alert_id IS NULL;
+
+  RETURN NULL;
 END;
 $$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
 
-CREATE OR REPLACE TRIGGER on_high_risk_detected
+DROP TRIGGER IF EXISTS on_high_risk_detected ON public.engine_results;
+CREATE TRIGGER on_high_risk_detected
 AFTER INSERT ON public.engine_results
-FOR EACH ROW
-EXECUTE PROCEDURE public.create_alert_if_high();
+REFERENCING NEW TABLE AS new_results
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.create_alert_if_high();
 
 CREATE OR REPLACE FUNCTION public.insert_risk_history()
 RETURNS TRIGGER AS $$
 BEGIN
   INSERT INTO public.patient_risk_history (user_id, final_risk, input_id)
-  VALUES (
-    (SELECT user_id FROM public.patient_inputs WHERE id = NEW.input_id),
-    NEW.final_risk,
-    NEW.input_id
-  );
-  RETURN NEW;
+  SELECT i.user_id, n.final_risk, n.input_id
+  FROM new_results n JOIN public.patient_inputs i ON i.id = n.input_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS on_result_insert_populate_history ON public.engine_results;
+CREATE TRIGGER on_result_insert_populate_history
+AFTER INSERT ON public.engine_results
+REFERENCING NEW TABLE AS new_results
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.insert_risk_history();
+
+-- Hourly and daily counts for the admin dashboards, kept current by the
+-- statement-level triggers below so reads never scan engine_results or alerts.
+-- refresh_analytics_rollups() rebuilds them from the base tables (backfill and
+-- periodic compaction if counts ever drift).
+CREATE TABLE IF NOT EXISTS public.assessment_rollups (
+    grain TEXT NOT NULL CHECK (grain IN ('hour', 'day')),
+    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    final_risk TEXT NOT NULL,
+    trimester INT NOT NULL,
+    assessments BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (grain, bucket_start, final_risk, trimester)
+);
+
+CREATE TABLE IF NOT EXISTS public.alert_rollups (
+    grain TEXT NOT NULL CHECK (grain IN ('hour', 'day')),
+    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    alert_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    alerts BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (grain, bucket_start, alert_type, status)
+);
+
+-- Rows are upserted in primary-key order so concurrent batches lock buckets
+-- in the same order.
+CREATE OR REPLACE FUNCTION public.rollup_assessments()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO public.assessment_rollups AS t (grain, bucket_start, final_risk, trimester, assessments)
+  SELECT g.grain, date_trunc(g.grain, r.created_at, 'UTC'), r.final_risk, i.trimester, count(*)
+  FROM new_results r
+  JOIN public.patient_inputs i ON i.id = r.input_id
+  CROSS JOIN (VALUES ('hour'), ('day')) AS g(grain)
+  GROUP BY 1, 2, 3, 4
+  ORDER BY 1, 2, 3, 4
+  ON CONFLICT (grain, bucket_start, final_risk, trimester)
+  DO UPDATE SET assessments = t.assessments + EXCLUDED.assessments;
+  RETURN NULL;
 END;
 $$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
 
-CREATE OR REPLACE TRIGGER on_result_insert_populate_history
+DROP TRIGGER IF EXISTS on_result_insert_rollup ON public.engine_results;
+CREATE TRIGGER on_result_insert_rollup
 AFTER INSERT ON public.engine_results
-FOR EACH ROW
-EXECUTE PROCEDURE public.insert_risk_history();
+REFERENCING NEW TABLE AS new_results
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.rollup_assessments();
+
+CREATE OR REPLACE FUNCTION public.rollup_alerts_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO public.alert_rollups AS t (grain, bucket_start, alert_type, status, alerts)
+  SELECT g.grain, date_trunc(g.grain, a.created_at, 'UTC'), a.alert_type, COALESCE(a.status, 'unknown'), count(*)
+  FROM new_alerts a
+  CROSS JOIN (VALUES ('hour'), ('day')) AS g(grain)
+  GROUP BY 1, 2, 3, 4
+  ORDER BY 1, 2, 3, 4
+  ON CONFLICT (grain, bucket_start, alert_type, status)
+  DO UPDATE SET alerts = t.alerts + EXCLUDED.alerts;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Status changes move an alert from one status bucket to another; updates
+-- that leave status alone (occurrence_count bumps) net out to nothing.
+CREATE OR REPLACE FUNCTION public.rollup_alerts_updated()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO public.alert_rollups AS t (grain, bucket_start, alert_type, status, alerts)
+  SELECT g.grain, date_trunc(g.grain, d.created_at, 'UTC'), d.alert_type, d.status, sum(d.delta)
+  FROM (
+    SELECT o.created_at, o.alert_type, COALESCE(o.status, 'unknown') AS status, -1 AS delta
+    FROM old_alerts o JOIN new_alerts n ON n.id = o.id
+    WHERE o.status IS DISTINCT FROM n.status
+    UNION ALL
+    SELECT o.created_at, o.alert_type, COALESCE(n.status, 'unknown'), 1
+    FROM old_alerts o JOIN new_alerts n ON n.id = o.id
+    WHERE o.status IS DISTINCT FROM n.status
+  ) d
+  CROSS JOIN (VALUES ('hour'), ('day')) AS g(grain)
+  GROUP BY 1, 2, 3, 4
+  HAVING sum(d.delta) <> 0
+  ORDER BY 1, 2, 3, 4
+  ON CONFLICT (grain, bucket_start, alert_type, status)
+  DO UPDATE SET alerts = t.alerts + EXCLUDED.alerts;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS on_alert_insert_rollup ON public.alerts;
+CREATE TRIGGER on_alert_insert_rollup
+AFTER INSERT ON public.alerts
+REFERENCING NEW TABLE AS new_alerts
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.rollup_alerts_inserted();
+
+DROP TRIGGER IF EXISTS on_alert_update_rollup ON public.alerts;
+CREATE TRIGGER on_alert_update_rollup
+AFTER UPDATE ON public.alerts
+REFERENCING OLD TABLE AS old_alerts NEW TABLE AS new_alerts
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.rollup_alerts_updated();
+
+CREATE OR REPLACE FUNCTION public.touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at := NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS on_alert_touch ON public.alerts;
+CREATE TRIGGER on_alert_touch
+BEFORE UPDATE ON public.alerts
+FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+
+-- Recomputes every bucket from p_since (whole days, UTC) onwards; NULL
+-- rebuilds everything. The table locks wait out in-flight trigger upserts and
+-- hold back new ones until the rebuild commits.
+CREATE OR REPLACE FUNCTION public.refresh_analytics_rollups(p_since TIMESTAMP WITH TIME ZONE DEFAULT NULL)
+RETURNS VOID AS $$
+DECLARE
+  v_from TIMESTAMP WITH TIME ZONE := COALESCE(date_trunc('day', p_since, 'UTC'), '-infinity');
+BEGIN
+  LOCK TABLE public.assessment_rollups, public.alert_rollups IN EXCLUSIVE MODE;
+
+  DELETE FROM public.assessment_rollups WHERE bucket_start >= v_from;
+  INSERT INTO public.assessment_rollups (grain, bucket_start, final_risk, trimester, assessments)
+  SELECT g.grain, date_trunc(g.grain, r.created_at, 'UTC'), r.final_risk, i.trimester, count(*)
+  FROM public.engine_results r
+  JOIN public.patient_inputs i ON i.id = r.input_id
+  CROSS JOIN (VALUES ('hour'), ('day')) AS g(grain)
+  WHERE r.created_at >= v_from
+  GROUP BY 1, 2, 3, 4;
+
+  DELETE FROM public.alert_rollups WHERE bucket_start >= v_from;
+  INSERT INTO public.alert_rollups (grain, bucket_start, alert_type, status, alerts)
+  SELECT g.grain, date_trunc(g.grain, a.created_at, 'UTC'), a.alert_type, COALESCE(a.status, 'unknown'), count(*)
+  FROM public.alerts a
+  CROSS JOIN (VALUES ('hour'), ('day')) AS g(grain)
+  WHERE a.created_at >= v_from
+  GROUP BY 1, 2, 3, 4;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Everything /admin/metrics renders, in one round trip over the rollups. Every
+-- figure covers the last p_days UTC days (today included), except the hourly
+-- series, which is always the last 24 hours.
+CREATE OR REPLACE FUNCTION public.get_admin_metrics(p_days INT DEFAULT 7)
+RETURNS JSONB AS $$
+  WITH days AS (
+    SELECT (d AT TIME ZONE 'UTC')::date AS day
+    FROM generate_series(date_trunc('day', NOW(), 'UTC') - make_interval(days => p_days - 1), date_trunc('day', NOW(), 'UTC'), interval '1 day') d
+  ),
+  hours AS (
+    SELECT h FROM generate_series(date_trunc('hour', NOW(), 'UTC') - interval '23 hours', date_trunc('hour', NOW(), 'UTC'), interval '1 hour') h
+  ),
+  risk AS (
+    SELECT final_risk, sum(assessments) AS n FROM public.assessment_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC' GROUP BY final_risk
+  ),
+  totals AS (
+    SELECT COALESCE(sum(n), 0) AS total, COALESCE(sum(n) FILTER (WHERE final_risk IN ('HIGH', 'CRITICAL')), 0) AS high FROM risk
+  )
+  SELECT jsonb_build_object(
+    'total', t.total,
+    'high_risk_count', t.high,
+    'high_percent', CASE WHEN t.total > 0 THEN round(t.high * 100.0 / t.total, 1) ELSE 0 END,
+    'total_alerts', (SELECT COALESCE(sum(alerts), 0) FROM public.alert_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC'),
+    'distribution', (
+      SELECT COALESCE(jsonb_agg(jsonb_build_object('risk', l.risk, 'count', COALESCE(r.n, 0)) ORDER BY l.ord), '[]')
+      FROM unnest(ARRAY['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']) WITH ORDINALITY AS l(risk, ord)
+      LEFT JOIN risk r ON r.final_risk = l.risk
+    ),
+    'by_trimester', (
+      SELECT COALESCE(jsonb_agg(jsonb_build_object('trimester', trimester, 'risk', final_risk, 'count', n) ORDER BY trimester, final_risk), '[]')
+      FROM (SELECT trimester, final_risk, sum(assessments) AS n FROM public.assessment_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC' GROUP BY 1, 2) s
+    ),
+    'alerts_by_status', (
+      SELECT COALESCE(jsonb_agg(jsonb_build_object('alert_type', alert_type, 'status', status, 'count', n) ORDER BY alert_type, status), '[]')
+      FROM (SELECT alert_type, status, sum(alerts) AS n FROM public.alert_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC' GROUP BY 1, 2) s
+    ),
+    'weekly_assessments', (
+      SELECT jsonb_agg(jsonb_build_object('day', to_char(d.day, 'Dy'), 'date', d.day, 'count', COALESCE(s.n, 0)) ORDER BY d.day)
+      FROM days d
+      LEFT JOIN (SELECT bucket_start, sum(assessments) AS n FROM public.assessment_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC' GROUP BY 1) s
+        ON (s.bucket_start AT TIME ZONE 'UTC')::date = d.day
+    ),
+    'weekly_alerts', (
+      SELECT jsonb_agg(jsonb_build_object('day', to_char(d.day, 'Dy'), 'date', d.day, 'count', COALESCE(s.n, 0)) ORDER BY d.day)
+      FROM days d
+      LEFT JOIN (SELECT bucket_start, sum(alerts) AS n FROM public.alert_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC' GROUP BY 1) s
+        ON (s.bucket_start AT TIME ZONE 'UTC')::date = d.day
+    ),
+    'hourly_assessments', (
+      SELECT jsonb_agg(jsonb_build_object('hour', h.h, 'count', COALESCE(s.n, 0)) ORDER BY h.h)
+      FROM hours h
+      LEFT JOIN (SELECT bucket_start, sum(assessments) AS n FROM public.assessment_rollups WHERE grain = 'hour' AND bucket_start >= (SELECT min(h) FROM hours) GROUP BY 1) s
+        ON s.bucket_start = h.h
+    )
+  )
+  FROM totals t;
+$$ LANGUAGE sql STABLE SET search_path = public;
 
 CREATE OR REPLACE FUNCTION public.save_clinical_assessment_v3(
     p_user_id UUID,
@@ -192,14 +548,73 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql SECURITY DEFINER;
 
+-- Set-based variant of v3 for bulk uploads and re-scoring jobs: one round trip
+-- and one transaction per batch. Returns the new input IDs in input order.
+CREATE OR REPLACE FUNCTION public.save_clinical_assessments_bulk(p_rows JSONB[])
+RETURNS UUID[] AS $$
+DECLARE
+    v_ids UUID[];
+BEGIN
+    WITH src AS MATERIALIZED (
+        SELECT gen_random_uuid() AS input_id, r.ord, r.payload
+        FROM unnest(p_rows) WITH ORDINALITY AS r(payload, ord)
+    ),
+    inputs AS (
+        INSERT INTO public.patient_inputs (
+            id, user_id, age, trimester, trimester_weeks, blood_pressure,
+            hemoglobin, heart_rate, swelling, headache_severity, vaginal_bleeding,
+            diabetes_history, previous_complications, fever, blurred_vision,
+            reduced_fetal_movement, severe_abdominal_pain, ip_address
+        )
+        SELECT
+            input_id, (payload->>'user_id')::uuid, (payload->>'age')::int, (payload->>'trimester')::int,
+            (payload->>'trimester_weeks')::int, (payload->>'blood_pressure')::int,
+            (payload->>'hemoglobin')::float, (payload->>'heart_rate')::int, (payload->>'swelling')::boolean,
+            (payload->>'headache_severity')::int, (payload->>'vaginal_bleeding')::boolean,
+            (payload->>'diabetes_history')::boolean, (payload->>'previous_complications')::boolean,
+            (payload->>'fever')::boolean, (payload->>'blurred_vision')::boolean,
+            (payload->>'reduced_fetal_movement')::boolean, (payload->>'severe_abdominal_pain')::boolean,
+            payload->>'ip_address'
+        FROM src
+    ),
+    results AS (
+        INSERT INTO public.engine_results (
+            input_id, rule_risk, rule_score, rule_flags,
+            ml_risk, ml_probabilities, ml_confidence,
+            gemini_explanation, final_risk, analysis_status, fusion_reason
+        )
+        SELECT
+            input_id, payload->>'rule_risk', (payload->>'rule_score')::float, payload->'rule_flags',
+            payload->>'ml_risk', payload->'ml_probabilities', (payload->>'ml_confidence')::float,
+            payload->'explanation', payload->>'final_risk',
+            COALESCE(payload->>'analysis_status', 'completed'), payload->>'fusion_reason'
+        FROM src
+    ),
+    audits AS (
+        INSERT INTO public.audit_logs (user_id, action, metadata, ip_address)
+        SELECT (payload->>'user_id')::uuid, 'CLINICAL_ASSESSMENT_BULK',
+               jsonb_build_object('input_id', input_id, 'risk', payload->>'final_risk'), payload->>'ip_address'
+        FROM src
+    )
+    SELECT array_agg(input_id ORDER BY ord) INTO v_ids FROM src;
+
+    RETURN v_ids;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
 CREATE TABLE IF NOT EXISTS public.audit_logs (
-    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    id UUID DEFAULT gen_random_uuid() NOT NULL,
     user_id UUID REFERENCES public.user_profiles(id),
     action TEXT NOT NULL,
     metadata JSONB,
     ip_address TEXT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS public.audit_logs_default PARTITION OF public.audit_logs DEFAULT;
+ALTER TABLE public.audit_logs_default ENABLE ROW LEVEL SECURITY;
+SELECT public.ensure_monthly_partitions('audit_logs');
 
 CREATE TABLE IF NOT EXISTS public.patient_risk_history (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
@@ -230,6 +645,78 @@ CREATE OR REPLACE TRIGGER enforce_doctor_assignment
 BEFORE INSERT OR UPDATE ON public.patient_assignments
 FOR EACH ROW EXECUTE PROCEDURE public.check_doctor_role();
 
+-- One row per patient assigned to p_doctor_id with their latest risk, last
+-- assessment and pending-alert count, via index-backed lateral lookups.
+-- p_since returns only patients whose assignment, history or any alert
+-- changed after that time. The API calls this with the service-role client,
+-- which bypasses RLS, so p_doctor_id must be the authenticated doctor (the
+-- API takes it from the verified token). Called directly over PostgREST it
+-- runs as that user and RLS limits the rows.
+CREATE OR REPLACE FUNCTION public.get_doctor_worklist(
+    p_doctor_id UUID,
+    p_limit INT DEFAULT 50,
+    p_offset INT DEFAULT 0,
+    p_sort TEXT DEFAULT 'risk',
+    p_since TIMESTAMP WITH TIME ZONE DEFAULT NULL
+) RETURNS TABLE (
+    patient_id UUID,
+    full_name TEXT,
+    latest_risk TEXT,
+    last_assessed TIMESTAMP WITH TIME ZONE,
+    pending_alerts BIGINT,
+    last_alert_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    total_count BIGINT
+) AS $$
+  SELECT w.*, count(*) OVER () AS total_count
+  FROM (
+    SELECT
+      a.patient_id, p.full_name, h.final_risk, h.recorded_at,
+      al.pending, al.last_seen_at,
+      GREATEST(a.assigned_at, h.recorded_at, al.last_seen_at, ch.changed_at) AS updated_at
+    FROM public.patient_assignments a
+    JOIN public.user_profiles p ON p.id = a.patient_id
+    LEFT JOIN LATERAL (
+      SELECT r.final_risk, r.recorded_at
+      FROM public.patient_risk_history r
+      WHERE r.user_id = a.patient_id
+      ORDER BY r.recorded_at DESC, r.id DESC
+      LIMIT 1
+    ) h ON TRUE
+    CROSS JOIN LATERAL (
+      SELECT count(*) AS pending, max(x.last_seen_at) AS last_seen_at
+      FROM public.alerts x
+      WHERE x.user_id = a.patient_id AND x.status = 'pending'
+    ) al
+    CROSS JOIN LATERAL (
+      SELECT max(x.updated_at) AS changed_at
+      FROM public.alerts x
+      WHERE x.user_id = a.patient_id
+    ) ch
+    WHERE a.doctor_id = p_doctor_id
+  ) w
+  WHERE p_since IS NULL OR w.updated_at > p_since
+  ORDER BY
+    CASE WHEN p_sort = 'risk' THEN array_position(ARRAY['CRITICAL', 'HIGH', 'MEDIUM', 'LOW'], w.final_risk) END NULLS LAST,
+    CASE WHEN p_sort IN ('risk', 'alerts') THEN w.pending END DESC,
+    CASE WHEN p_sort = 'name' THEN w.full_name END,
+    w.recorded_at DESC NULLS LAST,
+    w.patient_id
+  LIMIT p_limit OFFSET p_offset;
+$$ LANGUAGE sql STABLE SET search_path = public;
+
+-- Replay lag as seen on a read replica (0 on the primary, and 0 when the
+-- replica has replayed everything it received, so an idle primary does not
+-- read as lag). Probed by the API's read router.
+CREATE OR REPLACE FUNCTION public.replication_lag_seconds()
+RETURNS FLOAT AS $$
+  SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+  END::float;
+$$ LANGUAGE sql STABLE;
+
 CREATE TABLE IF NOT EXISTS public.model_drift_logs (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
     model_version TEXT NOT NULL,
@@ -241,6 +728,9 @@ CREATE TABLE IF NOT EXISTS public.model_drift_logs (
 ALTER TABLE public.user_profiles ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.patient_inputs ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.engine_results ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.assessment_explanations ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.assessment_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.alert_rollups ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.alerts ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.audit_logs ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.patient_risk_history ENABLE ROW LEVEL SECURITY;
@@ -249,36 +739,62 @@ ALTER TABLE public.model_drift_logs ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.chat_sessions ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.chat_messages ENABLE ROW LEVEL SECURITY;
 
-DROP POLICY IF EXISTS "Users view own profile" ON public.user_profiles;
-CREATE POLICY "Users view own profile" ON public.user_profiles FOR SELECT USING (auth.uid() = id);
-
 CREATE OR REPLACE FUNCTION public.check_is_admin()
 RETURNS BOOLEAN AS $$
-BEGIN
-  RETURN (SELECT (role = 'admin') FROM public.user_profiles WHERE id = auth.uid());
-END;
-$$ LANGUAGE plpgsql SECURITY DEFINER;
+  SELECT COALESCE((SELECT role = 'admin' FROM public.user_profiles WHERE id = auth.uid()), FALSE);
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.current_user_role()
+RETURNS TEXT AS $$
+  SELECT role FROM public.user_profiles WHERE id = auth.uid();
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Patients assigned to the calling doctor. Used as `user_id IN (SELECT ...)`,
+-- which the planner runs once and probes as a hashed subplan per row.
+CREATE OR REPLACE FUNCTION public.assigned_patient_ids()
+RETURNS SETOF UUID AS $$
+  SELECT patient_id FROM public.patient_assignments WHERE doctor_id = auth.uid();
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Inputs visible through an assignment; reads patient_inputs as definer so the
+-- engine_results policies do not re-enter the patient_inputs policies per row.
+CREATE OR REPLACE FUNCTION public.assigned_input_ids()
+RETURNS SETOF UUID AS $$
+  SELECT i.id FROM public.patient_inputs i
+  JOIN public.patient_assignments pa ON pa.patient_id = i.user_id
+  WHERE pa.doctor_id = auth.uid();
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.own_input_ids()
+RETURNS SETOF UUID AS $$
+  SELECT id FROM public.patient_inputs WHERE user_id = auth.uid();
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Every auth/role helper below is wrapped in a scalar (SELECT ...) so the
+-- planner runs it once as an InitPlan instead of once per row.
+DROP POLICY IF EXISTS "Users view own profile" ON public.user_profiles;
+CREATE POLICY "Users view own profile" ON public.user_profiles FOR SELECT USING ((SELECT auth.uid()) = id);
 
 DROP POLICY IF EXISTS "Admins view all profiles" ON public.user_profiles;
-CREATE POLICY "Admins view all profiles" ON public.user_profiles FOR SELECT USING (public.check_is_admin());
+CREATE POLICY "Admins view all profiles" ON public.user_profiles FOR SELECT USING ((SELECT public.check_is_admin()));
 
 DROP POLICY IF EXISTS "Only admin can update roles" ON public.user_profiles;
-CREATE POLICY "Only admin can update roles" ON public.user_profiles FOR UPDATE USING (public.check_is_admin()) WITH CHECK (public.check_is_admin());
+CREATE POLICY "Only admin can update roles" ON public.user_profiles FOR UPDATE USING ((SELECT public.check_is_admin())) WITH CHECK ((SELECT public.check_is_admin()));
 
 DROP POLICY IF EXISTS "Only admin can deactivate accounts" ON public.user_profiles;
-CREATE POLICY "Only admin can deactivate accounts" ON public.user_profiles FOR UPDATE USING (public.check_is_admin()) WITH CHECK (is_active IS NOT NULL);
+CREATE POLICY "Only admin can deactivate accounts" ON public.user_profiles FOR UPDATE USING ((SELECT public.check_is_admin())) WITH CHECK (is_active IS NOT NULL);
 
 DROP POLICY IF EXISTS "Users cannot update their own role" ON public.user_profiles;
-CREATE POLICY "Users cannot update their own role" ON public.user_profiles FOR UPDATE USING (auth.uid() = id) WITH CHECK (role = (SELECT role FROM public.user_profiles WHERE id = auth.uid() LIMIT 1));
+CREATE POLICY "Users cannot update their own role" ON public.user_profiles FOR UPDATE USING ((SELECT auth.uid()) = id) WITH CHECK (role = (SELECT public.current_user_role()));
 
 DROP POLICY IF EXISTS "Users insert own inputs" ON public.patient_inputs;
-CREATE POLICY "Users insert own inputs" ON public.patient_inputs FOR INSERT WITH CHECK (auth.uid() = user_id);
+CREATE POLICY "Users insert own inputs" ON public.patient_inputs FOR INSERT WITH CHECK ((SELECT auth.uid()) = user_id);
 
 DROP POLICY IF EXISTS "Users view own inputs" ON public.patient_inputs;
-CREATE POLICY "Users view own inputs" ON public.patient_inputs FOR SELECT USING (auth.uid() = user_id);
+CREATE POLICY "Users view own inputs" ON public.patient_inputs FOR SELECT USING ((SELECT auth.uid()) = user_id);
 
 DROP POLICY IF EXISTS "Doctors view assigned patients" ON public.patient_inputs;
-CREATE POLICY "Doctors view assigned patients" ON public.patient_inputs FOR SELECT USING (EXISTS (SELECT 1 FROM public.patient_assignments pa WHERE pa.patient_id = patient_inputs.user_id AND pa.doctor_id = auth.uid()) OR (SELECT role FROM public.user_profiles WHERE id = auth.uid()) = 'admin');
+CREATE POLICY "Doctors view assigned patients" ON public.patient_inputs FOR SELECT USING ((SELECT public.check_is_admin()) OR user_id IN (SELECT public.assigned_patient_ids()));
 
 DROP POLICY IF EXISTS "No updates to patient inputs" ON public.patient_inputs;
 CREATE POLICY "No updates to patient inputs" ON public.patient_inputs FOR UPDATE USING (false);
@@ -287,13 +803,13 @@ DROP POLICY IF EXISTS "No delete patient inputs" ON public.patient_inputs;
 CREATE POLICY "No delete patient inputs" ON public.patient_inputs FOR DELETE USING (false);
 
 DROP POLICY IF EXISTS "Users view own results" ON public.engine_results;
-CREATE POLICY "Users view own results" ON public.engine_results FOR SELECT USING (EXISTS (SELECT 1 FROM public.patient_inputs i WHERE i.id = engine_results.input_id AND i.user_id = auth.uid()));
+CREATE POLICY "Users view own results" ON public.engine_results FOR SELECT USING (input_id IN (SELECT public.own_input_ids()));
 
 DROP POLICY IF EXISTS "Doctors view assigned results" ON public.engine_results;
-CREATE POLICY "Doctors view assigned results" ON public.engine_results FOR SELECT USING (EXISTS (SELECT 1 FROM public.patient_inputs i JOIN public.patient_assignments pa ON pa.patient_id = i.user_id WHERE i.id = engine_results.input_id AND pa.doctor_id = auth.uid()) OR (SELECT role FROM public.user_profiles WHERE id = auth.uid()) = 'admin');
+CREATE POLICY "Doctors view assigned results" ON public.engine_results FOR SELECT USING ((SELECT public.check_is_admin()) OR input_id IN (SELECT public.assigned_input_ids()));
 
 DROP POLICY IF EXISTS "Service role insert results" ON public.engine_results;
-CREATE POLICY "Service role insert results" ON public.engine_results FOR INSERT WITH CHECK (auth.role() = 'service_role');
+CREATE POLICY "Service role insert results" ON public.engine_results FOR INSERT WITH CHECK ((SELECT auth.role()) = 'service_role');
 
 DROP POLICY IF EXISTS "No update engine results" ON public.engine_results;
 CREATE POLICY "No update engine results" ON public.engine_results FOR UPDATE USING (false);
@@ -301,41 +817,65 @@ CREATE POLICY "No update engine results" ON public.engine_results FOR UPDATE USI
 DROP POLICY IF EXISTS "No delete engine results" ON public.engine_results;
 CREATE POLICY "No delete engine results" ON public.engine_results FOR DELETE USING (false);
 
+DROP POLICY IF EXISTS "Users view own explanations" ON public.assessment_explanations;
+CREATE POLICY "Users view own explanations" ON public.assessment_explanations FOR SELECT USING (input_id IN (SELECT public.own_input_ids()));
+
+DROP POLICY IF EXISTS "Doctors view assigned explanations" ON public.assessment_explanations;
+CREATE POLICY "Doctors view assigned explanations" ON public.assessment_explanations FOR SELECT USING ((SELECT public.check_is_admin()) OR input_id IN (SELECT public.assigned_input_ids()));
+
+DROP POLICY IF EXISTS "Service role insert explanations" ON public.assessment_explanations;
+CREATE POLICY "Service role insert explanations" ON public.assessment_explanations FOR INSERT WITH CHECK ((SELECT auth.role()) = 'service_role');
+
+DROP POLICY IF EXISTS "Participants view own assignments" ON public.patient_assignments;
+CREATE POLICY "Participants view own assignments" ON public.patient_assignments FOR SELECT USING ((SELECT auth.uid()) IN (doctor_id, patient_id) OR (SELECT public.check_is_admin()));
+
 DROP POLICY IF EXISTS "Users view own alerts" ON public.alerts;
-CREATE POLICY "Users view own alerts" ON public.alerts FOR SELECT USING (auth.uid() = user_id);
+CREATE POLICY "Users view own alerts" ON public.alerts FOR SELECT USING ((SELECT auth.uid()) = user_id);
 
 DROP POLICY IF EXISTS "Doctors view assigned alerts" ON public.alerts;
-CREATE POLICY "Doctors view assigned alerts" ON public.alerts FOR SELECT USING (EXISTS (SELECT 1 FROM public.patient_assignments pa WHERE pa.patient_id = alerts.user_id AND pa.doctor_id = auth.uid()) OR (SELECT role FROM public.user_profiles WHERE id = auth.uid()) = 'admin');
+CREATE POLICY "Doctors view assigned alerts" ON public.alerts FOR SELECT USING ((SELECT public.check_is_admin()) OR user_id IN (SELECT public.assigned_patient_ids()));
 
 DROP POLICY IF EXISTS "Service role insert alerts" ON public.alerts;
-CREATE POLICY "Service role insert alerts" ON public.alerts FOR INSERT WITH CHECK (auth.role() = 'service_role');
+CREATE POLICY "Service role insert alerts" ON public.alerts FOR INSERT WITH CHECK ((SELECT auth.role()) = 'service_role');
 
 DROP POLICY IF EXISTS "Service role insert audit logs" ON public.audit_logs;
-CREATE POLICY "Service role insert audit logs" ON public.audit_logs FOR INSERT WITH CHECK (auth.role() = 'service_role');
+CREATE POLICY "Service role insert audit logs" ON public.audit_logs FOR INSERT WITH CHECK ((SELECT auth.role()) = 'service_role');
 
 DROP POLICY IF EXISTS "Users view own history" ON public.patient_risk_history;
-CREATE POLICY "Users view own history" ON public.patient_risk_history FOR SELECT USING (auth.uid() = user_id);
+CREATE POLICY "Users view own history" ON public.patient_risk_history FOR SELECT USING ((SELECT auth.uid()) = user_id);
 
 DROP POLICY IF EXISTS "Doctors view assigned history" ON public.patient_risk_history;
-CREATE POLICY "Doctors view assigned history" ON public.patient_risk_history FOR SELECT USING (EXISTS (SELECT 1 FROM public.patient_assignments pa WHERE pa.patient_id = patient_risk_history.user_id AND pa.doctor_id = auth.uid()) OR (SELECT role FROM public.user_profiles WHERE id = auth.uid()) = 'admin');
+CREATE POLICY "Doctors view assigned history" ON public.patient_risk_history FOR SELECT USING ((SELECT public.check_is_admin()) OR user_id IN (SELECT public.assigned_patient_ids()));
 
 DROP POLICY IF EXISTS "Admins view drift" ON public.model_drift_logs;
-CREATE POLICY "Admins view drift" ON public.model_drift_logs FOR SELECT USING ((SELECT role FROM public.user_profiles WHERE id = auth.uid()) = 'admin');
+CREATE POLICY "Admins view drift" ON public.model_drift_logs FOR SELECT USING ((SELECT public.check_is_admin()));
+
+DROP POLICY IF EXISTS "Admins view assessment rollups" ON public.assessment_rollups;
+CREATE POLICY "Admins view assessment rollups" ON public.assessment_rollups FOR SELECT USING ((SELECT public.check_is_admin()));
+
+DROP POLICY IF EXISTS "Admins view alert rollups" ON public.alert_rollups;
+CREATE POLICY "Admins view alert rollups" ON public.alert_rollups FOR SELECT USING ((SELECT public.check_is_admin()));
 
 DROP POLICY IF EXISTS "Users manage own chat sessions" ON public.chat_sessions;
-CREATE POLICY "Users manage own chat sessions" ON public.chat_sessions FOR ALL USING (auth.uid() = user_id);
+CREATE POLICY "Users manage own chat sessions" ON public.chat_sessions FOR ALL USING ((SELECT auth.uid()) = user_id);
 
 DROP POLICY IF EXISTS "Users manage own chat messages" ON public.chat_messages;
-CREATE POLICY "Users manage own chat messages" ON public.chat_messages FOR ALL USING (EXISTS (SELECT 1 FROM public.chat_sessions s WHERE s.id = chat_messages.session_id AND s.user_id = auth.uid()));
+CREATE POLICY "Users manage own chat messages" ON public.chat_messages FOR ALL USING (session_id IN (SELECT s.id FROM public.chat_sessions s WHERE s.user_id = (SELECT auth.uid())));
 
 CREATE INDEX IF NOT EXISTS idx_inputs_user_created ON public.patient_inputs(user_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_results_input ON public.engine_results(input_id);
 CREATE INDEX IF NOT EXISTS idx_results_final_risk_created ON public.engine_results(final_risk, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_results_created ON public.engine_results(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_results_high_risk ON public.engine_results(created_at DESC) WHERE final_risk IN ('HIGH', 'CRITICAL');
-CREATE INDEX IF NOT EXISTS idx_alerts_user ON public.alerts(user_id);
-CREATE INDEX IF NOT EXISTS idx_alerts_status ON public.alerts(status);
+CREATE INDEX IF NOT EXISTS idx_explanations_input_created ON public.assessment_explanations(input_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_alerts_user_status_created ON public.alerts(user_id, status, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_alerts_pending_created ON public.alerts(created_at DESC) INCLUDE (user_id, input_id, alert_type, occurrence_count) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_alerts_pending_user ON public.alerts(user_id, created_at DESC) INCLUDE (alert_type) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_alerts_user_updated ON public.alerts(user_id, updated_at DESC);
 CREATE INDEX IF NOT EXISTS idx_audit_user ON public.audit_logs(user_id);
-CREATE INDEX IF NOT EXISTS idx_history_user ON public.patient_risk_history(user_id);
+CREATE INDEX IF NOT EXISTS idx_audit_created ON public.audit_logs(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_history_user_recorded ON public.patient_risk_history(user_id, recorded_at DESC, id DESC) INCLUDE (final_risk, input_id);
 CREATE INDEX IF NOT EXISTS idx_assignments_doctor ON public.patient_assignments(doctor_id);
 CREATE INDEX IF NOT EXISTS idx_chat_sessions_user ON public.chat_sessions(user_id);
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_open ON public.chat_sessions(user_id, updated_at DESC) WHERE is_completed = FALSE;
 CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON public.chat_messages(session_id, created_at);
\ No newline at end of file
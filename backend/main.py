@@ -3,20 +3,23 @@ setup_logging()
 
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from typing import Optional
 import asyncio
 import logging
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from backend.api.analyze import router as analyze_router
+from backend.api.analyze import router as analyze_router, alert_service
+from backend.api.admin import router as admin_router
+from backend.api.doctor import router as doctor_router
 from backend.middleware.error_handler import register_exception_handlers
-from backend.middleware.logging_middleware import logging_middleware
 from backend.middleware.observability import TracingMiddleware
-from backend.services.metrics_service import metrics_endpoint
+from backend.middleware.metrics_middleware import PrometheusMiddleware
+from backend.services.metrics_service import MetricsService, metrics_endpoint
 from backend.config import settings
 from backend.websocket_manager import manager
+from backend.services.worklist_index import worklist_index
+from backend.utils.auth import Auth, role_cache
+from backend.utils.rate_limit import limiter, rate_limit_exceeded_handler
 
-limiter = Limiter(key_func=get_remote_address)
 ws_logger = logging.getLogger("WebSocketAlerts")
 
 app = FastAPI(
@@ -26,7 +29,7 @@ app = FastAPI(
 )
 
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 register_exception_handlers(app)
 
 app.add_middleware(TracingMiddleware)
@@ -39,21 +42,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.middleware("http")(logging_middleware)
+app.add_middleware(PrometheusMiddleware)
+
+@app.on_event("startup")
+async def start_alert_bus():
+    manager.add_listener(worklist_index.apply_event)
+    await manager.start()
+
+@app.on_event("startup")
+async def start_alert_flush():
+    alert_service.start()
+
+@app.on_event("startup")
+async def prefetch_jwks():
+    await asyncio.to_thread(Auth.start_key_refresh)
+
+@app.on_event("startup")
+async def start_role_invalidation():
+    await role_cache.start()
+
+@app.on_event("shutdown")
+async def stop_alert_bus():
+    await alert_service.stop()
+    await manager.stop()
+
+@app.on_event("shutdown")
+async def stop_jwks_refresh():
+    Auth.stop_key_refresh()
+    await role_cache.stop()
+
+@app.on_event("shutdown")
+async def stop_read_workers():
+    from backend.services.supabase_service import SupabaseService
+    db = SupabaseService()
+    db.read_router.stop()
+    db.hedger.stop()
 
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "version": "4.0.0-hardened", "ws_connections": manager.connection_count}
 
+@app.get("/health/engines")
+def engine_health():
+    return MetricsService.get_health_report()
+
 @app.get("/metrics")
 def get_metrics():
     return metrics_endpoint()
 
 app.include_router(analyze_router)
+app.include_router(admin_router)
+app.include_router(doctor_router)
 
 @app.websocket("/ws/alerts")
-async def websocket_alerts(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_alerts(websocket: WebSocket, since: Optional[int] = None):
+    await manager.connect(websocket, since=since)
     try:
         while True:
             await websocket.receive_text()
@@ -72,16 +115,16 @@ async def websocket_dashboard(websocket: WebSocket):
                 from backend.services.supabase_service import SupabaseService
                 db = SupabaseService()
                 if db.client:
-                    recent = db.client.table("engine_results").select(
+                    recent = await asyncio.to_thread(db.read, "dashboard.recent_results", lambda client: client.table("engine_results").select(
                         "final_risk, created_at"
-                    ).order("created_at", desc=True).limit(20).execute()
-                    alerts = db.client.table("alerts").select(
+                    ).order("created_at", desc=True).limit(20).execute())
+                    alerts = await asyncio.to_thread(db.read, "dashboard.recent_alerts", lambda client: client.table("alerts").select(
                         "id, alert_type, status, created_at, user_id"
-                    ).order("created_at", desc=True).limit(10).execute()
+                    ).order("created_at", desc=True).limit(10).execute())
                     await websocket.send_json({
                         "type": "DASHBOARD_UPDATE",
-                        "recent_results": recent.data if recent.data else [],
-                        "recent_alerts": alerts.data if alerts.data else []
+                        "recent_results": recent.data if recent and recent.data else [],
+                        "recent_alerts": alerts.data if alerts and alerts.data else []
                     })
                 else:
                     await websocket.send_json({"type": "DASHBOARD_UPDATE", "recent_results": [], "recent_alerts": []})
@@ -1,31 +1,30 @@
+import atexit
 import logging
-import time
-from fastapi import Request
+import logging.handlers
+import queue
 from backend.config import settings
 
+_listener = None
+
 def setup_logging():
+    """Routes all records through a QueueHandler so formatting and stdout writes happen on a listener thread."""
+    global _listener
     try:
         from pythonjsonlogger import jsonlogger
         handler = logging.StreamHandler()
-        formatter = jsonlogger.JsonFormatter("%(asctime)s %(name)s %(levelname)s %(message)s")
-        handler.setFormatter(formatter)
-        logging.getLogger().addHandler(handler)
-        logging.getLogger().setLevel(settings.LOG_LEVEL)
-        if logging.getLogger().hasHandlers():
-            logging.getLogger().handlers.clear()
-            logging.getLogger().addHandler(handler)
+        handler.setFormatter(jsonlogger.JsonFormatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
     except ImportError:
-        logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
 
-async def logging_middleware(request: Request, call_next):
-    start_time = time.time()
-    logger = logging.getLogger("Middleware")
-    logger.info(f"Incoming Request: {request.method} {request.url}")
-    try:
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        logger.info(f"Request Completed: {response.status_code} (Time: {process_time:.4f}s)")
-        return response
-    except Exception as e:
-        logger.error(f"Request Failed: {e}")
-        raise e
+    if _listener is not None:
+        _listener.stop()
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(settings.LOG_LEVEL)
@@ -0,0 +1,46 @@
+import time
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+from backend.services.metrics_service import MetricsService
+
+
+class PrometheusMiddleware:
+    """Pure ASGI RED metrics (rate, errors, duration) keyed by route template, not raw path."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    @staticmethod
+    def _route(scope: Scope) -> str:
+        route = scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            MetricsService.record_http(scope["method"], self._route(scope), status, time.perf_counter() - start)
+
+    async def _websocket(self, scope: Scope, receive: Receive, send: Send):
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            await self.app(scope, receive, send)
+            outcome = "closed"
+        finally:
+            MetricsService.record_websocket(self._route(scope), outcome, time.perf_counter() - start)
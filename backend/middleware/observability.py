@@ -1,18 +1,65 @@
 import uuid
+import time
+import random
 import logging
 from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+from backend.config import settings
+from backend.services.retry_policy import set_deadline, reset_deadline
 
 logger = logging.getLogger("LittleHeart.Observability")
 
-class TracingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        correlation_id = request.headers.get("X-Correlation-ID", str(uuid.uuid4()))
-        request.state.correlation_id = correlation_id
-        response = await call_next(request)
-        response.headers["X-Correlation-ID"] = correlation_id
-        return response
+class TracingMiddleware:
+    """
+    Pure ASGI middleware: assigns the correlation ID, echoes it on the response
+    and emits a single timing log line per request. Successful requests are
+    sampled at LOG_SUCCESS_SAMPLE_RATE; 4xx/5xx and failures are always logged.
+    HTTP requests also get a REQUEST_DEADLINE budget that bounds dependency retries.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = None):
+        self.app = app
+        self.sample_rate = settings.LOG_SUCCESS_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        correlation_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-correlation-id":
+                correlation_id = value.decode("latin-1")
+                break
+        correlation_id = correlation_id or str(uuid.uuid4())
+        scope.setdefault("state", {})["correlation_id"] = correlation_id
+
+        if scope["type"] == "websocket":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message)["X-Correlation-ID"] = correlation_id
+            await send(message)
+
+        deadline_token = set_deadline(settings.REQUEST_DEADLINE)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            logger.error("Request Failed: %s %s (%s) [%s]", scope["method"], scope["path"], e, correlation_id)
+            raise
+        finally:
+            reset_deadline(deadline_token)
+        duration = time.perf_counter() - start
+        if status >= 400 or random.random() < self.sample_rate:
+            logger.info("%s %s %s %.4fs [%s]", scope["method"], scope["path"], status, duration, correlation_id)
 
 def get_correlation_id(request: Request) -> str:
     return getattr(request.state, "correlation_id", "N/A")
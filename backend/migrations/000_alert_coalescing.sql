@@ -0,0 +1,13 @@
+-- Alert coalescing columns and window setting. Numbered 000 because 001
+-- (covering index on occurrence_count) and 003 (set-based coalescing trigger)
+-- depend on them; apply it before those on a database created from the
+-- original schema. Idempotent.
+
+ALTER TABLE public.alerts ADD COLUMN IF NOT EXISTS occurrence_count INT NOT NULL DEFAULT 1;
+ALTER TABLE public.alerts ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
+-- Override per database with: ALTER DATABASE ... SET littleheart.alert_coalesce_window = '5 minutes';
+CREATE OR REPLACE FUNCTION public.alert_coalesce_window()
+RETURNS INTERVAL AS $$
+  SELECT COALESCE(NULLIF(current_setting('littleheart.alert_coalesce_window', true), ''), '10 minutes')::interval;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,45 @@
+-- Composite, covering and partial indexes matched to the hot query shapes.
+-- CONCURRENTLY cannot run inside a transaction: apply this file with autocommit
+-- (psql -f, or the Supabase SQL editor one statement at a time).
+
+-- GET /history: WHERE user_id = ? ORDER BY recorded_at DESC, id DESC (keyset),
+-- answered from the index alone.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_history_user_recorded
+    ON public.patient_risk_history (user_id, recorded_at DESC, id DESC)
+    INCLUDE (final_risk, input_id);
+
+-- ConversationService.get_or_create_session: the caller's open session, newest first.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chat_sessions_open
+    ON public.chat_sessions (user_id, updated_at DESC)
+    WHERE is_completed = FALSE;
+
+-- Per-patient alert views filtered by status and sorted by recency.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alerts_user_status_created
+    ON public.alerts (user_id, status, created_at DESC);
+
+-- Dashboard snapshot (fetch_pending_alerts) and the alert-coalescing lookup
+-- in create_alert_if_high only ever touch pending alerts.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alerts_pending_created
+    ON public.alerts (created_at DESC)
+    INCLUDE (user_id, input_id, alert_type, occurrence_count)
+    WHERE status = 'pending';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alerts_pending_user
+    ON public.alerts (user_id, created_at DESC)
+    INCLUDE (alert_type)
+    WHERE status = 'pending';
+
+-- Forensic view: latest audit events.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_created
+    ON public.audit_logs (created_at DESC);
+
+-- Superseded by the leading columns of the indexes above. idx_chat_sessions_user
+-- stays: the open-sessions index is partial and cannot serve FK cascades.
+DROP INDEX CONCURRENTLY IF EXISTS public.idx_history_user;
+DROP INDEX CONCURRENTLY IF EXISTS public.idx_alerts_user;
+DROP INDEX CONCURRENTLY IF EXISTS public.idx_alerts_status;
+
+ANALYZE public.patient_risk_history;
+ANALYZE public.chat_sessions;
+ANALYZE public.alerts;
+ANALYZE public.audit_logs;
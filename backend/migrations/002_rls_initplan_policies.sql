@@ -0,0 +1,119 @@
+-- Rewrites the RLS policies so role and assignment checks run once per
+-- statement. The old policies evaluated a user_profiles subquery and an
+-- EXISTS join on patient_assignments for every candidate row.
+--
+-- Helpers are STABLE SECURITY DEFINER (never inlined, safe from policy
+-- recursion), and every call in a policy is wrapped in (SELECT ...) so it
+-- becomes an InitPlan. Idempotent; safe to re-run.
+
+CREATE OR REPLACE FUNCTION public.check_is_admin()
+RETURNS BOOLEAN AS $$
+  SELECT COALESCE((SELECT role = 'admin' FROM public.user_profiles WHERE id = auth.uid()), FALSE);
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.current_user_role()
+RETURNS TEXT AS $$
+  SELECT role FROM public.user_profiles WHERE id = auth.uid();
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Patients assigned to the calling doctor. Used as `user_id IN (SELECT ...)`,
+-- which the planner runs once and probes as a hashed subplan per row.
+CREATE OR REPLACE FUNCTION public.assigned_patient_ids()
+RETURNS SETOF UUID AS $$
+  SELECT patient_id FROM public.patient_assignments WHERE doctor_id = auth.uid();
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Inputs visible through an assignment; reads patient_inputs as definer so the
+-- engine_results policies do not re-enter the patient_inputs policies per row.
+CREATE OR REPLACE FUNCTION public.assigned_input_ids()
+RETURNS SETOF UUID AS $$
+  SELECT i.id FROM public.patient_inputs i
+  JOIN public.patient_assignments pa ON pa.patient_id = i.user_id
+  WHERE pa.doctor_id = auth.uid();
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.own_input_ids()
+RETURNS SETOF UUID AS $$
+  SELECT id FROM public.patient_inputs WHERE user_id = auth.uid();
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Every auth/role helper below is wrapped in a scalar (SELECT ...) so the
+-- planner runs it once as an InitPlan instead of once per row.
+DROP POLICY IF EXISTS "Users view own profile" ON public.user_profiles;
+CREATE POLICY "Users view own profile" ON public.user_profiles FOR SELECT USING ((SELECT auth.uid()) = id);
+
+DROP POLICY IF EXISTS "Admins view all profiles" ON public.user_profiles;
+CREATE POLICY "Admins view all profiles" ON public.user_profiles FOR SELECT USING ((SELECT public.check_is_admin()));
+
+DROP POLICY IF EXISTS "Only admin can update roles" ON public.user_profiles;
+CREATE POLICY "Only admin can update roles" ON public.user_profiles FOR UPDATE USING ((SELECT public.check_is_admin())) WITH CHECK ((SELECT public.check_is_admin()));
+
+DROP POLICY IF EXISTS "Only admin can deactivate accounts" ON public.user_profiles;
+CREATE POLICY "Only admin can deactivate accounts" ON public.user_profiles FOR UPDATE USING ((SELECT public.check_is_admin())) WITH CHECK (is_active IS NOT NULL);
+
+DROP POLICY IF EXISTS "Users cannot update their own role" ON public.user_profiles;
+CREATE POLICY "Users cannot update their own role" ON public.user_profiles FOR UPDATE USING ((SELECT auth.uid()) = id) WITH CHECK (role = (SELECT public.current_user_role()));
+
+DROP POLICY IF EXISTS "Users insert own inputs" ON public.patient_inputs;
+CREATE POLICY "Users insert own inputs" ON public.patient_inputs FOR INSERT WITH CHECK ((SELECT auth.uid()) = user_id);
+
+DROP POLICY IF EXISTS "Users view own inputs" ON public.patient_inputs;
+CREATE POLICY "Users view own inputs" ON public.patient_inputs FOR SELECT USING ((SELECT auth.uid()) = user_id);
+
+DROP POLICY IF EXISTS "Doctors view assigned patients" ON public.patient_inputs;
+CREATE POLICY "Doctors view assigned patients" ON public.patient_inputs FOR SELECT USING ((SELECT public.check_is_admin()) OR user_id IN (SELECT public.assigned_patient_ids()));
+
+DROP POLICY IF EXISTS "No updates to patient inputs" ON public.patient_inputs;
+CREATE POLICY "No updates to patient inputs" ON public.patient_inputs FOR UPDATE USING (false);
+
+DROP POLICY IF EXISTS "No delete patient inputs" ON public.patient_inputs;
+CREATE POLICY "No delete patient inputs" ON public.patient_inputs FOR DELETE USING (false);
+
+DROP POLICY IF EXISTS "Users view own results" ON public.engine_results;
+CREATE POLICY "Users view own results" ON public.engine_results FOR SELECT USING (input_id IN (SELECT public.own_input_ids()));
+
+DROP POLICY IF EXISTS "Doctors view assigned results" ON public.engine_results;
+CREATE POLICY "Doctors view assigned results" ON public.engine_results FOR SELECT USING ((SELECT public.check_is_admin()) OR input_id IN (SELECT public.assigned_input_ids()));
+
+DROP POLICY IF EXISTS "Service role insert results" ON public.engine_results;
+CREATE POLICY "Service role insert results" ON public.engine_results FOR INSERT WITH CHECK ((SELECT auth.role()) = 'service_role');
+
+DROP POLICY IF EXISTS "No update engine results" ON public.engine_results;
+CREATE POLICY "No update engine results" ON public.engine_results FOR UPDATE USING (false);
+
+DROP POLICY IF EXISTS "No delete engine results" ON public.engine_results;
+CREATE POLICY "No delete engine results" ON public.engine_results FOR DELETE USING (false);
+
+DROP POLICY IF EXISTS "Participants view own assignments" ON public.patient_assignments;
+CREATE POLICY "Participants view own assignments" ON public.patient_assignments FOR SELECT USING ((SELECT auth.uid()) IN (doctor_id, patient_id) OR (SELECT public.check_is_admin()));
+
+DROP POLICY IF EXISTS "Users view own alerts" ON public.alerts;
+CREATE POLICY "Users view own alerts" ON public.alerts FOR SELECT USING ((SELECT auth.uid()) = user_id);
+
+DROP POLICY IF EXISTS "Doctors view assigned alerts" ON public.alerts;
+CREATE POLICY "Doctors view assigned alerts" ON public.alerts FOR SELECT USING ((SELECT public.check_is_admin()) OR user_id IN (SELECT public.assigned_patient_ids()));
+
+DROP POLICY IF EXISTS "Service role insert alerts" ON public.alerts;
+CREATE POLICY "Service role insert alerts" ON public.alerts FOR INSERT WITH CHECK ((SELECT auth.role()) = 'service_role');
+
+DROP POLICY IF EXISTS "Service role insert audit logs" ON public.audit_logs;
+CREATE POLICY "Service role insert audit logs" ON public.audit_logs FOR INSERT WITH CHECK ((SELECT auth.role()) = 'service_role');
+
+DROP POLICY IF EXISTS "Users view own history" ON public.patient_risk_history;
+CREATE POLICY "Users view own history" ON public.patient_risk_history FOR SELECT USING ((SELECT auth.uid()) = user_id);
+
+DROP POLICY IF EXISTS "Doctors view assigned history" ON public.patient_risk_history;
+CREATE POLICY "Doctors view assigned history" ON public.patient_risk_history FOR SELECT USING ((SELECT public.check_is_admin()) OR user_id IN (SELECT public.assigned_patient_ids()));
+
+DROP POLICY IF EXISTS "Admins view drift" ON public.model_drift_logs;
+CREATE POLICY "Admins view drift" ON public.model_drift_logs FOR SELECT USING ((SELECT public.check_is_admin()));
+
+DROP POLICY IF EXISTS "Users manage own chat sessions" ON public.chat_sessions;
+CREATE POLICY "Users manage own chat sessions" ON public.chat_sessions FOR ALL USING ((SELECT auth.uid()) = user_id);
+
+DROP POLICY IF EXISTS "Users manage own chat messages" ON public.chat_messages;
+CREATE POLICY "Users manage own chat messages" ON public.chat_messages FOR ALL USING (session_id IN (SELECT s.id FROM public.chat_sessions s WHERE s.user_id = (SELECT auth.uid())));
+
+-- With the role check no longer skewing row estimates, admin "latest results"
+-- reads want a plain recency index rather than scanning the table.
+CREATE INDEX IF NOT EXISTS idx_results_created ON public.engine_results(created_at DESC);
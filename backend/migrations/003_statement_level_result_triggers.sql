@@ -0,0 +1,97 @@
+-- Converts the engine_results AFTER INSERT triggers from FOR EACH ROW to
+-- FOR EACH STATEMENT with a transition table, so a bulk insert runs one
+-- INSERT ... SELECT ... JOIN per trigger instead of a patient_inputs lookup and
+-- a single-row insert per result. Alert coalescing still applies, grouped per
+-- patient within each statement.
+
+BEGIN;
+
+-- Statement-level: one set-based pass per INSERT, however many results it
+-- carries. Hits are grouped per patient and risk. CRITICAL hits merge into the
+-- patient's pending CRITICAL alert inside the window (or open one); HIGH hits
+-- then merge into the newest pending HIGH or CRITICAL alert, including one
+-- opened by this statement, or open a HIGH alert. occurrence_count grows by
+-- the number of merged hits.
+CREATE OR REPLACE FUNCTION public.create_alert_if_high()
+RETURNS TRIGGER AS $$
+BEGIN
+  WITH hits AS (
+    SELECT i.user_id, count(*) AS hits, (array_agg(n.input_id ORDER BY n.created_at, n.id))[1] AS first_input
+    FROM new_results n JOIN public.patient_inputs i ON i.id = n.input_id
+    WHERE n.final_risk = 'CRITICAL'
+    GROUP BY i.user_id
+  ),
+  target AS (
+    SELECT h.*, a.id AS alert_id
+    FROM hits h
+    LEFT JOIN LATERAL (
+      SELECT id FROM public.alerts
+      WHERE user_id = h.user_id AND status = 'pending' AND alert_type = 'CRITICAL_RISK_DETECTED'
+        AND created_at > NOW() - public.alert_coalesce_window()
+      ORDER BY created_at DESC LIMIT 1
+    ) a ON TRUE
+  ),
+  merged AS (
+    UPDATE public.alerts al
+    SET occurrence_count = al.occurrence_count + t.hits, last_seen_at = NOW()
+    FROM target t WHERE al.id = t.alert_id
+    RETURNING al.id
+  )
+  INSERT INTO public.alerts (input_id, user_id, alert_type, occurrence_count)
+  SELECT first_input, user_id, 'CRITICAL_RISK_DETECTED', hits FROM target WHERE alert_id IS NULL;
+
+  WITH hits AS (
+    SELECT i.user_id, count(*) AS hits, (array_agg(n.input_id ORDER BY n.created_at, n.id))[1] AS first_input
+    FROM new_results n JOIN public.patient_inputs i ON i.id = n.input_id
+    WHERE n.final_risk = 'HIGH'
+    GROUP BY i.user_id
+  ),
+  target AS (
+    SELECT h.*, a.id AS alert_id
+    FROM hits h
+    LEFT JOIN LATERAL (
+      SELECT id FROM public.alerts
+      WHERE user_id = h.user_id AND status = 'pending'
+        AND alert_type IN ('HIGH_RISK_DETECTED', 'CRITICAL_RISK_DETECTED')
+        AND created_at > NOW() - public.alert_coalesce_window()
+      ORDER BY created_at DESC LIMIT 1
+    ) a ON TRUE
+  ),
+  merged AS (
+    UPDATE public.alerts al
+    SET occurrence_count = al.occurrence_count + t.hits, last_seen_at = NOW()
+    FROM target t WHERE al.id = t.alert_id
+    RETURNING al.id
+  )
+  INSERT INTO public.alerts (input_id, user_id, alert_type, occurrence_count)
+  SELECT first_input, user_id, 'HIGH_RISK_DETECTED', hits FROM target WHERE alert_id IS NULL;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS on_high_risk_detected ON public.engine_results;
+CREATE TRIGGER on_high_risk_detected
+AFTER INSERT ON public.engine_results
+REFERENCING NEW TABLE AS new_results
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.create_alert_if_high();
+
+CREATE OR REPLACE FUNCTION public.insert_risk_history()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO public.patient_risk_history (user_id, final_risk, input_id)
+  SELECT i.user_id, n.final_risk, n.input_id
+  FROM new_results n JOIN public.patient_inputs i ON i.id = n.input_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS on_result_insert_populate_history ON public.engine_results;
+CREATE TRIGGER on_result_insert_populate_history
+AFTER INSERT ON public.engine_results
+REFERENCING NEW TABLE AS new_results
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.insert_risk_history();
+
+COMMIT;
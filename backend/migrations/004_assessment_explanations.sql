@@ -0,0 +1,47 @@
+-- Moves late-arriving Gemini explanations out of engine_results into an
+-- insert-only table, so the analysis pipeline no longer UPDATEs the widest
+-- and busiest row (which the "No update engine results" policy forbids).
+-- Readers use engine_results_explained, which overlays the latest
+-- explanation; explanations already stored on engine_results still show
+-- through it. Idempotent; safe to re-run.
+
+CREATE TABLE IF NOT EXISTS public.assessment_explanations (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    input_id UUID REFERENCES public.patient_inputs(id) ON DELETE CASCADE NOT NULL,
+    explanation JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'completed',
+    model_version TEXT DEFAULT 'gemini-2.0-flash',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE OR REPLACE VIEW public.engine_results_explained WITH (security_invoker = true) AS
+SELECT
+    r.id, r.input_id, r.rule_risk, r.rule_score, r.rule_flags,
+    r.ml_risk, r.ml_probabilities, r.ml_confidence,
+    COALESCE(x.explanation, r.gemini_explanation) AS gemini_explanation,
+    r.final_risk, r.fusion_reason,
+    COALESCE(x.status, r.analysis_status) AS analysis_status,
+    r.rule_engine_version, r.ml_model_version,
+    COALESCE(x.model_version, r.gemini_model_version) AS gemini_model_version,
+    r.created_at
+FROM public.engine_results r
+LEFT JOIN LATERAL (
+    SELECT e.explanation, e.status, e.model_version
+    FROM public.assessment_explanations e
+    WHERE e.input_id = r.input_id
+    ORDER BY e.created_at DESC
+    LIMIT 1
+) x ON TRUE;
+
+ALTER TABLE public.assessment_explanations ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users view own explanations" ON public.assessment_explanations;
+CREATE POLICY "Users view own explanations" ON public.assessment_explanations FOR SELECT USING (input_id IN (SELECT public.own_input_ids()));
+
+DROP POLICY IF EXISTS "Doctors view assigned explanations" ON public.assessment_explanations;
+CREATE POLICY "Doctors view assigned explanations" ON public.assessment_explanations FOR SELECT USING ((SELECT public.check_is_admin()) OR input_id IN (SELECT public.assigned_input_ids()));
+
+DROP POLICY IF EXISTS "Service role insert explanations" ON public.assessment_explanations;
+CREATE POLICY "Service role insert explanations" ON public.assessment_explanations FOR INSERT WITH CHECK ((SELECT auth.role()) = 'service_role');
+
+CREATE INDEX IF NOT EXISTS idx_explanations_input_created ON public.assessment_explanations(input_id, created_at DESC);
@@ -0,0 +1,207 @@
+-- Adds hourly/daily rollups of assessments (by final risk and trimester) and
+-- alerts (by type and status) for the admin dashboards, the triggers that
+-- keep them current, and get_admin_metrics() which /admin/metrics serves.
+-- Ends with a full backfill; re-run refresh_analytics_rollups(since) from a
+-- scheduled job to compact or repair recent buckets. Idempotent.
+
+BEGIN;
+
+-- Hourly and daily counts for the admin dashboards, kept current by the
+-- statement-level triggers below so reads never scan engine_results or alerts.
+-- refresh_analytics_rollups() rebuilds them from the base tables (backfill and
+-- periodic compaction if counts ever drift).
+CREATE TABLE IF NOT EXISTS public.assessment_rollups (
+    grain TEXT NOT NULL CHECK (grain IN ('hour', 'day')),
+    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    final_risk TEXT NOT NULL,
+    trimester INT NOT NULL,
+    assessments BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (grain, bucket_start, final_risk, trimester)
+);
+
+CREATE TABLE IF NOT EXISTS public.alert_rollups (
+    grain TEXT NOT NULL CHECK (grain IN ('hour', 'day')),
+    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    alert_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    alerts BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (grain, bucket_start, alert_type, status)
+);
+
+-- Rows are upserted in primary-key order so concurrent batches lock buckets
+-- in the same order.
+CREATE OR REPLACE FUNCTION public.rollup_assessments()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO public.assessment_rollups AS t (grain, bucket_start, final_risk, trimester, assessments)
+  SELECT g.grain, date_trunc(g.grain, r.created_at, 'UTC'), r.final_risk, i.trimester, count(*)
+  FROM new_results r
+  JOIN public.patient_inputs i ON i.id = r.input_id
+  CROSS JOIN (VALUES ('hour'), ('day')) AS g(grain)
+  GROUP BY 1, 2, 3, 4
+  ORDER BY 1, 2, 3, 4
+  ON CONFLICT (grain, bucket_start, final_risk, trimester)
+  DO UPDATE SET assessments = t.assessments + EXCLUDED.assessments;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS on_result_insert_rollup ON public.engine_results;
+CREATE TRIGGER on_result_insert_rollup
+AFTER INSERT ON public.engine_results
+REFERENCING NEW TABLE AS new_results
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.rollup_assessments();
+
+CREATE OR REPLACE FUNCTION public.rollup_alerts_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO public.alert_rollups AS t (grain, bucket_start, alert_type, status, alerts)
+  SELECT g.grain, date_trunc(g.grain, a.created_at, 'UTC'), a.alert_type, COALESCE(a.status, 'unknown'), count(*)
+  FROM new_alerts a
+  CROSS JOIN (VALUES ('hour'), ('day')) AS g(grain)
+  GROUP BY 1, 2, 3, 4
+  ORDER BY 1, 2, 3, 4
+  ON CONFLICT (grain, bucket_start, alert_type, status)
+  DO UPDATE SET alerts = t.alerts + EXCLUDED.alerts;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Status changes move an alert from one status bucket to another; updates
+-- that leave status alone (occurrence_count bumps) net out to nothing.
+CREATE OR REPLACE FUNCTION public.rollup_alerts_updated()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO public.alert_rollups AS t (grain, bucket_start, alert_type, status, alerts)
+  SELECT g.grain, date_trunc(g.grain, d.created_at, 'UTC'), d.alert_type, d.status, sum(d.delta)
+  FROM (
+    SELECT o.created_at, o.alert_type, COALESCE(o.status, 'unknown') AS status, -1 AS delta
+    FROM old_alerts o JOIN new_alerts n ON n.id = o.id
+    WHERE o.status IS DISTINCT FROM n.status
+    UNION ALL
+    SELECT o.created_at, o.alert_type, COALESCE(n.status, 'unknown'), 1
+    FROM old_alerts o JOIN new_alerts n ON n.id = o.id
+    WHERE o.status IS DISTINCT FROM n.status
+  ) d
+  CROSS JOIN (VALUES ('hour'), ('day')) AS g(grain)
+  GROUP BY 1, 2, 3, 4
+  HAVING sum(d.delta) <> 0
+  ORDER BY 1, 2, 3, 4
+  ON CONFLICT (grain, bucket_start, alert_type, status)
+  DO UPDATE SET alerts = t.alerts + EXCLUDED.alerts;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS on_alert_insert_rollup ON public.alerts;
+CREATE TRIGGER on_alert_insert_rollup
+AFTER INSERT ON public.alerts
+REFERENCING NEW TABLE AS new_alerts
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.rollup_alerts_inserted();
+
+DROP TRIGGER IF EXISTS on_alert_update_rollup ON public.alerts;
+CREATE TRIGGER on_alert_update_rollup
+AFTER UPDATE ON public.alerts
+REFERENCING OLD TABLE AS old_alerts NEW TABLE AS new_alerts
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.rollup_alerts_updated();
+
+-- Recomputes every bucket from p_since (whole days, UTC) onwards; NULL
+-- rebuilds everything. The table locks wait out in-flight trigger upserts and
+-- hold back new ones until the rebuild commits.
+CREATE OR REPLACE FUNCTION public.refresh_analytics_rollups(p_since TIMESTAMP WITH TIME ZONE DEFAULT NULL)
+RETURNS VOID AS $$
+DECLARE
+  v_from TIMESTAMP WITH TIME ZONE := COALESCE(date_trunc('day', p_since, 'UTC'), '-infinity');
+BEGIN
+  LOCK TABLE public.assessment_rollups, public.alert_rollups IN EXCLUSIVE MODE;
+
+  DELETE FROM public.assessment_rollups WHERE bucket_start >= v_from;
+  INSERT INTO public.assessment_rollups (grain, bucket_start, final_risk, trimester, assessments)
+  SELECT g.grain, date_trunc(g.grain, r.created_at, 'UTC'), r.final_risk, i.trimester, count(*)
+  FROM public.engine_results r
+  JOIN public.patient_inputs i ON i.id = r.input_id
+  CROSS JOIN (VALUES ('hour'), ('day')) AS g(grain)
+  WHERE r.created_at >= v_from
+  GROUP BY 1, 2, 3, 4;
+
+  DELETE FROM public.alert_rollups WHERE bucket_start >= v_from;
+  INSERT INTO public.alert_rollups (grain, bucket_start, alert_type, status, alerts)
+  SELECT g.grain, date_trunc(g.grain, a.created_at, 'UTC'), a.alert_type, COALESCE(a.status, 'unknown'), count(*)
+  FROM public.alerts a
+  CROSS JOIN (VALUES ('hour'), ('day')) AS g(grain)
+  WHERE a.created_at >= v_from
+  GROUP BY 1, 2, 3, 4;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Everything /admin/metrics renders, in one round trip over the rollups.
+CREATE OR REPLACE FUNCTION public.get_admin_metrics(p_days INT DEFAULT 7)
+RETURNS JSONB AS $$
+  WITH days AS (
+    SELECT (d AT TIME ZONE 'UTC')::date AS day
+    FROM generate_series(date_trunc('day', NOW(), 'UTC') - make_interval(days => p_days - 1), date_trunc('day', NOW(), 'UTC'), interval '1 day') d
+  ),
+  hours AS (
+    SELECT h FROM generate_series(date_trunc('hour', NOW(), 'UTC') - interval '23 hours', date_trunc('hour', NOW(), 'UTC'), interval '1 hour') h
+  ),
+  risk AS (
+    SELECT final_risk, sum(assessments) AS n FROM public.assessment_rollups WHERE grain = 'day' GROUP BY final_risk
+  ),
+  totals AS (
+    SELECT COALESCE(sum(n), 0) AS total, COALESCE(sum(n) FILTER (WHERE final_risk IN ('HIGH', 'CRITICAL')), 0) AS high FROM risk
+  )
+  SELECT jsonb_build_object(
+    'total', t.total,
+    'high_risk_count', t.high,
+    'high_percent', CASE WHEN t.total > 0 THEN round(t.high * 100.0 / t.total, 1) ELSE 0 END,
+    'total_alerts', (SELECT COALESCE(sum(alerts), 0) FROM public.alert_rollups WHERE grain = 'day'),
+    'distribution', (
+      SELECT COALESCE(jsonb_agg(jsonb_build_object('risk', l.risk, 'count', COALESCE(r.n, 0)) ORDER BY l.ord), '[]')
+      FROM unnest(ARRAY['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']) WITH ORDINALITY AS l(risk, ord)
+      LEFT JOIN risk r ON r.final_risk = l.risk
+    ),
+    'by_trimester', (
+      SELECT COALESCE(jsonb_agg(jsonb_build_object('trimester', trimester, 'risk', final_risk, 'count', n) ORDER BY trimester, final_risk), '[]')
+      FROM (SELECT trimester, final_risk, sum(assessments) AS n FROM public.assessment_rollups WHERE grain = 'day' GROUP BY 1, 2) s
+    ),
+    'alerts_by_status', (
+      SELECT COALESCE(jsonb_agg(jsonb_build_object('alert_type', alert_type, 'status', status, 'count', n) ORDER BY alert_type, status), '[]')
+      FROM (SELECT alert_type, status, sum(alerts) AS n FROM public.alert_rollups WHERE grain = 'day' GROUP BY 1, 2) s
+    ),
+    'weekly_assessments', (
+      SELECT jsonb_agg(jsonb_build_object('day', to_char(d.day, 'Dy'), 'date', d.day, 'count', COALESCE(s.n, 0)) ORDER BY d.day)
+      FROM days d
+      LEFT JOIN (SELECT bucket_start, sum(assessments) AS n FROM public.assessment_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC' GROUP BY 1) s
+        ON (s.bucket_start AT TIME ZONE 'UTC')::date = d.day
+    ),
+    'weekly_alerts', (
+      SELECT jsonb_agg(jsonb_build_object('day', to_char(d.day, 'Dy'), 'date', d.day, 'count', COALESCE(s.n, 0)) ORDER BY d.day)
+      FROM days d
+      LEFT JOIN (SELECT bucket_start, sum(alerts) AS n FROM public.alert_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC' GROUP BY 1) s
+        ON (s.bucket_start AT TIME ZONE 'UTC')::date = d.day
+    ),
+    'hourly_assessments', (
+      SELECT jsonb_agg(jsonb_build_object('hour', h.h, 'count', COALESCE(s.n, 0)) ORDER BY h.h)
+      FROM hours h
+      LEFT JOIN (SELECT bucket_start, sum(assessments) AS n FROM public.assessment_rollups WHERE grain = 'hour' AND bucket_start >= (SELECT min(h) FROM hours) GROUP BY 1) s
+        ON s.bucket_start = h.h
+    )
+  )
+  FROM totals t;
+$$ LANGUAGE sql STABLE SET search_path = public;
+
+ALTER TABLE public.assessment_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.alert_rollups ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Admins view assessment rollups" ON public.assessment_rollups;
+CREATE POLICY "Admins view assessment rollups" ON public.assessment_rollups FOR SELECT USING ((SELECT public.check_is_admin()));
+
+DROP POLICY IF EXISTS "Admins view alert rollups" ON public.alert_rollups;
+CREATE POLICY "Admins view alert rollups" ON public.alert_rollups FOR SELECT USING ((SELECT public.check_is_admin()));
+
+SELECT public.refresh_analytics_rollups();
+
+COMMIT;
@@ -0,0 +1,94 @@
+-- Converts audit_logs and chat_messages to monthly range partitions on
+-- created_at so old months can be archived and detached (see
+-- backend/services/partition_archiver.py). Each table is renamed, recreated as
+-- a partitioned table covering every month it holds, copied and dropped, all
+-- in one transaction; run it in a quiet window on large installs. Tables that
+-- are already partitioned are left alone.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION public.ensure_monthly_partitions(p_parent TEXT, p_from DATE DEFAULT NULL, p_months_ahead INT DEFAULT 3)
+RETURNS INT AS $$
+DECLARE
+  v_month DATE := date_trunc('month', COALESCE(p_from, (NOW() AT TIME ZONE 'UTC')::date))::date;
+  v_last DATE := (date_trunc('month', (NOW() AT TIME ZONE 'UTC')::date) + make_interval(months => p_months_ahead))::date;
+  v_name TEXT;
+  v_created INT := 0;
+BEGIN
+  WHILE v_month <= v_last LOOP
+    v_name := format('%s_p%s', p_parent, to_char(v_month, 'YYYY_MM'));
+    IF to_regclass(format('public.%I', v_name)) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE public.%I PARTITION OF public.%I FOR VALUES FROM (%L) TO (%L)',
+        v_name, p_parent, v_month::timestamp AT TIME ZONE 'UTC', (v_month + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+      );
+      EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', v_name);
+      v_created := v_created + 1;
+    END IF;
+    v_month := (v_month + interval '1 month')::date;
+  END LOOP;
+  RETURN v_created;
+END;
+$$ LANGUAGE plpgsql SET search_path = public;
+
+DO $$
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = 'public.audit_logs'::regclass) = 'r' THEN
+    LOCK TABLE public.audit_logs IN ACCESS EXCLUSIVE MODE;
+    ALTER TABLE public.audit_logs RENAME TO audit_logs_unpartitioned;
+    DROP INDEX IF EXISTS public.idx_audit_user;
+    DROP INDEX IF EXISTS public.idx_audit_created;
+    CREATE TABLE public.audit_logs (
+        id UUID DEFAULT gen_random_uuid() NOT NULL,
+        user_id UUID REFERENCES public.user_profiles(id),
+        action TEXT NOT NULL,
+        metadata JSONB,
+        ip_address TEXT,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    CREATE TABLE public.audit_logs_default PARTITION OF public.audit_logs DEFAULT;
+    ALTER TABLE public.audit_logs_default ENABLE ROW LEVEL SECURITY;
+    PERFORM public.ensure_monthly_partitions('audit_logs', (SELECT (min(created_at) AT TIME ZONE 'UTC')::date FROM public.audit_logs_unpartitioned));
+    INSERT INTO public.audit_logs (id, user_id, action, metadata, ip_address, created_at)
+    SELECT id, user_id, action, metadata, ip_address, COALESCE(created_at, NOW()) FROM public.audit_logs_unpartitioned;
+    DROP TABLE public.audit_logs_unpartitioned;
+  END IF;
+
+  IF (SELECT relkind FROM pg_class WHERE oid = 'public.chat_messages'::regclass) = 'r' THEN
+    LOCK TABLE public.chat_messages IN ACCESS EXCLUSIVE MODE;
+    ALTER TABLE public.chat_messages RENAME TO chat_messages_unpartitioned;
+    DROP INDEX IF EXISTS public.idx_chat_messages_session;
+    CREATE TABLE public.chat_messages (
+        id UUID DEFAULT gen_random_uuid() NOT NULL,
+        session_id UUID REFERENCES public.chat_sessions(id) ON DELETE CASCADE NOT NULL,
+        sender TEXT NOT NULL CHECK (sender IN ('user', 'system')),
+        content TEXT NOT NULL,
+        metadata JSONB DEFAULT '{}',
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    CREATE TABLE public.chat_messages_default PARTITION OF public.chat_messages DEFAULT;
+    ALTER TABLE public.chat_messages_default ENABLE ROW LEVEL SECURITY;
+    PERFORM public.ensure_monthly_partitions('chat_messages', (SELECT (min(created_at) AT TIME ZONE 'UTC')::date FROM public.chat_messages_unpartitioned));
+    INSERT INTO public.chat_messages (id, session_id, sender, content, metadata, created_at)
+    SELECT id, session_id, sender, content, metadata, COALESCE(created_at, NOW()) FROM public.chat_messages_unpartitioned;
+    DROP TABLE public.chat_messages_unpartitioned;
+  END IF;
+END;
+$$;
+
+ALTER TABLE public.audit_logs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.chat_messages ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Service role insert audit logs" ON public.audit_logs;
+CREATE POLICY "Service role insert audit logs" ON public.audit_logs FOR INSERT WITH CHECK ((SELECT auth.role()) = 'service_role');
+
+DROP POLICY IF EXISTS "Users manage own chat messages" ON public.chat_messages;
+CREATE POLICY "Users manage own chat messages" ON public.chat_messages FOR ALL USING (session_id IN (SELECT s.id FROM public.chat_sessions s WHERE s.user_id = (SELECT auth.uid())));
+
+CREATE INDEX IF NOT EXISTS idx_audit_user ON public.audit_logs(user_id);
+CREATE INDEX IF NOT EXISTS idx_audit_created ON public.audit_logs(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON public.chat_messages(session_id, created_at);
+
+COMMIT;
@@ -0,0 +1,12 @@
+-- Adds replication_lag_seconds(), which the API probes on READ_REPLICA_URL to
+-- decide whether routed reads may use the replica. Apply on the primary; it
+-- replicates. Idempotent.
+
+CREATE OR REPLACE FUNCTION public.replication_lag_seconds()
+RETURNS FLOAT AS $$
+  SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+  END::float;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,18 @@
+-- Adds next_alert_event_seq(), the seq source for the Postgres alert bus. It
+-- returns microseconds since the epoch, bumped past the last value issued, so
+-- seqs keep increasing across workers and stay in the same space as the API's
+-- local fallback when Postgres is unreachable. Idempotent.
+
+CREATE SEQUENCE IF NOT EXISTS public.alert_event_seq;
+
+CREATE OR REPLACE FUNCTION public.next_alert_event_seq()
+RETURNS BIGINT AS $$
+BEGIN
+  -- Serializes issuers so two sessions in the same microsecond cannot both setval to the clock.
+  PERFORM pg_advisory_xact_lock(hashtext('public.alert_event_seq'));
+  RETURN setval('public.alert_event_seq', GREATEST(
+    nextval('public.alert_event_seq'),
+    (EXTRACT(EPOCH FROM clock_timestamp()) * 1000000)::BIGINT
+  ));
+END;
+$$ LANGUAGE plpgsql;
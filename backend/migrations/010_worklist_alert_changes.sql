@@ -0,0 +1,80 @@
+-- Tracks when each alert last changed (status, coalesced hits) and makes
+-- get_doctor_worklist(p_since) report patients whose alerts were acknowledged
+-- or otherwise updated, not only those with new pending alerts. Idempotent.
+
+ALTER TABLE public.alerts ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+UPDATE public.alerts SET updated_at = COALESCE(last_seen_at, created_at) WHERE updated_at IS NULL;
+ALTER TABLE public.alerts ALTER COLUMN updated_at SET DEFAULT NOW();
+
+CREATE OR REPLACE FUNCTION public.touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at := NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS on_alert_touch ON public.alerts;
+CREATE TRIGGER on_alert_touch
+BEFORE UPDATE ON public.alerts
+FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+
+-- Latest change to any of a patient's alerts, whatever its status.
+CREATE INDEX IF NOT EXISTS idx_alerts_user_updated ON public.alerts (user_id, updated_at DESC);
+
+-- The API calls this with the service-role client, which bypasses RLS, so
+-- p_doctor_id must be the authenticated doctor (the API takes it from the
+-- verified token). Called directly over PostgREST it runs as that user and
+-- RLS limits the rows.
+CREATE OR REPLACE FUNCTION public.get_doctor_worklist(
+    p_doctor_id UUID,
+    p_limit INT DEFAULT 50,
+    p_offset INT DEFAULT 0,
+    p_sort TEXT DEFAULT 'risk',
+    p_since TIMESTAMP WITH TIME ZONE DEFAULT NULL
+) RETURNS TABLE (
+    patient_id UUID,
+    full_name TEXT,
+    latest_risk TEXT,
+    last_assessed TIMESTAMP WITH TIME ZONE,
+    pending_alerts BIGINT,
+    last_alert_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    total_count BIGINT
+) AS $$
+  SELECT w.*, count(*) OVER () AS total_count
+  FROM (
+    SELECT
+      a.patient_id, p.full_name, h.final_risk, h.recorded_at,
+      al.pending, al.last_seen_at,
+      GREATEST(a.assigned_at, h.recorded_at, al.last_seen_at, ch.changed_at) AS updated_at
+    FROM public.patient_assignments a
+    JOIN public.user_profiles p ON p.id = a.patient_id
+    LEFT JOIN LATERAL (
+      SELECT r.final_risk, r.recorded_at
+      FROM public.patient_risk_history r
+      WHERE r.user_id = a.patient_id
+      ORDER BY r.recorded_at DESC, r.id DESC
+      LIMIT 1
+    ) h ON TRUE
+    CROSS JOIN LATERAL (
+      SELECT count(*) AS pending, max(x.last_seen_at) AS last_seen_at
+      FROM public.alerts x
+      WHERE x.user_id = a.patient_id AND x.status = 'pending'
+    ) al
+    CROSS JOIN LATERAL (
+      SELECT max(x.updated_at) AS changed_at
+      FROM public.alerts x
+      WHERE x.user_id = a.patient_id
+    ) ch
+    WHERE a.doctor_id = p_doctor_id
+  ) w
+  WHERE p_since IS NULL OR w.updated_at > p_since
+  ORDER BY
+    CASE WHEN p_sort = 'risk' THEN array_position(ARRAY['CRITICAL', 'HIGH', 'MEDIUM', 'LOW'], w.final_risk) END NULLS LAST,
+    CASE WHEN p_sort IN ('risk', 'alerts') THEN w.pending END DESC,
+    CASE WHEN p_sort = 'name' THEN w.full_name END,
+    w.recorded_at DESC NULLS LAST,
+    w.patient_id
+  LIMIT p_limit OFFSET p_offset;
+$$ LANGUAGE sql STABLE SET search_path = public;
@@ -0,0 +1,62 @@
+-- get_admin_metrics(p_days) applied p_days only to the weekly series; the
+-- totals, distribution, by-trimester and alert-status figures summed every
+-- daily rollup ever written. Redefines it so they cover the same window.
+-- Idempotent.
+
+-- Everything /admin/metrics renders, in one round trip over the rollups. Every
+-- figure covers the last p_days UTC days (today included), except the hourly
+-- series, which is always the last 24 hours.
+CREATE OR REPLACE FUNCTION public.get_admin_metrics(p_days INT DEFAULT 7)
+RETURNS JSONB AS $$
+  WITH days AS (
+    SELECT (d AT TIME ZONE 'UTC')::date AS day
+    FROM generate_series(date_trunc('day', NOW(), 'UTC') - make_interval(days => p_days - 1), date_trunc('day', NOW(), 'UTC'), interval '1 day') d
+  ),
+  hours AS (
+    SELECT h FROM generate_series(date_trunc('hour', NOW(), 'UTC') - interval '23 hours', date_trunc('hour', NOW(), 'UTC'), interval '1 hour') h
+  ),
+  risk AS (
+    SELECT final_risk, sum(assessments) AS n FROM public.assessment_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC' GROUP BY final_risk
+  ),
+  totals AS (
+    SELECT COALESCE(sum(n), 0) AS total, COALESCE(sum(n) FILTER (WHERE final_risk IN ('HIGH', 'CRITICAL')), 0) AS high FROM risk
+  )
+  SELECT jsonb_build_object(
+    'total', t.total,
+    'high_risk_count', t.high,
+    'high_percent', CASE WHEN t.total > 0 THEN round(t.high * 100.0 / t.total, 1) ELSE 0 END,
+    'total_alerts', (SELECT COALESCE(sum(alerts), 0) FROM public.alert_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC'),
+    'distribution', (
+      SELECT COALESCE(jsonb_agg(jsonb_build_object('risk', l.risk, 'count', COALESCE(r.n, 0)) ORDER BY l.ord), '[]')
+      FROM unnest(ARRAY['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']) WITH ORDINALITY AS l(risk, ord)
+      LEFT JOIN risk r ON r.final_risk = l.risk
+    ),
+    'by_trimester', (
+      SELECT COALESCE(jsonb_agg(jsonb_build_object('trimester', trimester, 'risk', final_risk, 'count', n) ORDER BY trimester, final_risk), '[]')
+      FROM (SELECT trimester, final_risk, sum(assessments) AS n FROM public.assessment_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC' GROUP BY 1, 2) s
+    ),
+    'alerts_by_status', (
+      SELECT COALESCE(jsonb_agg(jsonb_build_object('alert_type', alert_type, 'status', status, 'count', n) ORDER BY alert_type, status), '[]')
+      FROM (SELECT alert_type, status, sum(alerts) AS n FROM public.alert_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC' GROUP BY 1, 2) s
+    ),
+    'weekly_assessments', (
+      SELECT jsonb_agg(jsonb_build_object('day', to_char(d.day, 'Dy'), 'date', d.day, 'count', COALESCE(s.n, 0)) ORDER BY d.day)
+      FROM days d
+      LEFT JOIN (SELECT bucket_start, sum(assessments) AS n FROM public.assessment_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC' GROUP BY 1) s
+        ON (s.bucket_start AT TIME ZONE 'UTC')::date = d.day
+    ),
+    'weekly_alerts', (
+      SELECT jsonb_agg(jsonb_build_object('day', to_char(d.day, 'Dy'), 'date', d.day, 'count', COALESCE(s.n, 0)) ORDER BY d.day)
+      FROM days d
+      LEFT JOIN (SELECT bucket_start, sum(alerts) AS n FROM public.alert_rollups WHERE grain = 'day' AND bucket_start >= (SELECT min(day) FROM days)::timestamp AT TIME ZONE 'UTC' GROUP BY 1) s
+        ON (s.bucket_start AT TIME ZONE 'UTC')::date = d.day
+    ),
+    'hourly_assessments', (
+      SELECT jsonb_agg(jsonb_build_object('hour', h.h, 'count', COALESCE(s.n, 0)) ORDER BY h.h)
+      FROM hours h
+      LEFT JOIN (SELECT bucket_start, sum(assessments) AS n FROM public.assessment_rollups WHERE grain = 'hour' AND bucket_start >= (SELECT min(h) FROM hours) GROUP BY 1) s
+        ON s.bucket_start = h.h
+    )
+  )
+  FROM totals t;
+$$ LANGUAGE sql STABLE SET search_path = public;
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 from backend.utils.constants import (
     AGE_MIN, AGE_MAX, TRIMESTER_MIN, TRIMESTER_MAX, WEEKS_MIN, WEEKS_MAX,
     HR_MIN, HR_MAX, HB_MIN, HB_MAX, BP_CAT_MIN, BP_CAT_MAX
@@ -24,6 +24,9 @@ class AnalyzeRequest(BaseModel):
     blood_pressure_systolic: Optional[int] = None
     blood_pressure_diastolic: Optional[int] = None
 
+class BatchAnalyzeRequest(BaseModel):
+    items: List[AnalyzeRequest] = Field(..., min_length=1, max_length=5000)
+
 class ChatRequest(BaseModel):
     session_id: str
     message: str
@@ -0,0 +1,328 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+from backend.config import settings
+
+logger = logging.getLogger("AlertBus")
+
+Envelope = Dict[str, Any]
+Subscriber = Callable[[Envelope], Awaitable[None]]
+
+
+class AlertBus:
+    """
+    Publishes each alert once and fans it out to every worker's local subscriber.
+    Sequence numbers are microseconds since the epoch, bumped past the highest
+    seq this worker has seen, so a new broker or a local fallback continues the
+    same increasing sequence instead of starting over. They are ordered but
+    not dense.
+    """
+
+    def __init__(self):
+        self._subscriber: Optional[Subscriber] = None
+        self._seq = 0
+
+    async def start(self, subscriber: Subscriber):
+        self._subscriber = subscriber
+
+    async def stop(self):
+        self._subscriber = None
+
+    async def publish(self, payload: Dict[str, Any]):
+        await self._deliver_local(payload)
+
+    def _next_seq(self) -> int:
+        self._seq = max(self._seq + 1, time.time_ns() // 1000)
+        return self._seq
+
+    async def _deliver_local(self, payload: Dict[str, Any]):
+        await self._dispatch({"seq": self._next_seq(), "payload": payload})
+
+    async def _dispatch(self, envelope: Envelope):
+        self._seq = max(self._seq, envelope.get("seq") or 0)
+        if self._subscriber is None:
+            return
+        try:
+            await self._subscriber(envelope)
+        except Exception as e:
+            logger.error(f"Alert subscriber failed for seq {envelope.get('seq')}: {e}")
+
+
+class InProcessAlertBus(AlertBus):
+    pass
+
+
+class UnixSocketAlertBus(AlertBus):
+    """
+    Single-host fan-out over a Unix domain socket. The worker holding the flock
+    on `<socket>.lock` runs the broker and assigns sequence numbers; the other
+    workers connect as clients and take over the lock if the broker dies.
+    """
+
+    RECONNECT_DELAY = 1.0
+    PEER_DRAIN_TIMEOUT = 5.0
+
+    def __init__(self, socket_path: str):
+        super().__init__()
+        self.socket_path = socket_path
+        self._lock_fd: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: set = set()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._broker_lock: Optional[asyncio.Lock] = None
+
+    async def start(self, subscriber: Subscriber):
+        await super().start(subscriber)
+        self._broker_lock = asyncio.Lock()
+        self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._runner:
+            self._runner.cancel()
+        if self._writer:
+            self._writer.close()
+        for peer in list(self._peers):
+            peer.close()
+        if self._server:
+            self._server.close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        await super().stop()
+
+    async def publish(self, payload: Dict[str, Any]):
+        if self._server:
+            await self._broker_publish(payload)
+        elif self._writer and not self._writer.is_closing():
+            try:
+                self._writer.write(self._encode({"payload": payload}))
+                await self._writer.drain()
+                return
+            except (ConnectionError, OSError) as e:
+                logger.warning(f"Broker unreachable, delivering locally: {e}")
+                await self._deliver_local(payload)
+        else:
+            await self._deliver_local(payload)
+
+    def _try_acquire_broker_lock(self) -> bool:
+        if fcntl is None:
+            return False
+        fd = os.open(f"{self.socket_path}.lock", os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                if self._try_acquire_broker_lock():
+                    await self._serve()
+                    return
+                reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+                logger.info(f"Joined alert broker at {self.socket_path}")
+                await self._consume(reader)
+            except asyncio.CancelledError:
+                raise
+            except (ConnectionError, FileNotFoundError, OSError) as e:
+                logger.debug(f"Alert broker not ready: {e}")
+            self._writer = None
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+    async def _serve(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle_peer, path=self.socket_path)
+        logger.info(f"Alert broker listening on {self.socket_path} (pid {os.getpid()})")
+
+    async def _handle_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._peers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                await self._broker_publish(message["payload"])
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Alert broker peer dropped: {e}")
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    async def _broker_publish(self, payload: Dict[str, Any]):
+        # Serialized so peers receive envelopes in seq order and drain() is never awaited twice on one writer.
+        async with self._broker_lock:
+            envelope = {"seq": self._next_seq(), "payload": payload}
+            data = self._encode(envelope)
+            for peer in list(self._peers):
+                try:
+                    peer.write(data)
+                except (ConnectionError, OSError):
+                    self._drop_peer(peer)
+            await asyncio.gather(*(self._drain(peer) for peer in list(self._peers)))
+            await self._dispatch(envelope)
+
+    async def _drain(self, peer: asyncio.StreamWriter):
+        try:
+            await asyncio.wait_for(peer.drain(), self.PEER_DRAIN_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError, OSError) as e:
+            logger.warning(f"Dropping alert broker peer that stopped reading: {type(e).__name__}")
+            self._drop_peer(peer)
+
+    def _drop_peer(self, peer: asyncio.StreamWriter):
+        self._peers.discard(peer)
+        peer.close()
+
+    async def _consume(self, reader: asyncio.StreamReader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                logger.warning("Alert broker connection closed")
+                return
+            await self._dispatch(json.loads(line))
+
+    @staticmethod
+    def _encode(message: Dict[str, Any]) -> bytes:
+        return (json.dumps(message, default=str) + "\n").encode()
+
+
+class PostgresNotifyAlertBus(AlertBus):
+    """
+    Cross-host fan-out through Postgres LISTEN/NOTIFY. Sequence numbers come
+    from `public.next_alert_event_seq()`, which uses the same microsecond clock
+    as the local fallback, so every worker sees the same ordering. A dropped
+    connection is re-established, and LISTEN re-issued, with jittered
+    exponential backoff; publishes in the meantime are delivered locally.
+    """
+
+    RECONNECT_MIN_DELAY = 1.0
+    RECONNECT_MAX_DELAY = 30.0
+    HEALTH_CHECK_INTERVAL = 15.0
+
+    def __init__(self, dsn: str, channel: str):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self._conn = None
+        self._publish_lock: Optional[asyncio.Lock] = None
+        self._runner: Optional[asyncio.Task] = None
+
+    async def start(self, subscriber: Subscriber):
+        await super().start(subscriber)
+        self._publish_lock = asyncio.Lock()
+        if asyncpg is None:
+            logger.error("asyncpg not installed; Postgres alert bus falling back to in-process delivery")
+            return
+        self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._runner:
+            self._runner.cancel()
+            self._runner = None
+        await self._close()
+        await super().stop()
+
+    async def _run(self):
+        delay = self.RECONNECT_MIN_DELAY
+        while True:
+            try:
+                lost = asyncio.Event()
+                conn = await asyncpg.connect(self.dsn)
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(self.channel, self._on_notify)
+                self._conn = conn
+                delay = self.RECONNECT_MIN_DELAY
+                logger.info(f"Listening for alerts on Postgres channel '{self.channel}'")
+                await self._watch(conn, lost)
+                logger.warning(f"Lost Postgres alert listener on '{self.channel}', reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Postgres alert bus unavailable, delivering locally: {e}")
+            await self._close()
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+            delay = min(self.RECONNECT_MAX_DELAY, delay * 2)
+
+    async def _watch(self, conn, lost: asyncio.Event):
+        """Returns once the connection is gone; a periodic ping catches half-open sockets."""
+        while not conn.is_closed():
+            try:
+                await asyncio.wait_for(lost.wait(), self.HEALTH_CHECK_INTERVAL)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                async with self._publish_lock:
+                    await asyncio.wait_for(conn.execute("SELECT 1"), self.HEALTH_CHECK_INTERVAL)
+            except Exception as e:
+                logger.warning(f"Postgres alert listener health check failed: {type(e).__name__}")
+                return
+
+    async def _close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            await conn.remove_listener(self.channel, self._on_notify)
+            await conn.close(timeout=5)
+        except Exception:
+            conn.terminate()
+
+    async def publish(self, payload: Dict[str, Any]):
+        if not self._conn or self._conn.is_closed():
+            await self._deliver_local(payload)
+            return
+        try:
+            async with self._publish_lock:
+                await self._conn.execute(
+                    "SELECT pg_notify($1, json_build_object('seq', public.next_alert_event_seq(), 'payload', $2::json)::text)",
+                    self.channel,
+                    json.dumps(payload, default=str)
+                )
+        except Exception as e:
+            logger.error(f"NOTIFY failed, delivering locally: {e}")
+            await self._deliver_local(payload)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            envelope = json.loads(payload)
+        except ValueError:
+            logger.error(f"Malformed alert notification on '{channel}'")
+            return
+        asyncio.get_event_loop().create_task(self._dispatch(envelope))
+
+
+def create_alert_bus() -> AlertBus:
+    backend = settings.ALERT_BUS_BACKEND.lower()
+    if backend == "ipc":
+        return UnixSocketAlertBus(settings.ALERT_BUS_SOCKET)
+    if backend == "postgres":
+        if not settings.DATABASE_URL:
+            logger.warning("ALERT_BUS_BACKEND=postgres without DATABASE_URL; using in-process bus")
+            return InProcessAlertBus()
+        return PostgresNotifyAlertBus(settings.DATABASE_URL, settings.ALERT_BUS_CHANNEL)
+    return InProcessAlertBus()
@@ -0,0 +1,56 @@
+import threading
+import time
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+from backend.schemas.internal_models import RiskLevel
+
+logger = logging.getLogger("AlertCoalescer")
+
+RISK_RANK = {RiskLevel.LOW: 0, RiskLevel.MEDIUM: 1, RiskLevel.HIGH: 2, RiskLevel.CRITICAL: 3}
+
+
+class AlertCoalescer:
+    """
+    Merges repeated alerts for the same patient and alert type inside a window.
+    The first alert of a window is emitted, repeats only bump a counter, and a
+    higher risk level than the one already emitted escalates immediately,
+    closing the lower-risk window early so its merged count is still reported.
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window = window_seconds
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._closed: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def admit(self, user_id: str, alert_type: str, risk_level: RiskLevel, input_id: Optional[str] = None) -> bool:
+        now = time.monotonic()
+        key = (user_id, alert_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry["opened_at"] < self.window and RISK_RANK[risk_level] <= entry["rank"]:
+                entry["count"] += 1
+                entry["last_input_id"] = input_id
+                return False
+            if entry and now - entry["opened_at"] < self.window and entry["count"] > 1:
+                self._closed.append({"user_id": user_id, "alert_type": alert_type, **entry})
+            self._entries[key] = {
+                "opened_at": now,
+                "rank": RISK_RANK[risk_level],
+                "risk": risk_level.value,
+                "count": 1,
+                "first_input_id": input_id,
+                "last_input_id": input_id
+            }
+            return True
+
+    def expire(self) -> List[Dict[str, Any]]:
+        """Drops closed windows and returns those that merged more than one alert, escalated ones included."""
+        now = time.monotonic()
+        with self._lock:
+            closed, self._closed = self._closed, []
+            for key in [k for k, e in self._entries.items() if now - e["opened_at"] >= self.window]:
+                entry = self._entries.pop(key)
+                if entry["count"] > 1:
+                    closed.append({"user_id": key[0], "alert_type": key[1], **entry})
+        return closed
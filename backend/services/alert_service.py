@@ -1,38 +1,81 @@
+import asyncio
 import logging
 from typing import Optional
 from backend.services.supabase_service import SupabaseService
+from backend.services.alert_coalescer import AlertCoalescer
 from backend.schemas.internal_models import RiskLevel
+from backend.config import settings
 
 logger = logging.getLogger("AlertService")
 
 
 class AlertService:
-    def __init__(self, db_service: SupabaseService):
+    def __init__(self, db_service: SupabaseService, coalescer: Optional[AlertCoalescer] = None):
         self.db = db_service
+        self.coalescer = coalescer or AlertCoalescer(settings.ALERT_COALESCE_WINDOW)
+        self._flusher: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Broadcasts closed coalescing windows on a timer instead of waiting for the next alert."""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+
+    async def _flush_loop(self):
+        from backend.websocket_manager import manager
+        interval = min(settings.ALERT_COALESCE_FLUSH_INTERVAL, self.coalescer.window)
+        while True:
+            await asyncio.sleep(interval)
+            await self._broadcast_closed_windows(manager)
 
     async def trigger_clinical_alert(self, input_id: str, user_id: str, risk_level: RiskLevel) -> bool:
+        """
+        Broadcasts a clinical alert unless it coalesces into one already raised
+        for this patient. The `alerts` row itself is written (and coalesced) by
+        the `on_high_risk_detected` trigger. Returns True when the alert was emitted.
+        """
         if risk_level not in [RiskLevel.HIGH, RiskLevel.CRITICAL]:
             return False
 
-        result = self.db.log_alert(
-            input_id=input_id,
-            user_id=user_id,
-            alert_type=f"{risk_level.value}_RISK_DETECTED",
-            status="pending"
-        )
+        from backend.websocket_manager import manager
+        admitted = self.coalescer.admit(user_id, "RISK_DETECTED", risk_level, input_id)
+        # Runs after admit so a window closed by this escalation goes out ahead of the new alert.
+        await self._broadcast_closed_windows(manager)
+        if not admitted:
+            logger.info(f"Coalesced repeat {risk_level.value} alert for patient {user_id}")
+            return False
 
         try:
-            from backend.websocket_manager import manager
             await manager.broadcast({
                 "type": "HIGH_RISK_ALERT",
                 "patient_id": user_id,
                 "input_id": input_id,
                 "risk": risk_level.value,
                 "alert_type": f"{risk_level.value}_RISK_DETECTED",
-                "status": "pending"
+                "status": "pending",
+                "occurrence_count": 1
             })
             logger.info(f"Broadcast alert for {risk_level.value} risk to {manager.connection_count} clients")
         except Exception as e:
             logger.error(f"WebSocket broadcast failed: {e}")
 
-        return result
+        return True
+
+    async def _broadcast_closed_windows(self, manager):
+        for window in self.coalescer.expire():
+            try:
+                await manager.broadcast({
+                    "type": "ALERT_COALESCED",
+                    "patient_id": window["user_id"],
+                    "input_id": window["last_input_id"],
+                    "risk": window["risk"],
+                    "alert_type": f"{window['risk']}_RISK_DETECTED",
+                    "status": "pending",
+                    "occurrence_count": window["count"]
+                })
+            except Exception as e:
+                logger.error(f"WebSocket coalesced broadcast failed: {e}")
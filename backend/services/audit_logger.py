@@ -1,22 +1,67 @@
 import logging
-from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+from uuid import uuid4
+from typing import Dict, Any, Optional, List
 from backend.schemas.internal_models import RuleEngineResult, MLEngineResult, RiskLevel
+from backend.services.batch_sink import BufferedTableSink
+from backend.config import settings
 
 logger = logging.getLogger("ClinicalAudit")
 
+def _write_audit_rows(rows: List[Dict[str, Any]]) -> bool:
+    from backend.services.supabase_service import SupabaseService
+    return SupabaseService().insert_rows("audit_logs", rows, on_conflict="id,created_at")
+
+audit_sink = BufferedTableSink(
+    "audit_logs",
+    _write_audit_rows,
+    spool_dir=settings.SINK_SPOOL_DIR,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL
+)
+
 class AuditLogger:
     @staticmethod
-    def log_assessment(rule_result: RuleEngineResult, ml_result: MLEngineResult, final_risk: RiskLevel):
-        audit_entry = {
+    def _assessment_entry(rule_result: RuleEngineResult, ml_result: Optional[MLEngineResult], final_risk: str,
+                          input_id: Optional[str]) -> Dict[str, Any]:
+        return {
             "event": "RISK_ASSESSMENT",
+            "input_id": input_id,
             "rule_risk": rule_result.risk_level.value,
             "rule_score": rule_result.score,
             "ml_risk": ml_result.predicted_risk.value if ml_result else None,
-            "final_risk": final_risk.value,
+            "final_risk": final_risk,
             "emergency_flags": rule_result.emergency_flags
         }
+
+    @staticmethod
+    def log_assessment(rule_result: RuleEngineResult, ml_result: MLEngineResult, final_risk: RiskLevel,
+                       user_id: Optional[str] = None, input_id: Optional[str] = None, ip: str = "0.0.0.0"):
+        """Log line only: the audit row comes from the save RPC, or from `record_assessment` on its fallback path."""
+        audit_entry = AuditLogger._assessment_entry(rule_result, ml_result, final_risk.value, input_id)
+        logger.info(f"AUDIT_ACTION: RISK_ASSESSMENT | User: {user_id} | IP: {ip} | Metadata: {audit_entry}")
+
+    @staticmethod
+    def record_assessment(rule_result: RuleEngineResult, ml_result: Optional[MLEngineResult], final_risk: str,
+                          user_id: Optional[str], input_id: str, ip: str = "0.0.0.0"):
+        """Queues the RISK_ASSESSMENT audit row for an assessment saved without the RPC, which would have written it."""
+        audit_sink.emit({
+            "id": str(uuid4()),
+            "user_id": user_id,
+            "action": "RISK_ASSESSMENT",
+            "metadata": AuditLogger._assessment_entry(rule_result, ml_result, final_risk, input_id),
+            "ip_address": ip,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        })
+
     @staticmethod
     def log_action(user_id: Optional[str], action: str, metadata: Dict[str, Any], ip: str = "0.0.0.0"):
-        from backend.services.supabase_service import SupabaseService
-        SupabaseService().log_audit(user_id, action, metadata, ip)
+        audit_sink.emit({
+            "id": str(uuid4()),
+            "user_id": user_id,
+            "action": action,
+            "metadata": metadata,
+            "ip_address": ip,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        })
         logger.info(f"AUDIT_ACTION: {action} | User: {user_id} | Metadata: {metadata}")
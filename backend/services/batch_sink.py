@@ -0,0 +1,187 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from backend.services.metrics_service import MetricsService
+from backend.config import settings
+
+logger = logging.getLogger("BatchSink")
+
+Writer = Callable[[List[Dict[str, Any]]], bool]
+
+
+class BufferedTableSink:
+    """
+    Non-blocking, crash-safe batching for append-only tables.
+
+    `emit()` appends the row to an in-memory buffer and to a per-process JSONL
+    spool file. A flusher thread bulk-writes the buffer when it reaches
+    `batch_size` rows or every `flush_interval` seconds. The spool is rotated
+    before each flush and deleted once the batch is written, so rows survive a
+    crash and are picked up by the next process that starts the sink.
+
+    Failed flushes back off exponentially (with jitter) up to `max_backoff`.
+    Rows that would grow the retry backlog past `max_rows`, or that are still
+    failing after `max_retry_age` seconds of consecutive failures, are moved
+    to `<name>.dead-letter.jsonl` in the spool directory for manual replay.
+    """
+
+    def __init__(self, name: str, writer: Writer, spool_dir: str, batch_size: int = 200, flush_interval: float = 2.0,
+                 max_rows: int = settings.SINK_MAX_ROWS, max_backoff: float = settings.SINK_MAX_BACKOFF,
+                 max_retry_age: float = settings.SINK_MAX_RETRY_AGE):
+        self.name = name
+        self.writer = writer
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.max_backoff = max_backoff
+        self.max_retry_age = max_retry_age
+        self.spool_path = os.path.join(spool_dir, f"{name}.{os.getpid()}.jsonl")
+        self.dead_letter_path = os.path.join(spool_dir, f"{name}.dead-letter.jsonl")
+        self._failures = 0
+        self._failing_since: Optional[float] = None
+        self._retry_at = 0.0
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._spool = None
+
+    def start(self):
+        with self._lock:
+            if self._thread:
+                return
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self._spool = open(self.spool_path, "a", encoding="utf-8")
+            self._recover_orphans()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-flusher", daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def emit(self, row: Dict[str, Any]):
+        if self._thread is None:
+            self.start()
+        line = json.dumps(row, default=str)
+        with self._lock:
+            self._spool.write(line + "\n")
+            self._spool.flush()
+            self._buffer.append(row)
+            depth = len(self._buffer)
+        MetricsService.set_sink_depth(self.name, depth)
+        if depth >= self.batch_size:
+            self._wake.set()
+
+    def stop(self):
+        if self._thread is None or self._stopping.is_set():
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout=10)
+        self.flush(force=True)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(max(self.flush_interval, self._retry_at - time.monotonic()))
+            self._wake.clear()
+            self.flush()
+
+    def flush(self, force: bool = False):
+        """Writes the buffer; while backing off after a failure, only `force` flushes early."""
+        if not force and time.monotonic() < self._retry_at:
+            return
+        with self._flush_lock:
+            with self._lock:
+                if not self._buffer:
+                    return
+                batch, self._buffer = self._buffer, []
+                flushing_path = f"{self.spool_path}.flushing"
+                self._spool.close()
+                os.replace(self.spool_path, flushing_path)
+                self._spool = open(self.spool_path, "a", encoding="utf-8")
+
+            start = time.perf_counter()
+            ok = True
+            for i in range(0, len(batch), self.batch_size):
+                if not self._write(batch[i:i + self.batch_size]):
+                    ok = False
+                    failed = batch[i:]
+                    break
+            MetricsService.record_sink_flush(self.name, "ok" if ok else "error", time.perf_counter() - start, len(batch))
+
+            now = time.monotonic()
+            if ok:
+                self._failures, self._failing_since, self._retry_at = 0, None, 0.0
+            else:
+                self._failures += 1
+                self._failing_since = self._failing_since or now
+                delay = min(self.max_backoff, self.flush_interval * 2 ** self._failures)
+                self._retry_at = now + random.uniform(delay / 2, delay)
+
+            with self._lock:
+                if not ok:
+                    if now - self._failing_since > self.max_retry_age:
+                        dropped, failed = failed, []
+                    else:
+                        overflow = max(0, min(len(failed), len(failed) + len(self._buffer) - self.max_rows))
+                        dropped, failed = failed[:overflow], failed[overflow:]
+                    if dropped:
+                        self._dead_letter(dropped)
+                    # Requeue ahead of newer rows and re-spool them before dropping the rotated file.
+                    self._buffer = failed + self._buffer
+                    for row in failed:
+                        self._spool.write(json.dumps(row, default=str) + "\n")
+                    self._spool.flush()
+                os.remove(flushing_path)
+                MetricsService.set_sink_depth(self.name, len(self._buffer))
+
+    def _dead_letter(self, rows: List[Dict[str, Any]]):
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        MetricsService.record_sink_dead_letter(self.name, len(rows))
+        logger.error(f"{self.name}: gave up on {len(rows)} rows after {self._failures} failed flushes; moved to {self.dead_letter_path}")
+
+    def _write(self, rows: List[Dict[str, Any]]) -> bool:
+        try:
+            return bool(self.writer(rows))
+        except Exception as e:
+            logger.error(f"{self.name} flush of {len(rows)} rows failed: {e}")
+            return False
+
+    def _recover_orphans(self):
+        for path in glob.glob(os.path.join(self.spool_dir, f"{self.name}.*.jsonl*")):
+            if path.startswith(self.spool_path):
+                continue
+            try:
+                pid = int(os.path.basename(path).split(".")[1])
+                os.kill(pid, 0)
+                continue
+            except (ValueError, IndexError):
+                continue
+            except ProcessLookupError:
+                pass
+            except PermissionError:
+                continue
+            claimed = f"{self.spool_path}.recovering"
+            try:
+                os.replace(path, claimed)
+            except OSError:
+                continue
+            with open(claimed, encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            for row in rows:
+                self._spool.write(json.dumps(row, default=str) + "\n")
+            self._spool.flush()
+            self._buffer.extend(rows)
+            os.remove(claimed)
+            logger.warning(f"{self.name}: recovered {len(rows)} unflushed rows from {path}")
@@ -50,7 +50,8 @@ class ConversationService:
 
     async def get_or_create_session(self, user_id: str) -> Dict[str, Any]:
         session = await asyncio.to_thread(
-            self.supabase.client.table("chat_sessions").select("*").eq("user_id", user_id).eq("is_completed", False).order("updated_at", desc=True).limit(1).execute
+            self.supabase.hedged, "chat_sessions.active",
+            lambda: self.supabase.client.table("chat_sessions").select("*").eq("user_id", user_id).eq("is_completed", False).order("updated_at", desc=True).limit(1).execute()
         )
         
         if session.data:
@@ -85,7 +86,8 @@ class ConversationService:
              return "I'm sorry, your session has expired or is invalid. Please refresh the page to start a new clinical assessment.", ChatState.START
 
         session = await asyncio.to_thread(
-            self.supabase.client.table("chat_sessions").select("*").eq("id", session_id).single().execute
+            self.supabase.hedged, "chat_sessions.by_id",
+            lambda: self.supabase.client.table("chat_sessions").select("*").eq("id", session_id).single().execute()
         )
         if not session.data:
             return "Session not found. Please refresh the page.", ChatState.COMPLETE
@@ -197,7 +199,7 @@ class ConversationService:
         """
         Triggers the real clinical analysis once chat data collection is complete.
         """
-        from backend.api.analyze import analyze, AnalyzeRequest
+        from backend.api.analyze import run_analysis, AnalyzeRequest
         from fastapi import BackgroundTasks
         
         try:
@@ -228,7 +230,7 @@ class ConversationService:
             bg = BackgroundTasks()
             
             # We mock a Request object or pass None if analyze function handles it
-            result = await analyze(None, analyze_req, bg, user_id=user_id)
+            result = await run_analysis(None, analyze_req, bg, user_id=user_id)
             
             risk = result.final_risk
             
@@ -0,0 +1,30 @@
+import logging
+from datetime import datetime, timezone
+from uuid import uuid4
+from typing import Dict, Any, List
+from backend.services.batch_sink import BufferedTableSink
+from backend.config import settings
+
+logger = logging.getLogger("ExplanationStore")
+
+def _write_explanation_rows(rows: List[Dict[str, Any]]) -> bool:
+    from backend.services.supabase_service import SupabaseService
+    return SupabaseService().insert_rows("assessment_explanations", rows)
+
+explanation_sink = BufferedTableSink(
+    "assessment_explanations",
+    _write_explanation_rows,
+    spool_dir=settings.SINK_SPOOL_DIR,
+    batch_size=settings.EXPLANATION_BATCH_SIZE,
+    flush_interval=settings.EXPLANATION_FLUSH_INTERVAL
+)
+
+def record_explanation(input_id: str, explanation: Dict[str, Any], status: str = "completed"):
+    """Queues an explanation row; engine_results itself is never updated."""
+    explanation_sink.emit({
+        "id": str(uuid4()),
+        "input_id": input_id,
+        "explanation": explanation,
+        "status": status,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    })
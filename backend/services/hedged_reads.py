@@ -0,0 +1,118 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from typing import Any, Callable, Deque, Dict, Optional
+
+from backend.services.metrics_service import MetricsService
+
+
+class HedgedReader:
+    """
+    Runs an idempotent read and, if it has not returned within that operation's
+    observed `percentile` latency, sends a second copy and returns whichever
+    answers first. Hedges are capped at `max_ratio` of calls by a token bucket,
+    and an op is never hedged before it has `min_samples` latencies. The sync
+    PostgREST client cannot abort a request in flight, so the loser is cancelled
+    if it has not started yet and otherwise left to finish with its result
+    discarded.
+    """
+
+    WINDOW = 512
+    RECOMPUTE_EVERY = 32
+    BURST = 10.0
+
+    def __init__(self, enabled: bool, percentile: float, max_ratio: float, min_samples: int, min_delay: float, max_workers: int):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+        self._samples: Dict[str, Deque[float]] = {}
+        self._delays: Dict[str, float] = {}
+        self._fresh: Dict[str, int] = {}
+        self._tokens = 1.0
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def run(self, op: str, call: Callable[[], Any]) -> Any:
+        """Returns `call()`'s result, hedged once if it is slow. Raises if every attempt failed."""
+        if not self.enabled:
+            return call()
+        with self._lock:
+            self._tokens = min(self.BURST, self._tokens + self.max_ratio)
+        delay = self.hedge_delay(op)
+        if delay is None:
+            return self._timed(op, call)
+
+        first = self._executor().submit(self._timed, op, call)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        if not self._take_token():
+            MetricsService.record_hedge(op, "skipped")
+            return first.result()
+
+        second = self._executor().submit(self._timed, op, call)
+        MetricsService.record_hedge(op, "sent")
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is second:
+                        MetricsService.record_hedge(op, "won")
+                    return future.result()
+        return first.result()
+
+    def hedge_delay(self, op: str) -> Optional[float]:
+        """The op's current hedge delay, or None while it has too few samples to hedge."""
+        with self._lock:
+            samples = self._samples.get(op)
+            if samples is None or len(samples) < self.min_samples:
+                return None
+            if op not in self._delays or self._fresh.get(op, 0) >= self.RECOMPUTE_EVERY:
+                ordered = sorted(samples)
+                index = min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)) - 1)
+                self._delays[op] = max(self.min_delay, ordered[index])
+                self._fresh[op] = 0
+            return self._delays[op]
+
+    def observe(self, op: str, duration: float):
+        with self._lock:
+            samples = self._samples.get(op)
+            if samples is None:
+                samples = self._samples[op] = deque(maxlen=self.WINDOW)
+            samples.append(duration)
+            self._fresh[op] = self._fresh.get(op, 0) + 1
+
+    def _timed(self, op: str, call: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        result = call()
+        # Only successes feed the percentile: fast failures would pull the hedge delay down.
+        self.observe(op, time.perf_counter() - start)
+        return result
+
+    def _take_token(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hedged-read")
+        return self._pool
+
+    def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,56 @@
+import time
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+CacheKey = Tuple[Optional[str], int]
+
+
+class HistoryCache:
+    """
+    Short-TTL cache of rendered /history pages, grouped per user so a new
+    assessment drops every cached page for that user at once. Each entry keeps
+    the ETag of its body so unchanged dashboard refreshes can answer 304.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_users: int = 5000):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._entries: Dict[str, Dict[CacheKey, Tuple[float, str, Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def etag_for(body: Dict[str, Any]) -> str:
+        digest = hashlib.sha1(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+        return f'W/"{digest}"'
+
+    def get(self, user_id: str, key: CacheKey) -> Optional[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(user_id, {}).get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return entry[1], entry[2]
+
+    def put(self, user_id: str, key: CacheKey, body: Dict[str, Any]) -> str:
+        etag = self.etag_for(body)
+        with self._lock:
+            if user_id not in self._entries and len(self._entries) >= self.max_users:
+                self._purge_expired()
+                if len(self._entries) >= self.max_users:
+                    self._entries.pop(next(iter(self._entries)))
+            self._entries.setdefault(user_id, {})[key] = (time.monotonic() + self.ttl, etag, body)
+        return etag
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for user_id in list(self._entries):
+            pages = {k: v for k, v in self._entries[user_id].items() if v[0] > now}
+            if pages:
+                self._entries[user_id] = pages
+            else:
+                del self._entries[user_id]
@@ -1,8 +1,11 @@
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import multiprocess
 from fastapi import Response
 import time
 import logging
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, Tuple
+from backend.config import settings
 
 logger = logging.getLogger("MetricsService")
 
@@ -30,8 +33,195 @@ ALERT_COUNT = Counter(
     ["risk_level"]
 )
 
+NOTIFICATION_COUNT = Counter(
+    "clinical_notifications_total",
+    "Clinical notification emails by delivery outcome",
+    ["status"]
+)
+
+NOTIFICATION_LATENCY = Histogram(
+    "clinical_notification_delivery_seconds",
+    "Time from enqueue to SMTP delivery",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+
+NOTIFICATION_OUTBOX_DEPTH = Gauge(
+    "clinical_notification_outbox_depth",
+    "Emails waiting in the notification outbox",
+    multiprocess_mode="livesum"
+)
+
+SINK_BUFFER_DEPTH = Gauge(
+    "sink_buffer_depth",
+    "Rows buffered in a batched table sink awaiting flush",
+    ["sink"],
+    multiprocess_mode="livesum"
+)
+
+SINK_FLUSH_LATENCY = Histogram(
+    "sink_flush_duration_seconds",
+    "Time to bulk-write one flush of a batched table sink",
+    ["sink", "status"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+SINK_ROWS = Counter(
+    "sink_rows_flushed_total",
+    "Rows handled by batched table sink flushes",
+    ["sink", "status"]
+)
+
+DEPENDENCY_RETRIES = Histogram(
+    "dependency_call_retries",
+    "Retries spent per dependency call, by operation and final outcome",
+    ["op", "outcome"],
+    buckets=(0, 1, 2, 3, 5, 8)
+)
+
+SCOPED_CLIENT_POOL_SIZE = Gauge(
+    "supabase_scoped_client_pool_size",
+    "RLS-scoped Supabase clients held in the per-token pool",
+    multiprocess_mode="livesum"
+)
+
+SCOPED_CLIENT_EVICTIONS = Counter(
+    "supabase_scoped_client_evictions_total",
+    "Scoped Supabase clients evicted from the pool",
+    ["reason"]
+)
+
+DB_READ_LATENCY = Histogram(
+    "db_read_duration_seconds",
+    "Routed read latency by target (primary/replica) and operation",
+    ["target", "op"]
+)
+
+DB_READ_ROUTES = Counter(
+    "db_read_routes_total",
+    "Reads routed to each target, by routing reason",
+    ["target", "reason"]
+)
+
+REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Last measured read-replica replay lag",
+    multiprocess_mode="max"
+)
+
+HEDGED_READS = Counter(
+    "db_hedged_reads_total",
+    "Second requests sent for slow idempotent reads, by operation",
+    ["op"]
+)
+
+HEDGED_READ_WINS = Counter(
+    "db_hedged_read_wins_total",
+    "Hedged reads where the second request returned first",
+    ["op"]
+)
+
+HEDGES_SKIPPED = Counter(
+    "db_hedged_reads_skipped_total",
+    "Reads past the hedge delay that were not hedged because the hedge budget was spent",
+    ["op"]
+)
+
+# Bucket edges follow the API SLOs: 100ms for reads, 500ms for /analyze, 2.5s hard ceiling.
+HTTP_SLO_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status",
+    ["method", "route", "status"]
+)
+
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration by route template",
+    ["method", "route"],
+    buckets=HTTP_SLO_BUCKETS
+)
+
+WS_SESSION_COUNT = Counter(
+    "websocket_sessions_total",
+    "WebSocket sessions by route template and outcome",
+    ["route", "outcome"]
+)
+
+WS_SESSION_DURATION = Histogram(
+    "websocket_session_duration_seconds",
+    "WebSocket session lifetime",
+    ["route"],
+    buckets=(1, 10, 60, 300, 900, 3600, 14400)
+)
+
+AUTH_CACHE_LOOKUPS = Counter(
+    "auth_token_cache_lookups_total",
+    "Verified-JWT cache lookups",
+    ["result"]
+)
+
+ROLE_CACHE_LOOKUPS = Counter(
+    "auth_role_cache_lookups_total",
+    "Role lookups for require_role by source",
+    ["result"]
+)
+
+JWKS_REFRESH_LATENCY = Histogram(
+    "auth_jwks_refresh_seconds",
+    "JWKS fetch latency",
+    ["status"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+class SlidingWindowCounter:
+    """Success/failure totals over a ring of fixed-width time buckets; O(1) record and query."""
+
+    def __init__(self, buckets: int = 60, bucket_seconds: float = 10.0):
+        self.buckets = buckets
+        self.bucket_seconds = bucket_seconds
+        self._success = [0] * buckets
+        self._failure = [0] * buckets
+        self._head = None
+        self._total_success = 0
+        self._total_failure = 0
+        self._lock = threading.Lock()
+
+    def _advance(self, epoch: int):
+        if self._head is None:
+            self._head = epoch
+            return
+        if epoch <= self._head:
+            return
+        for e in range(max(self._head + 1, epoch - self.buckets + 1), epoch + 1):
+            idx = e % self.buckets
+            self._total_success -= self._success[idx]
+            self._total_failure -= self._failure[idx]
+            self._success[idx] = 0
+            self._failure[idx] = 0
+        self._head = epoch
+
+    def record(self, success: bool, now: float = None):
+        epoch = int((now if now is not None else time.time()) // self.bucket_seconds)
+        with self._lock:
+            self._advance(epoch)
+            idx = epoch % self.buckets
+            if success:
+                self._success[idx] += 1
+                self._total_success += 1
+            else:
+                self._failure[idx] += 1
+                self._total_failure += 1
+
+    def totals(self, now: float = None) -> Tuple[int, int]:
+        epoch = int((now if now is not None else time.time()) // self.bucket_seconds)
+        with self._lock:
+            self._advance(epoch)
+            return self._total_success, self._total_failure
+
 class MetricsService:
-    _failure_history = {}
+    _health_windows: Dict[str, SlidingWindowCounter] = {}
+    _health_lock = threading.Lock()
 
     @staticmethod
     def record_latency(engine: str, duration: float):
@@ -43,42 +233,146 @@ class MetricsService:
         MetricsService._track_health(engine, success=False)
 
     @staticmethod
-    def record_request(status: int):
-        REQUEST_COUNT.labels(method="POST", endpoint="/analyze", status=status).inc()
+    def record_request(status: int, method: str = "POST", endpoint: str = "/analyze"):
+        REQUEST_COUNT.labels(method=method, endpoint=endpoint, status=status).inc()
+
+    @staticmethod
+    def record_http(method: str, route: str, status: int, duration: float):
+        HTTP_REQUEST_COUNT.labels(method=method, route=route, status=status).inc()
+        HTTP_REQUEST_LATENCY.labels(method=method, route=route).observe(duration)
+
+    @staticmethod
+    def mean_http_latency(route: str) -> float:
+        """Mean request duration for a route as seen by this worker."""
+        total, count = 0.0, 0.0
+        for metric in HTTP_REQUEST_LATENCY.collect():
+            for sample in metric.samples:
+                if sample.labels.get("route") != route:
+                    continue
+                if sample.name.endswith("_sum"):
+                    total += sample.value
+                elif sample.name.endswith("_count"):
+                    count += sample.value
+        return round(total / count, 3) if count else 0.0
+
+    @staticmethod
+    def record_websocket(route: str, outcome: str, duration: float):
+        WS_SESSION_COUNT.labels(route=route, outcome=outcome).inc()
+        WS_SESSION_DURATION.labels(route=route).observe(duration)
+
+    @staticmethod
+    def record_auth_cache(result: str):
+        AUTH_CACHE_LOOKUPS.labels(result=result).inc()
+
+    @staticmethod
+    def record_role_cache(result: str):
+        ROLE_CACHE_LOOKUPS.labels(result=result).inc()
+
+    @staticmethod
+    def record_jwks_refresh(status: str, duration: float):
+        JWKS_REFRESH_LATENCY.labels(status=status).observe(duration)
+
+    @staticmethod
+    def mark_worker_dead(pid: int):
+        """Call from the process manager's child-exit hook so live gauges drop the dead worker."""
+        if settings.PROMETHEUS_MULTIPROC_DIR:
+            multiprocess.mark_process_dead(pid)
 
     @staticmethod
     def record_success(engine: str):
         MetricsService._track_health(engine, success=True)
 
+    @staticmethod
+    def record_notification(status: str, latency: float, batched: int = 1):
+        NOTIFICATION_COUNT.labels(status=status).inc(batched)
+        NOTIFICATION_LATENCY.observe(latency)
+
+    @staticmethod
+    def set_outbox_depth(depth: int):
+        NOTIFICATION_OUTBOX_DEPTH.set(depth)
+
+    @staticmethod
+    def record_retries(op: str, retries: int, outcome: str):
+        DEPENDENCY_RETRIES.labels(op=op, outcome=outcome).observe(retries)
+
+    @staticmethod
+    def set_scoped_client_pool_size(size: int):
+        SCOPED_CLIENT_POOL_SIZE.set(size)
+
+    @staticmethod
+    def record_scoped_client_eviction(reason: str):
+        SCOPED_CLIENT_EVICTIONS.labels(reason=reason).inc()
+
+    @staticmethod
+    def record_db_read(target: str, op: str, duration: float):
+        DB_READ_LATENCY.labels(target=target, op=op).observe(duration)
+
+    @staticmethod
+    def record_read_route(target: str, reason: str):
+        DB_READ_ROUTES.labels(target=target, reason=reason).inc()
+
+    @staticmethod
+    def set_replica_lag(seconds: float):
+        REPLICA_LAG.set(seconds)
+
+    @staticmethod
+    def record_hedge(op: str, outcome: str):
+        """outcome: "sent", "won" (the hedge answered first) or "skipped" (over budget)."""
+        if outcome == "sent":
+            HEDGED_READS.labels(op=op).inc()
+        elif outcome == "won":
+            HEDGED_READ_WINS.labels(op=op).inc()
+        else:
+            HEDGES_SKIPPED.labels(op=op).inc()
+
+    @staticmethod
+    def set_sink_depth(sink: str, depth: int):
+        SINK_BUFFER_DEPTH.labels(sink=sink).set(depth)
+
+    @staticmethod
+    def record_sink_flush(sink: str, status: str, latency: float, rows: int):
+        SINK_FLUSH_LATENCY.labels(sink=sink, status=status).observe(latency)
+        SINK_ROWS.labels(sink=sink, status=status).inc(rows)
+
+    @staticmethod
+    def record_sink_dead_letter(sink: str, rows: int):
+        SINK_ROWS.labels(sink=sink, status="dead_letter").inc(rows)
+
+    @classmethod
+    def _health_window(cls, engine: str) -> SlidingWindowCounter:
+        window = cls._health_windows.get(engine)
+        if window is None:
+            with cls._health_lock:
+                window = cls._health_windows.setdefault(engine, SlidingWindowCounter())
+        return window
+
     @classmethod
     def _track_health(cls, engine: str, success: bool):
-        now = time.time()
-        if engine not in cls._failure_history:
-            cls._failure_history[engine] = []
-        
-        cls._failure_history[engine].append((now, success))
-        cls._failure_history[engine] = [x for x in cls._failure_history[engine] if now - x[0] < 600]
-        
-        data = cls._failure_history[engine]
-        if len(data) >= 10:
-            failures = len([x for x in data if not x[1]])
-            rate = failures / len(data)
-            if rate > 0.1:
-                 logger.critical(f"CRITICAL_SYS_ALERT: {engine} failure rate is {rate*100:.1f}%!")
+        window = cls._health_window(engine)
+        window.record(success)
+        if not success:
+            successes, failures = window.totals()
+            total = successes + failures
+            if total >= 10 and failures / total > 0.1:
+                logger.critical(f"CRITICAL_SYS_ALERT: {engine} failure rate is {failures / total * 100:.1f}%!")
 
     @classmethod
     def get_health_report(cls) -> Dict[str, Any]:
         report = {}
-        for engine, data in cls._failure_history.items():
-            if not data: continue
-            failures = len([x for x in data if not x[1]])
+        for engine, window in list(cls._health_windows.items()):
+            successes, failures = window.totals()
+            total = successes + failures
+            if not total: continue
             report[engine] = {
-                "status": "UNHEALTHY" if (failures / len(data)) > 0.1 else "HEALTHY",
-                "error_rate": f"{(failures / len(data)) * 100:.1f}%",
-                "sample_size": len(data)
+                "status": "UNHEALTHY" if (failures / total) > 0.1 else "HEALTHY",
+                "error_rate": f"{(failures / total) * 100:.1f}%",
+                "sample_size": total
             }
         return report
 
 def metrics_endpoint():
-    health = MetricsService.get_health_report()
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=settings.PROMETHEUS_MULTIPROC_DIR)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
     return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,220 @@
+import atexit
+import logging
+import queue
+import random
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, Any, List, Optional
+from backend.services.metrics_service import MetricsService
+from backend.config import settings
+
+logger = logging.getLogger("NotificationDispatcher")
+
+
+class SMTPConnectionPool:
+    """Keeps authenticated SMTP sessions open between sends and recycles idle ones."""
+
+    def __init__(self, host: str, port: int, user: str = "", password: str = "", use_tls: bool = True,
+                 size: int = 2, idle_timeout: float = 60.0, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.user:
+            server.login(self.user, self.password)
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        server = None
+        try:
+            try:
+                server, last_used = self._idle.get_nowait()
+                if time.monotonic() - last_used > self.idle_timeout:
+                    self._close(server)
+                    server = None
+            except queue.Empty:
+                pass
+            if server is None:
+                server = self._connect()
+            yield server
+            self._idle.put((server, time.monotonic()))
+        except Exception:
+            if server is not None:
+                self._close(server)
+            raise
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+
+class NotificationDispatcher:
+    """
+    Outbox for clinical emails. `enqueue` never blocks the caller; worker threads
+    deliver through the connection pool with jittered exponential backoff. With a
+    digest window, messages to the same recipient are batched into one email.
+    """
+
+    def __init__(self, pool: SMTPConnectionPool, sender: str, workers: int = 2, max_retries: int = 3,
+                 backoff_base: float = 0.5, digest_window: float = 0.0):
+        self.pool = pool
+        self.sender = sender
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.digest_window = digest_window
+        self._outbox: "queue.Queue" = queue.Queue()
+        self._digests: Dict[str, Dict[str, Any]] = {}
+        self._digest_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"smtp-dispatch-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+            if self.digest_window > 0:
+                t = threading.Thread(target=self._digest_flusher, name="smtp-digest", daemon=True)
+                t.start()
+                self._threads.append(t)
+            atexit.register(self.stop)
+
+    def enqueue(self, to: str, subject: str, body: str) -> bool:
+        self.start()
+        message = {"to": to, "subject": subject, "body": body, "enqueued_at": time.monotonic()}
+        if self.digest_window > 0:
+            with self._digest_lock:
+                digest = self._digests.setdefault(to, {"due_at": time.monotonic() + self.digest_window, "messages": []})
+                digest["messages"].append(message)
+        else:
+            self._outbox.put(message)
+        MetricsService.set_outbox_depth(self._outbox.qsize())
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        self._flush_digests(force=True)
+        deadline = time.monotonic() + timeout
+        while self._outbox.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stopping.set()
+        self.pool.close()
+
+    def _digest_flusher(self):
+        while not self._stopping.is_set():
+            self._flush_digests()
+            self._stopping.wait(min(1.0, self.digest_window))
+
+    def _flush_digests(self, force: bool = False):
+        now = time.monotonic()
+        with self._digest_lock:
+            due = [to for to, d in self._digests.items() if force or d["due_at"] <= now]
+            batches = [(to, self._digests.pop(to)["messages"]) for to in due]
+        for to, messages in batches:
+            if len(messages) == 1:
+                self._outbox.put(messages[0])
+                continue
+            self._outbox.put({
+                "to": to,
+                "subject": f"Maternal Health Alert Digest ({len(messages)} alerts)",
+                "body": "\n\n---\n\n".join(f"{m['subject']}\n{m['body']}" for m in messages),
+                "enqueued_at": min(m["enqueued_at"] for m in messages),
+                "batched": len(messages)
+            })
+
+    def _worker(self):
+        while not self._stopping.is_set():
+            try:
+                message = self._outbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._deliver(message)
+            finally:
+                self._outbox.task_done()
+                MetricsService.set_outbox_depth(self._outbox.qsize())
+
+    def _deliver(self, message: Dict[str, Any]):
+        mime = MIMEMultipart()
+        mime['From'] = self.sender
+        mime['To'] = message["to"]
+        mime['Subject'] = message["subject"]
+        mime.attach(MIMEText(message["body"], 'plain'))
+        payload = mime.as_string()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.pool.connection() as server:
+                    server.sendmail(self.sender, message["to"], payload)
+                MetricsService.record_notification("sent", time.monotonic() - message["enqueued_at"], message.get("batched", 1))
+                return
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code >= 500 or attempt >= self.max_retries:
+                    logger.error(f"Email to {message['to']} rejected ({e.smtp_code}): {e.smtp_error}")
+                    break
+                self._backoff(attempt, e)
+            except (smtplib.SMTPException, OSError) as e:
+                if attempt >= self.max_retries:
+                    logger.error(f"Email to {message['to']} failed after {attempt + 1} attempts: {e}")
+                    break
+                self._backoff(attempt, e)
+        MetricsService.record_notification("failed", time.monotonic() - message["enqueued_at"], message.get("batched", 1))
+
+    def _backoff(self, attempt: int, error: Exception):
+        wait = random.uniform(0, self.backoff_base * (2 ** attempt))
+        logger.warning(f"SMTP Retry {attempt + 1}/{self.max_retries} after {wait:.2f}s due to: {error}")
+        time.sleep(wait)
+
+
+def create_dispatcher() -> Optional[NotificationDispatcher]:
+    if not settings.SMTP_SERVER:
+        return None
+    pool = SMTPConnectionPool(
+        settings.SMTP_SERVER, settings.SMTP_PORT,
+        user=settings.SMTP_USER, password=settings.SMTP_PASSWORD,
+        use_tls=settings.SMTP_USE_TLS, size=settings.SMTP_POOL_SIZE,
+        idle_timeout=settings.SMTP_IDLE_TIMEOUT
+    )
+    return NotificationDispatcher(
+        pool,
+        sender=settings.SMTP_FROM or settings.SMTP_USER or settings.ADMIN_EMAIL,
+        workers=settings.SMTP_POOL_SIZE,
+        max_retries=settings.SMTP_MAX_RETRIES,
+        digest_window=settings.SMTP_DIGEST_WINDOW
+    )
@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import sys
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from backend.config import settings
+
+logger = logging.getLogger("PartitionArchiver")
+
+PARTITIONED_TABLES = ("audit_logs", "chat_messages")
+PARTITION_NAME = re.compile(r"^(?P<parent>[a-z_]+)_p(?P<year>\d{4})_(?P<month>\d{2})$")
+MANIFEST = "manifest.json"
+
+
+def _open_write(path: str, compression: str) -> io.TextIOBase:
+    if compression == "zstd":
+        return io.TextIOWrapper(zstandard.ZstdCompressor(level=10).stream_writer(open(path, "wb")), encoding="utf-8")
+    return gzip.open(path, "wt", encoding="utf-8")
+
+
+def _open_read(path: str) -> io.TextIOBase:
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+    return gzip.open(path, "rt", encoding="utf-8")
+
+
+def _month_start(months_ago: int, today: Optional[date] = None) -> date:
+    today = today or datetime.now(timezone.utc).date()
+    index = today.year * 12 + today.month - 1 - months_ago
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def load_manifest(archive_dir: str = settings.ARCHIVE_DIR) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(archive_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"partitions": []}
+
+
+def _save_manifest(archive_dir: str, manifest: Dict[str, Any]):
+    path = os.path.join(archive_dir, MANIFEST)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f"{path}.tmp", path)
+
+
+def read_archived(table: str, since: Optional[str] = None, until: Optional[str] = None,
+                  archive_dir: str = settings.ARCHIVE_DIR) -> Iterator[Dict[str, Any]]:
+    """Rows of archived months of `table`, oldest month first; `since`/`until` are inclusive "YYYY-MM" bounds."""
+    entries = sorted(
+        (e for e in load_manifest(archive_dir)["partitions"] if e["table"] == table),
+        key=lambda e: e["month"]
+    )
+    for entry in entries:
+        if (since and entry["month"] < since) or (until and entry["month"] > until):
+            continue
+        with _open_read(os.path.join(archive_dir, entry["path"])) as f:
+            for line in f:
+                yield json.loads(line)
+
+
+class PartitionArchiver:
+    """
+    Exports monthly partitions older than `keep_months` to compressed JSONL
+    (zstd, gzip when zstandard is missing), records them in a manifest, then
+    detaches them from the parent. A partition is only detached after its file
+    is on disk with a row count matching the table, so a crash at any point
+    leaves it either attached or fully archived.
+    """
+
+    def __init__(self, dsn: str, archive_dir: str, keep_months: int, drop_detached: bool = False):
+        self.dsn = dsn
+        self.archive_dir = archive_dir
+        self.keep_months = keep_months
+        self.drop_detached = drop_detached
+        self.compression = "zstd" if zstandard is not None else "gzip"
+
+    async def run(self, dry_run: bool = False) -> List[Dict[str, Any]]:
+        if asyncpg is None:
+            logger.error("asyncpg not installed; cannot archive partitions")
+            return []
+        conn = await asyncpg.connect(self.dsn)
+        archived = []
+        try:
+            for table in PARTITIONED_TABLES:
+                created = await conn.fetchval("SELECT public.ensure_monthly_partitions($1)", table)
+                if created:
+                    logger.info(f"Created {created} upcoming partitions for {table}")
+                for partition, month in await self._cold_partitions(conn, table):
+                    if dry_run:
+                        logger.info(f"Would archive {partition}")
+                        continue
+                    archived.append(await self._archive(conn, table, partition, month))
+        finally:
+            await conn.close()
+        return archived
+
+    async def _cold_partitions(self, conn, table: str) -> List[Tuple[str, str]]:
+        rows = await conn.fetch(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass('public.' || $1) ORDER BY c.relname",
+            table
+        )
+        cutoff = _month_start(self.keep_months)
+        cold = []
+        for row in rows:
+            match = PARTITION_NAME.match(row["relname"])
+            if not match or match["parent"] != table:
+                continue
+            if date(int(match["year"]), int(match["month"]), 1) < cutoff:
+                cold.append((row["relname"], f"{match['year']}-{match['month']}"))
+        return cold
+
+    async def _archive(self, conn, table: str, partition: str, month: str) -> Dict[str, Any]:
+        relative = os.path.join(table, f"{month}.jsonl.{'zst' if self.compression == 'zstd' else 'gz'}")
+        path = os.path.join(self.archive_dir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        digest = hashlib.sha256()
+        rows = 0
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            expected = await conn.fetchval(f'SELECT count(*) FROM public."{partition}"')
+            with _open_write(f"{path}.partial", self.compression) as out:
+                async for record in conn.cursor(f'SELECT row_to_json(t)::text AS line FROM public."{partition}" t ORDER BY created_at, id', prefetch=5000):
+                    line = record["line"] + "\n"
+                    out.write(line)
+                    digest.update(line.encode("utf-8"))
+                    rows += 1
+        if rows != expected:
+            raise RuntimeError(f"{partition}: exported {rows} rows, table has {expected}")
+        os.replace(f"{path}.partial", path)
+
+        entry = {
+            "table": table,
+            "month": month,
+            "partition": partition,
+            "path": relative,
+            "rows": rows,
+            "content_sha256": digest.hexdigest(),
+            "compression": self.compression,
+            "archived_at": datetime.now(timezone.utc).isoformat(),
+            "dropped": self.drop_detached
+        }
+        manifest = load_manifest(self.archive_dir)
+        manifest["partitions"] = [e for e in manifest["partitions"] if (e["table"], e["month"]) != (table, month)] + [entry]
+        _save_manifest(self.archive_dir, manifest)
+
+        async with conn.transaction():
+            await conn.execute("SET LOCAL lock_timeout = '5s'")
+            await conn.execute(f'ALTER TABLE public.{table} DETACH PARTITION public."{partition}"')
+            if self.drop_detached:
+                await conn.execute(f'DROP TABLE public."{partition}"')
+        logger.info(f"Archived {partition}: {rows} rows -> {path}")
+        return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive cold audit_logs/chat_messages partitions, or read archived months.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive = commands.add_parser("archive")
+    archive.add_argument("--dry-run", action="store_true")
+    read = commands.add_parser("read")
+    read.add_argument("table", choices=PARTITIONED_TABLES)
+    read.add_argument("--since", help="first month, YYYY-MM")
+    read.add_argument("--until", help="last month, YYYY-MM")
+    args = parser.parse_args()
+
+    if args.command == "read":
+        for row in read_archived(args.table, args.since, args.until):
+            sys.stdout.write(json.dumps(row) + "\n")
+        return
+    if not settings.DATABASE_URL:
+        parser.error("DATABASE_URL is required to archive partitions")
+    archiver = PartitionArchiver(settings.DATABASE_URL, settings.ARCHIVE_DIR, settings.ARCHIVE_KEEP_MONTHS, settings.ARCHIVE_DROP_DETACHED)
+    for entry in asyncio.run(archiver.run(dry_run=args.dry_run)):
+        print(f"{entry['partition']}: {entry['rows']} rows -> {entry['path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from backend.services.metrics_service import MetricsService
+
+logger = logging.getLogger("ReadRouter")
+
+
+class ReadRouter:
+    """
+    Chooses primary or read replica for a read. The replica is used only while
+    its measured replay lag is under `max_lag`, and never for a user who wrote
+    through this worker in the last `ryw_window` seconds (read-your-writes).
+    Lag is probed in the background every `check_interval` seconds via
+    `lag_probe`; a failed probe counts as infinite lag.
+    """
+
+    def __init__(self, has_replica: bool, lag_probe: Callable[[], float], max_lag: float, ryw_window: float, check_interval: float):
+        self.has_replica = has_replica
+        self.lag_probe = lag_probe
+        self.max_lag = max_lag
+        self.ryw_window = ryw_window
+        self.check_interval = check_interval
+        self.lag = math.inf
+        self._last_write: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def note_write(self, user_id: Optional[str]):
+        if not self.has_replica or not user_id:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._last_write[str(user_id)] = now
+            if len(self._last_write) > 10000:
+                cutoff = now - self.ryw_window
+                self._last_write = {u: t for u, t in self._last_write.items() if t > cutoff}
+
+    def route(self, user_id: Optional[str] = None) -> Tuple[str, str]:
+        """Returns (target, reason)."""
+        if not self.has_replica:
+            return "primary", "no_replica"
+        self._ensure_probe()
+        if user_id:
+            with self._lock:
+                wrote_at = self._last_write.get(str(user_id))
+            if wrote_at is not None and time.monotonic() - wrote_at < self.ryw_window:
+                return "primary", "read_your_writes"
+        if self.lag > self.max_lag:
+            return "primary", "replica_lagging"
+        return "replica", "replica"
+
+    def _ensure_probe(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._probe_loop, name="replica-lag-probe", daemon=True)
+                self._thread.start()
+
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.check_interval)
+
+    def probe(self):
+        try:
+            self.lag = float(self.lag_probe())
+        except Exception as e:
+            if self.lag != math.inf:
+                logger.warning(f"Replica lag probe failed, routing reads to primary: {e}")
+            self.lag = math.inf
+        MetricsService.set_replica_lag(self.lag if self.lag != math.inf else -1)
+
+    def stop(self):
+        self._stop.set()
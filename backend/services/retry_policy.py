@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+from backend.services.metrics_service import MetricsService
+from backend.config import settings
+
+logger = logging.getLogger("RetryPolicy")
+
+# Absolute time.monotonic() by which the current request must finish; None outside a request.
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# SQLSTATE classes/codes worth retrying: connection failures, serialization
+# conflicts, deadlocks, resource exhaustion and statement timeouts.
+RETRYABLE_SQLSTATE_PREFIXES = ("08", "40001", "40P01", "53", "57014", "57P")
+
+
+def set_deadline(seconds: float):
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+def clear_deadline():
+    _deadline.set(None)
+
+
+def time_remaining() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _status_of(exc: BaseException) -> Optional[int]:
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None) or getattr(exc, "status_code", None)
+    if status is None:
+        code = getattr(exc, "code", None)
+        if isinstance(code, int) or (isinstance(code, str) and code.isdigit() and len(code) == 3):
+            status = int(code)
+    return status
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """429/5xx, timeouts and transport failures are transient; other 4xx and programming errors are not."""
+    if not isinstance(exc, Exception):
+        return False
+    if isinstance(exc, (httpx.TimeoutException, httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    status = _status_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    code = getattr(exc, "code", None)
+    if isinstance(code, str) and code:
+        return code.startswith(RETRYABLE_SQLSTATE_PREFIXES)
+    return False
+
+
+def is_unsent(exc: BaseException) -> bool:
+    """The request never reached the server: connecting failed or no pooled connection was free."""
+    return isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, ConnectionRefusedError))
+
+
+def is_rejected(exc: BaseException) -> bool:
+    """
+    The server answered that nothing was applied: rate limited, or the statement
+    failed with a SQLSTATE and rolled back. Class 08 is excluded because a
+    connection lost mid-commit leaves the outcome unknown.
+    """
+    if _status_of(exc) == 429:
+        return True
+    code = getattr(exc, "code", None)
+    return isinstance(code, str) and len(code) == 5 and not code.startswith("08")
+
+
+def is_retryable_write(exc: BaseException) -> bool:
+    """
+    Classifier for non-idempotent writes: only retry when the write cannot have
+    been applied. A read timeout or a 502/504 may arrive after the row was
+    committed, so retrying those would insert it twice.
+    """
+    return is_retryable(exc) and (is_unsent(exc) or is_rejected(exc))
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Full-jitter exponential backoff bounded by the request deadline. A retry is
+    skipped when the error is not transient or when sleeping would overrun the
+    time left for the request; the last error is then raised to the caller.
+    """
+
+    def __init__(self, max_attempts: int = None, base_delay: float = None, max_delay: float = None,
+                 classifier: Callable[[BaseException], bool] = is_retryable):
+        self.max_attempts = max_attempts or settings.RETRY_MAX_ATTEMPTS
+        self.base_delay = settings.RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = settings.RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.classifier = classifier
+
+    def _next_delay(self, attempt: int, exc: BaseException) -> Optional[float]:
+        if attempt + 1 >= self.max_attempts or not self.classifier(exc):
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        delay = max(delay, _retry_after(exc) or 0.0)
+        remaining = time_remaining()
+        if remaining is not None and delay >= remaining:
+            return None
+        return delay
+
+    def run(self, op: str, func: Callable[[], Any]) -> Any:
+        attempt = 0
+        while True:
+            try:
+                result = func()
+                MetricsService.record_retries(op, attempt, "ok")
+                return result
+            except BaseException as e:
+                delay = self._next_delay(attempt, e)
+                if delay is None:
+                    MetricsService.record_retries(op, attempt, "error")
+                    raise
+                logger.warning(f"{op}: attempt {attempt + 1}/{self.max_attempts} failed ({type(e).__name__}: {e}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    async def run_async(self, op: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        attempt = 0
+        while True:
+            try:
+                result = await func()
+                MetricsService.record_retries(op, attempt, "ok")
+                return result
+            except BaseException as e:
+                delay = self._next_delay(attempt, e)
+                if delay is None:
+                    MetricsService.record_retries(op, attempt, "error")
+                    raise
+                logger.warning(f"{op}: attempt {attempt + 1}/{self.max_attempts} failed ({type(e).__name__}: {e}); retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
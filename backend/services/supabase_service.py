@@ -1,20 +1,112 @@
+import jwt
+import time
+import inspect
+import asyncio
+import hashlib
 import logging
+import threading
 import httpx
-from typing import Optional, Dict, Any, List
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Callable
 from uuid import uuid4
-from datetime import datetime
+from datetime import datetime, timezone
 try:
     from supabase import create_client, Client
+    try:
+        from supabase import SyncClientOptions as ClientOptions
+    except ImportError:
+        from supabase.lib.client_options import ClientOptions
 except ImportError:
     create_client = None
     Client = None
+    ClientOptions = None
 from backend.schemas.request_schema import AnalyzeRequest
 from backend.schemas.internal_models import RuleEngineResult, MLEngineResult, RiskLevel
 from backend.services.metrics_service import MetricsService
+from backend.services.audit_logger import AuditLogger
+from backend.services.retry_policy import RetryPolicy, is_retryable_write, is_rejected, is_unsent
+from backend.services.read_router import ReadRouter
+from backend.services.hedged_reads import HedgedReader
 from backend.config import settings
 
 logger = logging.getLogger(__name__)
 
+class ScopedClientPool:
+    """
+    LRU of RLS-scoped Supabase clients keyed by token digest. Entries expire with
+    their token, and every client rides on one shared keep-alive transport so a
+    scoped read costs a request, not a new TCP/TLS handshake.
+    """
+
+    def __init__(self, url: str, anon_key: str, max_size: int = 256):
+        self.url = url
+        self.anon_key = anon_key
+        self.max_size = max_size
+        self.transport = httpx.HTTPTransport(
+            limits=httpx.Limits(max_connections=settings.POOL_MAX_SIZE, max_keepalive_connections=settings.POOL_MAX_SIZE)
+        )
+        self._entries: "OrderedDict[str, Tuple[float, Client]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def supported() -> bool:
+        """Whether the installed supabase-py takes an httpx_client; without it every scoped client would open its own pool."""
+        try:
+            return ClientOptions is not None and "httpx_client" in inspect.signature(ClientOptions).parameters
+        except (TypeError, ValueError):
+            return False
+
+    def get(self, access_token: str) -> Optional[Client]:
+        digest = hashlib.sha256(access_token.encode()).hexdigest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(digest)
+                return entry[1]
+            if entry:
+                del self._entries[digest]
+                MetricsService.record_scoped_client_eviction("expired")
+                MetricsService.set_scoped_client_pool_size(len(self._entries))
+
+        expires_at = self._token_expiry(access_token)
+        if expires_at <= now:
+            return None
+        client = self._build(access_token)
+        if client is None:
+            return None
+
+        with self._lock:
+            self._entries[digest] = (expires_at, client)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                # Evicted clients are dropped, not closed: closing would tear down the shared transport.
+                self._entries.popitem(last=False)
+                MetricsService.record_scoped_client_eviction("lru")
+            MetricsService.set_scoped_client_pool_size(len(self._entries))
+        return client
+
+    @staticmethod
+    def _token_expiry(access_token: str) -> float:
+        try:
+            exp = jwt.decode(access_token, options={"verify_signature": False}).get("exp")
+        except jwt.PyJWTError:
+            return 0.0
+        return float(exp) if exp else time.time() + 60
+
+    def _build(self, access_token: str) -> Optional[Client]:
+        auth_headers = {"Authorization": f"Bearer {access_token}"}
+        http_client = httpx.Client(transport=self.transport, timeout=settings.POOL_TIMEOUT, headers=auth_headers)
+        try:
+            options = ClientOptions(headers=auth_headers, httpx_client=http_client)
+            client = create_client(self.url, self.anon_key, options=options)
+            client.postgrest.auth(access_token)
+            return client
+        except BaseException as e:
+            logger.error(f"Failed to create scoped Supabase client: {e}")
+            return None
+
+
 class SupabaseService:
     _instance = None
     def __new__(cls):
@@ -25,6 +117,16 @@ class SupabaseService:
     def __init__(self):
         if not hasattr(self, '_initialized'):
             self.http_client: Optional[httpx.Client] = None
+            self.retry_policy = RetryPolicy()
+            self.write_retry_policy = RetryPolicy(classifier=is_retryable_write)
+            self.hedger = HedgedReader(
+                settings.HEDGED_READS_ENABLED,
+                percentile=settings.HEDGE_PERCENTILE,
+                max_ratio=settings.HEDGE_MAX_RATIO,
+                min_samples=settings.HEDGE_MIN_SAMPLES,
+                min_delay=settings.HEDGE_MIN_DELAY,
+                max_workers=settings.HEDGE_MAX_WORKERS
+            )
             self._init_client()
             self._initialized = True
 
@@ -32,6 +134,12 @@ class SupabaseService:
         self.url = settings.SUPABASE_URL
         self.key = settings.SUPABASE_KEY
         self.client: Optional[Client] = None
+        self._scoped_pool: Optional[ScopedClientPool] = None
+        if create_client and self.url and settings.SUPABASE_ANON_KEY:
+            if ScopedClientPool.supported():
+                self._scoped_pool = ScopedClientPool(self.url, settings.SUPABASE_ANON_KEY, max_size=settings.SCOPED_CLIENT_POOL_SIZE)
+            else:
+                logger.error("Installed supabase-py cannot share a transport (no httpx_client option); RLS-scoped reads use the service client")
         if create_client and self.url and self.key:
             try:
                 self.client = create_client(self.url, self.key)
@@ -39,35 +147,96 @@ class SupabaseService:
                 logger.error(f"Failed to initialize Supabase: {e}")
         else:
             logger.warning(f"Supabase Init Skip")
+        self.replica_client: Optional[Client] = None
+        if self.client and settings.READ_REPLICA_URL:
+            try:
+                self.replica_client = create_client(settings.READ_REPLICA_URL, settings.READ_REPLICA_KEY or self.key)
+            except BaseException as e:
+                logger.error(f"Failed to initialize read replica, reading from primary: {e}")
+        self.read_router = ReadRouter(
+            self.replica_client is not None, self._replica_lag,
+            max_lag=settings.REPLICA_MAX_LAG,
+            ryw_window=settings.READ_YOUR_WRITES_WINDOW,
+            check_interval=settings.REPLICA_LAG_CHECK_INTERVAL
+        )
+
+    def _replica_lag(self) -> float:
+        return float(self.replica_client.rpc("replication_lag_seconds").execute().data)
 
     def get_scoped_client(self, access_token: str) -> Optional[Client]:
-        if not self.url: return None
+        """Client that runs as the token's user so RLS applies; None without SUPABASE_ANON_KEY or once the token expired."""
+        if self._scoped_pool is None: return None
+        return self._scoped_pool.get(access_token)
+
+    def _with_retry(self, func, *args, op: str = "supabase", idempotent: bool = True, **kwargs):
+        """Pass `idempotent=False` for writes that must not be re-sent once the server may have applied them."""
+        policy = self.retry_policy if idempotent else self.write_retry_policy
         try:
-            http_client = httpx.Client(
-                limits=httpx.Limits(max_connections=settings.POOL_MAX_SIZE, max_keepalive_connections=10),
-                timeout=settings.POOL_TIMEOUT,
-                headers={"Authorization": f"Bearer {access_token}"}
-            )
-            return create_client(self.url, access_token, options={"http_client": http_client})
-        except BaseException as e:
-            logger.error(f"Failed to create scoped Supabase client: {e}")
+            res = policy.run(op, lambda: func(*args, **kwargs))
+            MetricsService.record_success("supabase")
+            return res
+        except Exception as e:
+            logger.error(f"{op} failed: {type(e).__name__}: {e}")
+            MetricsService.record_error("supabase", type(e).__name__)
+            return None
+
+    async def _with_retry_async(self, func, *args, op: str = "supabase", **kwargs):
+        """Async variant: each attempt runs in a worker thread and backoff sleeps on the event loop."""
+        try:
+            res = await self.retry_policy.run_async(op, lambda: asyncio.to_thread(func, *args, **kwargs))
+            MetricsService.record_success("supabase")
+            return res
+        except Exception as e:
+            logger.error(f"{op} failed: {type(e).__name__}: {e}")
+            MetricsService.record_error("supabase", type(e).__name__)
             return None
 
-    def _with_retry(self, func, *args, max_retries: int = 2, **kwargs):
-        import time
-        for attempt in range(max_retries + 1):
+    def hedged(self, op: str, call: Callable[[], Any]) -> Any:
+        """Runs an idempotent `call()`, sending a second copy if it outlives the op's p95 (HEDGED_READS_ENABLED). Raises on failure."""
+        return self.hedger.run(op, call)
+
+    def read(self, op: str, query: Callable[[Client], Any], user_id: Optional[str] = None, hedge: bool = False):
+        """
+        Runs a read-only `query(client)` on the target picked by the read router,
+        falling back to the primary if the replica errors. Pass the reading
+        user's id to get read-your-writes, and `hedge=True` for latency-critical
+        reads. None on failure.
+        """
+        def run(client: Client):
+            return self.hedged(op, lambda: query(client)) if hedge else query(client)
+
+        target, reason = self.read_router.route(user_id)
+        if target == "replica":
+            start = time.perf_counter()
             try:
-                res = func(*args, **kwargs)
-                MetricsService.record_success("supabase")
+                res = run(self.replica_client)
+                MetricsService.record_db_read("replica", op, time.perf_counter() - start)
+                MetricsService.record_read_route("replica", reason)
                 return res
-            except BaseException as e:
-                if attempt < max_retries:
-                    wait = (2 ** attempt)
-                    logger.warning(f"Retry {attempt+1}/{max_retries}: {e}")
-                    time.sleep(wait)
-                else:
-                    MetricsService.record_error("supabase", type(e).__name__)
-                    return None
+            except Exception as e:
+                logger.warning(f"{op} failed on replica, retrying on primary: {type(e).__name__}: {e}")
+                target, reason = "primary", "replica_error"
+        MetricsService.record_read_route(target, reason)
+        start = time.perf_counter()
+        res = self._with_retry(lambda: run(self.client), op=op)
+        MetricsService.record_db_read("primary", op, time.perf_counter() - start)
+        return res
+
+    def scoped_read(self, op: str, query: Callable[[Client], Any], access_token: Optional[str], user_id: Optional[str] = None, hedge: bool = False):
+        """
+        Runs a read-only `query(client)` as the token's user, on the primary, so
+        RLS decides which rows come back. Without a scoped client it falls back to
+        `read()` on the service-role client, so `query` must still filter to the
+        user itself. None on failure.
+        """
+        client = self.get_scoped_client(access_token) if access_token else None
+        if client is None:
+            return self.read(op, query, user_id=user_id, hedge=hedge)
+        MetricsService.record_read_route("primary", "scoped")
+        start = time.perf_counter()
+        res = self._with_retry(lambda: self.hedged(op, lambda: query(client)) if hedge else query(client), op=op)
+        MetricsService.record_db_read("primary", op, time.perf_counter() - start)
+        return res
 
     def save_patient_input(self, user_id: str, data: AnalyzeRequest, ip_address: Optional[str] = None, user_agent: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
         if not self.client: return str(uuid4())
@@ -80,9 +249,9 @@ class SupabaseService:
                 "diabetes_history": bool(data.diabetes_history), "previous_complications": bool(data.previous_complications),
                 "fever": bool(data.fever), "blurred_vision": bool(data.blurred_vision), "reduced_fetal_movement": bool(data.reduced_fetal_movement),
                 "severe_abdominal_pain": bool(data.severe_abdominal_pain), "ip_address": ip_address, "user_agent": user_agent,
-                "request_metadata": metadata, "created_at": datetime.now().isoformat()
+                "request_metadata": metadata, "created_at": datetime.now(timezone.utc).isoformat()
             }
-            response = self._with_retry(lambda: self.client.table("patient_inputs").insert(input_record).execute())
+            response = self._with_retry(lambda: self.client.table("patient_inputs").insert(input_record).execute(), op="patient_inputs.insert", idempotent=False)
             return response.data[0].get('id') if response and hasattr(response, 'data') and response.data else None
         except BaseException as e:
             logger.error(f"Supabase Input Error: {e}")
@@ -90,6 +259,7 @@ class SupabaseService:
 
     def save_analysis_atomic(self, user_id: str, data: AnalyzeRequest, rule_res: RuleEngineResult, ml_res: Optional[MLEngineResult], final_risk: str, explanation: Dict[str, Any], fusion_reason: str, ip: str) -> Optional[str]:
         if not self.client: return str(uuid4())
+        self.read_router.note_write(user_id)
         try:
             rpc_payload = {
                 "p_user_id": user_id, "p_age": data.age, "p_trimester": data.trimester, "p_trimester_weeks": data.trimester_weeks,
@@ -128,11 +298,96 @@ class SupabaseService:
                          }).execute()
                      except BaseException:
                          pass
+                     # The RPC writes the assessment's audit row; without it, queue one here.
+                     AuditLogger.record_assessment(rule_res, ml_res, final_risk, user_id, input_id, ip)
                      return input_id
         except BaseException as e:
             logger.error(f"Supabase Atomic Error: {e}")
         return None
 
+    @staticmethod
+    def _bulk_row(user_id: str, data: AnalyzeRequest, rule_res: RuleEngineResult, ml_res: Optional[MLEngineResult], final_risk: str, explanation: Dict[str, Any], fusion_reason: str, ip: str) -> Dict[str, Any]:
+        return {
+            "user_id": user_id, "age": data.age, "trimester": data.trimester, "trimester_weeks": data.trimester_weeks,
+            "blood_pressure": data.blood_pressure, "hemoglobin": data.hemoglobin, "heart_rate": data.heart_rate,
+            "swelling": bool(data.swelling), "headache_severity": data.headache_severity,
+            "vaginal_bleeding": bool(data.vaginal_bleeding), "diabetes_history": bool(data.diabetes_history),
+            "previous_complications": bool(data.previous_complications), "fever": bool(data.fever),
+            "blurred_vision": bool(data.blurred_vision), "reduced_fetal_movement": bool(data.reduced_fetal_movement),
+            "severe_abdominal_pain": bool(data.severe_abdominal_pain), "ip_address": ip,
+            "rule_risk": rule_res.risk_level.value, "rule_score": rule_res.score, "rule_flags": rule_res.emergency_flags,
+            "ml_risk": ml_res.predicted_risk.value if ml_res else None,
+            "ml_probabilities": ml_res.probabilities if ml_res else None,
+            "ml_confidence": ml_res.confidence if ml_res and hasattr(ml_res, 'confidence') else None,
+            "final_risk": final_risk, "fusion_reason": fusion_reason, "explanation": explanation,
+            "analysis_status": explanation.get("status", "completed")
+        }
+
+    def save_analysis_bulk(self, items: List[Dict[str, Any]], chunk_size: Optional[int] = None) -> List[Optional[str]]:
+        """
+        Persists many assessments through `save_clinical_assessments_bulk`, one
+        transaction per chunk. Each item takes the keyword arguments of
+        `save_analysis_atomic`; the returned IDs line up with `items`.
+
+        A chunk is re-saved row by row only when it certainly did not commit
+        (never sent, or rolled back with a SQLSTATE). Any other failure, such
+        as a read timeout or an unexpected reply, may have committed, so its
+        rows get None instead of being written a second time.
+        """
+        if not self.client: return [str(uuid4()) for _ in items]
+        for user_id in {item["user_id"] for item in items}:
+            self.read_router.note_write(user_id)
+        chunk_size = chunk_size or settings.BULK_SAVE_CHUNK_SIZE
+        ids: List[Optional[str]] = []
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            rows = [self._bulk_row(**item) for item in chunk]
+            try:
+                res = self.write_retry_policy.run("assessments.bulk_save", lambda: self.client.rpc("save_clinical_assessments_bulk", {"p_rows": rows}).execute())
+            except Exception as e:
+                if is_unsent(e) or is_rejected(e):
+                    # Nothing was written; retry row by row so one bad row does not sink the batch.
+                    logger.warning(f"Bulk RPC failed for {len(chunk)} rows, saving individually: {e}")
+                    ids.extend(self.save_analysis_atomic(**item) for item in chunk)
+                else:
+                    logger.error(f"Bulk RPC outcome unknown for {len(chunk)} rows, not re-sending: {type(e).__name__}: {e}")
+                    MetricsService.record_error("supabase", type(e).__name__)
+                    ids.extend([None] * len(chunk))
+                continue
+            chunk_ids = res.data or []
+            if len(chunk_ids) != len(chunk):
+                logger.error(f"Bulk RPC returned {len(chunk_ids)} ids for {len(chunk)} rows; cannot match them to inputs")
+                chunk_ids = [None] * len(chunk)
+            ids.extend(chunk_ids)
+        return ids
+
+    def fetch_risk_history_page(self, user_id: str, limit: int, before: Optional[Tuple[str, str]] = None, access_token: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Newest-first keyset page over patient_risk_history (user_id, recorded_at desc, id desc); None on failure."""
+        if not self.client: return []
+        def page(client: Client):
+            query = client.table("patient_risk_history").select(
+                "id, final_risk, recorded_at, input_id"
+            ).eq("user_id", user_id)
+            if before:
+                recorded_at, row_id = before
+                query = query.or_(f'recorded_at.lt."{recorded_at}",and(recorded_at.eq."{recorded_at}",id.lt.{row_id})')
+            return query.order("recorded_at", desc=True).order("id", desc=True).limit(limit).execute()
+        res = self.scoped_read("risk_history.page", page, access_token, user_id=user_id, hedge=True)
+        return None if res is None else (res.data or [])
+
+    def fetch_admin_metrics(self, days: int = 7) -> Optional[Dict[str, Any]]:
+        """Dashboard aggregates from the hourly/daily rollup tables; None on failure."""
+        if not self.client: return {}
+        res = self.read("admin_metrics", lambda client: client.rpc("get_admin_metrics", {"p_days": days}).execute())
+        return None if res is None else (res.data or {})
+
+    def fetch_doctor_worklist(self, doctor_id: str, limit: int, offset: int = 0, sort: str = "risk", since: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Assigned patients with latest risk and pending-alert counts in one RPC; None on failure."""
+        if not self.client: return []
+        params = {"p_doctor_id": doctor_id, "p_limit": limit, "p_offset": offset, "p_sort": sort, "p_since": since}
+        res = self.read("doctor_worklist", lambda client: client.rpc("get_doctor_worklist", params).execute())
+        return None if res is None else (res.data or [])
+
     def log_alert(self, input_id: str, user_id: str, alert_type: str, status: str = "pending") -> bool:
         if not self.client: return True
         try:
@@ -141,15 +396,47 @@ class SupabaseService:
                 "user_id": user_id,
                 "alert_type": alert_type,
                 "status": status
-            }).execute())
+            }).execute(), op="alerts.insert", idempotent=False)
             return True
         except BaseException as e:
             logger.error(f"Alert Logging Error: {e}")
             return False
 
+    def fetch_pending_alerts(self, limit: int = 50) -> List[Dict[str, Any]]:
+        if not self.client: return []
+        res = self._with_retry(lambda: self.client.table("alerts").select(
+            "id, input_id, user_id, alert_type, status, occurrence_count, created_at"
+        ).eq("status", "pending").order("created_at", desc=True).limit(limit).execute(), op="alerts.pending")
+        alerts = []
+        for row in (res.data if res and res.data else []):
+            alert_type = (row.get("alert_type") or "").upper()
+            alerts.append({
+                "type": "HIGH_RISK_ALERT",
+                "patient_id": row.get("user_id"),
+                "input_id": row.get("input_id"),
+                "risk": "CRITICAL" if "CRITICAL" in alert_type else "HIGH",
+                "alert_type": row.get("alert_type"),
+                "status": row.get("status"),
+                "occurrence_count": row.get("occurrence_count", 1),
+                "created_at": row.get("created_at")
+            })
+        return alerts
+
+    def insert_rows(self, table: str, rows: List[Dict[str, Any]], on_conflict: str = "id") -> bool:
+        """
+        Bulk insert used by the buffered sinks; returns False so the caller can requeue.
+        Rows carry client-generated keys and duplicates on `on_conflict` are skipped,
+        so re-sending a batch that was already committed is harmless.
+        """
+        if not self.client:
+            logger.warning(f"No database client; dropping {len(rows)} {table} rows")
+            return True
+        res = self._with_retry(lambda: self.client.table(table).upsert(rows, on_conflict=on_conflict, ignore_duplicates=True).execute(), op=f"{table}.bulk_insert")
+        return res is not None
+
     def log_audit(self, user_id: Optional[str], action: str, metadata: Dict[str, Any], ip: str):
         if not self.client: return
         try:
-            self._with_retry(lambda: self.client.table("audit_logs").insert({"user_id": user_id, "action": action, "metadata": metadata, "ip_address": ip, "created_at": datetime.now().isoformat()}).execute())
+            self._with_retry(lambda: self.client.table("audit_logs").insert({"user_id": user_id, "action": action, "metadata": metadata, "ip_address": ip, "created_at": datetime.now(timezone.utc).isoformat()}).execute(), op="audit_logs.insert", idempotent=False)
         except BaseException as e:
             logger.error(f"Audit Error: {e}")
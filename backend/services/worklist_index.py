@@ -0,0 +1,219 @@
+import asyncio
+import heapq
+import logging
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.config import settings
+
+logger = logging.getLogger("WorklistIndex")
+
+RISK_RANK = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
+
+HeapEntry = Tuple[Tuple[int, int, int, float], int, str]
+
+_FRACTION = re.compile(r"\.(\d+)")
+_HOUR_OFFSET = re.compile(r"([+-]\d{2})$")
+
+
+def _epoch(value: Any) -> float:
+    """
+    Seconds since the epoch for a PostgREST timestamp. Before Python 3.11
+    fromisoformat only takes exactly 3 or 6 fractional digits and HH:MM
+    offsets, while Postgres trims trailing zeros and may print "+00".
+    """
+    if not value:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().replace("Z", "+00:00")
+    text = _FRACTION.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), text, count=1)
+    text = _HOUR_OFFSET.sub(r"\1:00", text)
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return 0.0
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class WorklistIndex:
+    """
+    Per-doctor triage order kept in memory: CRITICAL first, then patients with
+    pending alerts, then the longest since their last assessment; risk level
+    breaks ties ahead of assessment age within each group. Each doctor's
+    patients sit in a heap; a change pushes a fresh entry and bumps the
+    patient's version, and superseded entries are skipped (and dropped) when
+    they surface. A doctor is seeded from the DB on first read and re-seeded
+    after `reseed_interval` to pick up new assignments and acknowledgements.
+    """
+
+    def __init__(self, reseed_interval: float):
+        self.reseed_interval = reseed_interval
+        self._patients: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        self._heaps: Dict[str, List[HeapEntry]] = {}
+        self._doctor_patients: Dict[str, Set[str]] = {}
+        self._patient_doctors: Dict[str, Set[str]] = {}
+        self._seeded_at: Dict[str, float] = {}
+        self._seeding: Dict[str, asyncio.Future] = {}
+        # New alerts per patient delivered while a doctor's seed query is in flight.
+        self._seed_alerts: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _key(state: Dict[str, Any]) -> Tuple[int, int, int, float]:
+        return (
+            0 if state.get("latest_risk") == "CRITICAL" else 1,
+            0 if state.get("pending_alerts", 0) > 0 else 1,
+            RISK_RANK.get(state.get("latest_risk"), len(RISK_RANK)),
+            state.get("last_assessed_ts", 0.0)
+        )
+
+    async def top(self, doctor_id: str, n: int) -> Optional[List[Dict[str, Any]]]:
+        """The doctor's first `n` patients; None if they have never been seeded successfully."""
+        seeded_at = self._seeded_at.get(doctor_id)
+        if seeded_at is None or time.monotonic() - seeded_at > self.reseed_interval:
+            await self._seed(doctor_id)
+        if doctor_id not in self._seeded_at:
+            return None
+        return self.peek(doctor_id, n)
+
+    def peek(self, doctor_id: str, n: int) -> List[Dict[str, Any]]:
+        """The first `n` patients in O((n + stale) log M); the heap is left intact."""
+        heap = self._heaps.get(doctor_id, [])
+        members = self._doctor_patients.get(doctor_id, set())
+        live: List[HeapEntry] = []
+        while heap and len(live) < n:
+            entry = heapq.heappop(heap)
+            _, version, patient_id = entry
+            if patient_id in members and self._versions.get(patient_id) == version:
+                live.append(entry)
+        for entry in live:
+            heapq.heappush(heap, entry)
+        return [self._view(patient_id, rank) for rank, (_, _, patient_id) in enumerate(live, start=1)]
+
+    def _view(self, patient_id: str, rank: int) -> Dict[str, Any]:
+        state = self._patients[patient_id]
+        return {
+            "rank": rank,
+            "patient_id": patient_id,
+            "full_name": state.get("full_name"),
+            "latest_risk": state.get("latest_risk"),
+            "last_assessed": state.get("last_assessed"),
+            "pending_alerts": state.get("pending_alerts", 0)
+        }
+
+    async def _seed(self, doctor_id: str):
+        inflight = self._seeding.get(doctor_id)
+        if inflight:
+            await inflight
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._seeding[doctor_id] = future
+        self._seed_alerts[doctor_id] = {}
+        try:
+            rows = await asyncio.to_thread(self._fetch_assigned, doctor_id)
+            if rows is not None:
+                self.load(doctor_id, rows, self._seed_alerts[doctor_id])
+        finally:
+            self._seeding.pop(doctor_id, None)
+            self._seed_alerts.pop(doctor_id, None)
+            future.set_result(None)
+
+    @staticmethod
+    def _fetch_assigned(doctor_id: str) -> Optional[List[Dict[str, Any]]]:
+        from backend.services.supabase_service import SupabaseService
+        supabase = SupabaseService()
+        rows: List[Dict[str, Any]] = []
+        while True:
+            page = supabase.fetch_doctor_worklist(doctor_id, settings.WORKLIST_SEED_PAGE, len(rows))
+            if page is None:
+                logger.error(f"Worklist seed failed for doctor {doctor_id}")
+                return None
+            rows.extend(page)
+            if len(page) < settings.WORKLIST_SEED_PAGE:
+                return rows
+
+    def load(self, doctor_id: str, rows: List[Dict[str, Any]], alerts_during_seed: Optional[Dict[str, int]] = None):
+        """
+        Replaces a doctor's assignments with `rows` from get_doctor_worklist and
+        rebuilds the heap. `alerts_during_seed` counts alerts delivered while the
+        query ran; they are added to the seeded counts because the rows may
+        predate them. One the query already saw is counted twice until the next
+        re-seed, which errs towards surfacing the patient.
+        """
+        alerts_during_seed = alerts_during_seed or {}
+        for patient_id in self._doctor_patients.pop(doctor_id, set()):
+            self._patient_doctors.get(patient_id, set()).discard(doctor_id)
+        members = set()
+        for row in rows:
+            patient_id = str(row["patient_id"])
+            members.add(patient_id)
+            self._patient_doctors.setdefault(patient_id, set()).add(doctor_id)
+            state = self._patients.setdefault(patient_id, {})
+            seeded_ts = _epoch(row.get("last_assessed"))
+            # Events applied while the seed query ran may be newer than the row.
+            if seeded_ts >= state.get("last_assessed_ts", 0.0):
+                state.update({
+                    "latest_risk": row.get("latest_risk"),
+                    "last_assessed": row.get("last_assessed"),
+                    "last_assessed_ts": seeded_ts
+                })
+            state["full_name"] = row.get("full_name")
+            state["pending_alerts"] = (row.get("pending_alerts") or 0) + alerts_during_seed.get(patient_id, 0)
+            self._versions[patient_id] = self._versions.get(patient_id, 0) + 1
+        self._doctor_patients[doctor_id] = members
+        self._heaps[doctor_id] = [(self._key(self._patients[p]), self._versions[p], p) for p in members]
+        heapq.heapify(self._heaps[doctor_id])
+        self._seeded_at[doctor_id] = time.monotonic()
+        self._drop_orphans()
+
+    def _drop_orphans(self):
+        for patient_id in [p for p, doctors in self._patient_doctors.items() if not doctors]:
+            self._patient_doctors.pop(patient_id, None)
+            self._patients.pop(patient_id, None)
+            self._versions.pop(patient_id, None)
+
+    def apply_event(self, message: Dict[str, Any]):
+        """Alert-bus listener: folds assessments and new alerts into every seeded doctor's heap."""
+        kind = message.get("type")
+        if kind == "WORKLIST_UPDATE":
+            for update in message.get("updates", []):
+                self._update(str(update["patient_id"]), latest_risk=update.get("risk"), assessed_at=update.get("assessed_at"))
+        elif kind == "HIGH_RISK_ALERT":
+            patient_id = str(message["patient_id"])
+            for counts in self._seed_alerts.values():
+                counts[patient_id] = counts.get(patient_id, 0) + 1
+            self._update(patient_id, new_alert=True)
+
+    def _update(self, patient_id: str, latest_risk: Optional[str] = None, assessed_at: Any = None, new_alert: bool = False):
+        state = self._patients.get(patient_id)
+        if state is None:
+            return
+        if assessed_at is not None:
+            assessed_ts = _epoch(assessed_at)
+            if assessed_ts < state.get("last_assessed_ts", 0.0):
+                return
+            state.update({"latest_risk": latest_risk, "last_assessed": assessed_at, "last_assessed_ts": assessed_ts})
+        if new_alert:
+            state["pending_alerts"] = state.get("pending_alerts", 0) + 1
+        version = self._versions.get(patient_id, 0) + 1
+        self._versions[patient_id] = version
+        key = self._key(state)
+        for doctor_id in self._patient_doctors.get(patient_id, ()):
+            heap = self._heaps[doctor_id]
+            heapq.heappush(heap, (key, version, patient_id))
+            if len(heap) > 2 * len(self._doctor_patients[doctor_id]) + 64:
+                self._compact(doctor_id)
+
+    def _compact(self, doctor_id: str):
+        members = self._doctor_patients[doctor_id]
+        heap = [e for e in self._heaps[doctor_id] if e[2] in members and self._versions.get(e[2]) == e[1]]
+        heapq.heapify(heap)
+        self._heaps[doctor_id] = heap
+
+
+worklist_index = WorklistIndex(settings.WORKLIST_RESEED_INTERVAL)
@@ -1,38 +1,185 @@
 import os
 import jwt
 import time
-from jwt import PyJWKClient
+import asyncio
+import hashlib
+import logging
+import threading
+import httpx
+from collections import OrderedDict
 from fastapi import HTTPException, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from backend.config import settings
+from backend.services.metrics_service import MetricsService
+
+logger = logging.getLogger("Auth")
+
+
+class JWKSKeyStore:
+    """
+    In-memory kid -> signing key map, prefetched at startup and refreshed on a
+    background thread. Concurrent refreshes collapse into one fetch. After a
+    failed fetch, retries back off from 1s up to MIN_REFETCH_INTERVAL instead of
+    waiting out the full interval.
+    """
+
+    MIN_REFETCH_INTERVAL = 30.0
+
+    def __init__(self, url: str, refresh_interval: float = 300.0, timeout: float = 5.0):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._last_attempt = 0.0
+        self._last_success = 0.0
+        self._failures = 0
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> bool:
+        requested_at = time.monotonic()
+        with self._refresh_lock:
+            if self._last_attempt > requested_at:
+                # Another caller fetched while this one waited for the lock; share its outcome.
+                return self._last_success >= self._last_attempt
+            start = time.perf_counter()
+            try:
+                res = httpx.get(self.url, timeout=self.timeout)
+                res.raise_for_status()
+                keys = {k.key_id: k for k in jwt.PyJWKSet.from_dict(res.json()).keys if k.key_id}
+            except Exception as e:
+                self._failures += 1
+                MetricsService.record_jwks_refresh("error", time.perf_counter() - start)
+                logger.error(f"JWKS refresh failed (attempt {self._failures}): {e}")
+                return False
+            finally:
+                self._last_attempt = time.monotonic()
+            self._keys = keys
+            self._failures = 0
+            self._last_success = self._last_attempt
+            MetricsService.record_jwks_refresh("ok", time.perf_counter() - start)
+            return True
+
+    def _retry_delay(self) -> float:
+        if self._failures == 0:
+            return self.MIN_REFETCH_INTERVAL
+        return min(self.MIN_REFETCH_INTERVAL, 2.0 ** (self._failures - 1))
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="jwks-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval if self._failures == 0 else self._retry_delay()):
+            self.refresh()
+
+    def cached(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        return self._keys.get(kid)
+
+    def get(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        """Blocking: may fetch the JWKS. Call it off the event loop."""
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._last_attempt > self._retry_delay():
+            # Unknown kid usually means the keys were rotated (or the prefetch failed); refetch, rate-limited.
+            self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified claims keyed by token digest; entries expire at the token's `exp`. Hands out copies."""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return dict(entry[1])
+
+    def put(self, digest: str, claims: Dict[str, Any]):
+        exp = claims.get("exp")
+        if not exp:
+            return
+        with self._lock:
+            self._entries[digest] = (float(exp), dict(claims))
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
 
 class Auth:
     security = HTTPBearer()
-    jwks_url = f"{settings.SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json" if settings.SUPABASE_URL else None
-    
-    _jwks_client: Optional[PyJWKClient] = None
+    jwks_url = settings.SUPABASE_JWKS_URL or (f"{settings.SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json" if settings.SUPABASE_URL else None)
+
+    _key_store: Optional[JWKSKeyStore] = None
+    token_cache = VerifiedTokenCache(settings.AUTH_TOKEN_CACHE_SIZE)
+
+    @classmethod
+    def get_key_store(cls) -> Optional[JWKSKeyStore]:
+        if cls._key_store is None and cls.jwks_url:
+            cls._key_store = JWKSKeyStore(cls.jwks_url, refresh_interval=settings.JWKS_REFRESH_INTERVAL)
+        return cls._key_store
 
     @classmethod
-    def get_jwks_client(cls) -> Optional[PyJWKClient]:
-        if cls._jwks_client is None and cls.jwks_url:
-            # Removed expire_after as it caused TypeError in current library version
-            cls._jwks_client = PyJWKClient(cls.jwks_url)
-        return cls._jwks_client
+    def start_key_refresh(cls):
+        """Prefetches the JWKS and starts the background refresher (no-op in development)."""
+        store = cls.get_key_store()
+        if store and settings.ENV != "development":
+            store.refresh()
+            store.start()
+
+    @classmethod
+    def stop_key_refresh(cls):
+        if cls._key_store:
+            cls._key_store.stop()
 
     @staticmethod
-    def get_current_user(credentials: HTTPAuthorizationCredentials = Security(security)) -> Dict[str, Any]:
+    async def get_current_user(credentials: HTTPAuthorizationCredentials = Security(security)) -> Dict[str, Any]:
         token = credentials.credentials
         try:
             if settings.ENV == "development":
                 # Instant fallback for local development to avoid JWKS network hangs
                 return jwt.decode(token, options={"verify_signature": False, "verify_exp": False}, algorithms=["HS256", "RS256"])
 
-            jwks_client = Auth.get_jwks_client()
-            if not jwks_client:
+            digest = VerifiedTokenCache.digest(token)
+            cached = Auth.token_cache.get(digest)
+            if cached is not None:
+                MetricsService.record_auth_cache("hit")
+                return cached
+            MetricsService.record_auth_cache("miss")
+
+            key_store = Auth.get_key_store()
+            if not key_store:
                 raise HTTPException(status_code=500, detail="JWKS Client not initialized.")
 
-            signing_key = jwks_client.get_signing_key_from_jwt(token)
+            kid = jwt.get_unverified_header(token).get("kid")
+            signing_key = key_store.cached(kid)
+            if signing_key is None:
+                signing_key = await asyncio.to_thread(key_store.get, kid)
+            if signing_key is None:
+                raise HTTPException(status_code=401, detail="Signing key not found.")
+
             payload = jwt.decode(
                 token, 
                 signing_key.key, 
@@ -50,7 +197,8 @@ class Auth:
             
             if "sub" not in payload:
                 raise HTTPException(status_code=401, detail="Token missing subject claim.")
-                
+
+            Auth.token_cache.put(digest, payload)
             return payload
         except jwt.ExpiredSignatureError:
             raise HTTPException(status_code=401, detail="Token expired.")
@@ -69,23 +217,117 @@ class Auth:
             # Propagate original error if fallback fails or not in dev
             raise HTTPException(status_code=401, detail=f"Identity verification failed: {str(e)}")
 
+async def get_access_token(credentials: HTTPAuthorizationCredentials = Security(Auth.security)) -> str:
+    """The caller's raw bearer token, for RLS-scoped database clients."""
+    return credentials.credentials
+
 async def get_user_id(user: Dict[str, Any] = Depends(Auth.get_current_user)) -> str:
     user_id = user.get("sub")
     if not user_id:
         raise HTTPException(status_code=401, detail="User ID not found in token.")
     return str(user_id)
 
-def require_role(allowed_roles: List[str]):
-    async def role_checker(user: Dict[str, Any] = Depends(Auth.get_current_user)):
+class RoleCache:
+    """
+    TTL cache of user_profiles.role with a shorter-lived negative cache for missing
+    profiles. Concurrent misses for the same user share one lookup. Entries are
+    dropped on `profile_changed` notifications when DATABASE_URL is configured.
+    """
+
+    def __init__(self, ttl: float = 60.0, negative_ttl: float = 10.0):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: Dict[str, Tuple[float, Optional[str]]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._listener = None
+
+    async def start(self):
+        if not settings.DATABASE_URL:
+            return
+        from backend.services.alert_bus import PostgresNotifyAlertBus
+        self._listener = PostgresNotifyAlertBus(settings.DATABASE_URL, settings.PROFILE_CHANGE_CHANNEL)
+        await self._listener.start(self._on_profile_change)
+
+    async def stop(self):
+        if self._listener:
+            await self._listener.stop()
+            self._listener = None
+
+    async def _on_profile_change(self, envelope: Dict[str, Any]):
+        user_id = (envelope.get("payload") or {}).get("user_id")
+        self.invalidate(user_id)
+
+    def invalidate(self, user_id: Optional[str] = None):
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(str(user_id), None)
+
+    async def get_role(self, user_id: str) -> Optional[str]:
+        entry = self._entries.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            MetricsService.record_role_cache("hit" if entry[1] else "negative_hit")
+            return entry[1]
+
+        pending = self._inflight.get(user_id)
+        if pending:
+            MetricsService.record_role_cache("coalesced")
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The leading request was cancelled; look the role up for this one instead.
+                return await self.get_role(user_id)
+
+        MetricsService.record_role_cache("miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = future
+        try:
+            role = await asyncio.to_thread(self._fetch_role, user_id)
+            self._entries[user_id] = (time.monotonic() + (self.ttl if role else self.negative_ttl), role)
+            future.set_result(role)
+            return role
+        except BaseException as e:
+            # Coalesced waiters share this outcome; cancellation of the leader must not strand them.
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            if self._inflight.get(user_id) is future:
+                self._inflight.pop(user_id, None)
+
+    @staticmethod
+    def _fetch_role(user_id: str) -> Optional[str]:
         from backend.services.supabase_service import SupabaseService
         supabase = SupabaseService()
+        profile = supabase.hedged(
+            "user_profiles.role",
+            lambda: supabase.client.table("user_profiles").select("role").eq("id", user_id).limit(1).execute()
+        )
+        return profile.data[0].get("role") if profile.data else None
+
+
+role_cache = RoleCache(settings.ROLE_CACHE_TTL, settings.ROLE_CACHE_NEGATIVE_TTL)
+
+def require_role(allowed_roles: List[str]):
+    async def role_checker(user: Dict[str, Any] = Depends(Auth.get_current_user)):
         user_id = user.get("sub")
-        
-        profile = supabase.client.table("user_profiles").select("role").eq("id", user_id).single().execute()
-        if not profile.data:
-            raise HTTPException(status_code=403, detail="User profile not found. Access denied.")
-        
-        user_role = profile.data.get("role")
+
+        # A role claim is only trusted when the token signature was verified.
+        user_role = user.get(settings.ROLE_JWT_CLAIM) if settings.ENV != "development" else None
+        if user_role:
+            MetricsService.record_role_cache("claim")
+        else:
+            user_role = await role_cache.get_role(str(user_id))
+            if not user_role:
+                raise HTTPException(status_code=403, detail="User profile not found. Access denied.")
+
         if user_role not in allowed_roles:
             raise HTTPException(status_code=403, detail=f"Insufficient permissions. Required: {allowed_roles}")
         
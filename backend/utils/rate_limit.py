@@ -0,0 +1,121 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from limits.storage import Storage
+from slowapi import Limiter
+from slowapi.errors import RateLimitExceeded
+from slowapi.util import get_remote_address
+from backend.config import settings
+
+
+class SQLiteStorage(Storage):
+    """
+    Fixed-window counters in a local SQLite file (WAL mode), so every worker
+    process on the host enforces the same limit. Use `sqlite:///path/to/file.db`.
+    Calls run on the event loop, so lock waits are capped at
+    RATE_LIMIT_BUSY_TIMEOUT; a timeout raises and the limiter lets the request through.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+    PURGE_EVERY = 1000
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri[len("sqlite://"):] or ":memory:"
+        self._local = threading.local()
+        self._ops = 0
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)")
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=settings.RATE_LIMIT_BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO rate_limits (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET "
+                "value = CASE WHEN expires_at <= ? THEN excluded.value ELSE value + excluded.value END, "
+                "expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END",
+                (key, amount, now + expiry, now, now)
+            )
+            value = conn.execute("SELECT value FROM rate_limits WHERE key = ?", (key,)).fetchone()[0]
+            self._ops += 1
+            if self._ops % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+            conn.execute("COMMIT")
+            return value
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, key: str) -> int:
+        row = self._conn().execute("SELECT value FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        row = self._conn().execute("SELECT expires_at FROM rate_limits WHERE key = ?", (key,)).fetchone()
+        return row[0] if row and row[0] > time.time() else time.time()
+
+    def check(self) -> bool:
+        try:
+            self._conn().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._conn().execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        self._conn().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+
+def user_or_ip_key(request: Request) -> str:
+    """
+    Keys limits by the subject of a token this worker has verified (limits run
+    after the auth dependency, which caches verified claims); anything else,
+    including unverified tokens, falls back to the client address.
+    """
+    auth_header = request.headers.get("authorization", "")
+    if auth_header.lower().startswith("bearer "):
+        from backend.utils.auth import Auth, VerifiedTokenCache
+        claims = Auth.token_cache.get(VerifiedTokenCache.digest(auth_header[7:]))
+        if claims and claims.get("sub"):
+            return f"user:{claims['sub']}"
+    return f"ip:{get_remote_address(request)}"
+
+
+limiter = Limiter(key_func=user_or_ip_key, storage_uri=settings.RATE_LIMIT_STORAGE_URI, swallow_errors=True)
+
+
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> JSONResponse:
+    response = JSONResponse({"error": f"Rate limit exceeded: {exc.detail}"}, status_code=429)
+    view_limit = getattr(request.state, "view_rate_limit", None)
+    if view_limit:
+        item, identifiers = view_limit
+        reset_at, remaining = limiter.limiter.get_window_stats(item, *identifiers)
+        response.headers["Retry-After"] = str(max(1, math.ceil(reset_at - time.time())))
+        response.headers["X-RateLimit-Limit"] = str(item.amount)
+        response.headers["X-RateLimit-Remaining"] = str(remaining)
+        response.headers["X-RateLimit-Reset"] = str(math.ceil(reset_at))
+    return response
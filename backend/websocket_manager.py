@@ -1,34 +1,151 @@
 from fastapi import WebSocket
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Deque, Callable
+from collections import deque
+import asyncio
 import logging
 import json
+from backend.services.alert_bus import AlertBus, create_alert_bus
+from backend.config import settings
 
 logger = logging.getLogger("WebSocketManager")
 
+# Bus messages meant only for server-side listeners (the doctor worklist index):
+# they reach every worker but are never sent to clients, given a seq or replayed.
+LISTENER_ONLY_TYPES = {"WORKLIST_UPDATE"}
+
 
 class ConnectionManager:
-    def __init__(self):
+    """
+    Fans bus messages out to this worker's WebSocket clients. Each client has
+    its own bounded outbox drained by a sender task, so messages reach a client
+    in seq order and a slow socket only ever stalls itself; a client whose
+    outbox fills up or whose send times out is dropped and resumes via ?since=.
+    """
+
+    def __init__(self, bus: AlertBus = None, replay_size: int = settings.ALERT_REPLAY_BUFFER_SIZE):
         self.active_connections: List[WebSocket] = []
+        self.bus = bus or create_alert_bus()
+        self.last_seq = 0
+        self.replay_buffer: Deque[Dict[str, Any]] = deque(maxlen=replay_size)
+        # Every message with seq > replay_floor is in replay_buffer; None until the first delivery.
+        self.replay_floor: Optional[int] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._outboxes: Dict[WebSocket, asyncio.Queue] = {}
+        self._senders: Dict[WebSocket, asyncio.Task] = {}
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
 
-    async def connect(self, websocket: WebSocket):
+    async def start(self):
+        await self.bus.start(self._deliver)
+
+    async def stop(self):
+        await self.bus.stop()
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]):
+        """Called with every delivered message, in bus order, before it goes out to clients; LISTENER_ONLY_TYPES arrive without a seq."""
+        self.listeners.append(listener)
+
+    async def connect(self, websocket: WebSocket, since: Optional[int] = None):
         await websocket.accept()
+        async with self.lock:
+            if since is None:
+                self._attach(websocket, [])
+                logger.info(f"Client connected. Total: {len(self.active_connections)}")
+                return
+            # since > last_seq means the client saw alerts this worker never did (restart or
+            # another worker), so only a snapshot can tell it what is still pending.
+            if self.replay_floor is not None and self.replay_floor <= since <= self.last_seq:
+                missed = [m for m in self.replay_buffer if m["seq"] > since]
+                self._attach(websocket, missed)
+                logger.info(f"Client connected. Replayed {len(missed)} alerts since seq {since}")
+                return
+            head = self.last_seq
+        await self._resume_from_snapshot(websocket, since, head)
+
+    async def _resume_from_snapshot(self, websocket: WebSocket, since: int, head: int):
+        from backend.services.supabase_service import SupabaseService
+        snapshot = await asyncio.to_thread(SupabaseService().fetch_pending_alerts, settings.ALERT_REPLAY_BUFFER_SIZE)
+        async with self.lock:
+            newer = [m for m in self.replay_buffer if m["seq"] > head]
+            self._attach(websocket, [{"type": "ALERT_SNAPSHOT", "seq": head, "alerts": snapshot}] + newer)
+        logger.info(f"Cannot replay from seq {since} (buffer covers > {self.replay_floor}, head {head}); sent DB snapshot of {len(snapshot)} alerts")
+
+    def _attach(self, websocket: WebSocket, backlog: List[Dict[str, Any]]):
+        """Registers a client with `backlog` queued ahead of live messages. Caller holds the lock."""
+        outbox: asyncio.Queue = asyncio.Queue(maxsize=max(settings.WS_SEND_QUEUE_SIZE, len(backlog) + 1))
+        for message in backlog:
+            outbox.put_nowait(message)
+        self._outboxes[websocket] = outbox
+        self._senders[websocket] = asyncio.create_task(self._send_loop(websocket, outbox))
         self.active_connections.append(websocket)
-        logger.info(f"Client connected. Total: {len(self.active_connections)}")
+
+    async def _send_loop(self, websocket: WebSocket, outbox: asyncio.Queue):
+        while True:
+            message = await outbox.get()
+            try:
+                await asyncio.wait_for(websocket.send_json(message), settings.WS_SEND_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Dropping WebSocket client after failed send of seq {message.get('seq')}: {type(e).__name__}")
+                self._drop(websocket)
+                return
+
+    def _drop(self, websocket: WebSocket):
+        self.disconnect(websocket)
+        asyncio.create_task(self._close_quietly(websocket))
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        self._outboxes.pop(websocket, None)
+        sender = self._senders.pop(websocket, None)
+        if sender is not None and sender is not asyncio.current_task():
+            sender.cancel()
         logger.info(f"Client disconnected. Total: {len(self.active_connections)}")
 
     async def broadcast(self, message: Dict[str, Any]):
-        disconnected = []
-        for connection in self.active_connections:
+        await self.bus.publish(message)
+
+    def _notify(self, message: Dict[str, Any]):
+        for listener in self.listeners:
             try:
-                await connection.send_json(message)
-            except Exception:
-                disconnected.append(connection)
-        for conn in disconnected:
-            self.disconnect(conn)
+                listener(message)
+            except Exception as e:
+                logger.error(f"Alert listener failed for {message.get('type')} seq {message.get('seq')}: {e}")
+
+    async def _deliver(self, envelope: Dict[str, Any]):
+        payload = envelope["payload"]
+        if payload.get("type") in LISTENER_ONLY_TYPES:
+            self._notify(payload)
+            return
+        message = {**payload, "seq": envelope["seq"]}
+        self._notify(message)
+        async with self.lock:
+            self.last_seq = max(self.last_seq, envelope["seq"])
+            if self.replay_floor is None:
+                self.replay_floor = envelope["seq"] - 1
+            elif len(self.replay_buffer) == self.replay_buffer.maxlen:
+                self.replay_floor = self.replay_buffer[0]["seq"]
+            self.replay_buffer.append(message)
+            for websocket, outbox in list(self._outboxes.items()):
+                try:
+                    outbox.put_nowait(message)
+                except asyncio.QueueFull:
+                    logger.warning(f"WebSocket client fell {outbox.qsize()} messages behind; dropping it")
+                    self._drop(websocket)
 
     @property
     def connection_count(self) -> int:
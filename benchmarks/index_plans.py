@@ -0,0 +1,125 @@
+"""
+Before/after plan timings for backend/migrations/001_query_shape_indexes.sql.
+
+    python -m benchmarks.index_plans --dsn postgresql://postgres@localhost/littleheart_bench
+
+Builds the schema with the original single-column indexes, seeds a few million
+synthetic rows, times the hot queries, applies the migration and times them again.
+"""
+import random
+from benchmarks.pg_harness import Bench, base_parser, print_comparison, stable_uuid
+
+MIGRATION = "001_query_shape_indexes.sql"
+
+# Index layout before the migration, recreated so "before" is measured fairly
+# even though database_schema.sql already carries the new indexes.
+LEGACY_INDEXES = """
+DROP INDEX IF EXISTS idx_history_user_recorded, idx_chat_sessions_open, idx_alerts_user_status_created,
+    idx_alerts_pending_created, idx_alerts_pending_user, idx_audit_created;
+CREATE INDEX IF NOT EXISTS idx_alerts_user ON public.alerts(user_id);
+CREATE INDEX IF NOT EXISTS idx_alerts_status ON public.alerts(status);
+CREATE INDEX IF NOT EXISTS idx_history_user ON public.patient_risk_history(user_id);
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_user ON public.chat_sessions(user_id);
+"""
+
+QUERIES = {
+    "history_page": (
+        "SELECT id, final_risk, recorded_at, input_id FROM public.patient_risk_history "
+        "WHERE user_id = %s ORDER BY recorded_at DESC, id DESC LIMIT 51",
+        lambda patient: (patient,)
+    ),
+    "open_chat_session": (
+        "SELECT * FROM public.chat_sessions WHERE user_id = %s AND is_completed = FALSE "
+        "ORDER BY updated_at DESC LIMIT 1",
+        lambda patient: (patient,)
+    ),
+    "patient_alerts_by_status": (
+        "SELECT id, alert_type, created_at FROM public.alerts WHERE user_id = %s AND status = 'pending' "
+        "ORDER BY created_at DESC LIMIT 20",
+        lambda patient: (patient,)
+    ),
+    "alert_coalesce_lookup": (
+        "SELECT id FROM public.alerts WHERE user_id = %s AND status = 'pending' "
+        "AND alert_type = ANY (ARRAY['HIGH_RISK_DETECTED', 'CRITICAL_RISK_DETECTED']) "
+        "AND created_at > NOW() - INTERVAL '10 minutes' ORDER BY created_at DESC LIMIT 1",
+        lambda patient: (patient,)
+    ),
+    "pending_alert_snapshot": (
+        "SELECT id, input_id, user_id, alert_type, status, occurrence_count, created_at FROM public.alerts "
+        "WHERE status = 'pending' ORDER BY created_at DESC LIMIT 50",
+        lambda patient: ()
+    ),
+    "latest_audit_events": (
+        "SELECT * FROM public.audit_logs ORDER BY created_at DESC LIMIT 5",
+        lambda patient: ()
+    ),
+}
+
+
+def seed(bench: Bench, patients: int, history_rows: int, alert_rows: int, session_rows: int, audit_rows: int):
+    bench.seed_users(patients)
+    bench.seed("patient_risk_history", f"""
+        INSERT INTO public.patient_risk_history (user_id, final_risk, recorded_at)
+        SELECT md5('patient' || (g % {patients}))::uuid,
+               (ARRAY['LOW', 'LOW', 'MEDIUM', 'HIGH', 'CRITICAL'])[1 + floor(random() * 5)::int],
+               NOW() - random() * INTERVAL '280 days'
+        FROM generate_series(1, {history_rows}) g
+    """)
+    bench.seed("alerts", f"""
+        INSERT INTO public.alerts (user_id, alert_type, status, created_at, last_seen_at)
+        SELECT md5('patient' || (g % {patients}))::uuid,
+               (ARRAY['HIGH_RISK_DETECTED', 'CRITICAL_RISK_DETECTED'])[1 + floor(random() * 2)::int],
+               CASE WHEN random() < 0.02 THEN 'pending'
+                    ELSE (ARRAY['sent', 'acknowledged', 'failed'])[1 + floor(random() * 3)::int] END,
+               ts, ts
+        FROM (SELECT g, NOW() - random() * INTERVAL '280 days' AS ts FROM generate_series(1, {alert_rows}) g) s
+    """)
+    bench.seed("chat_sessions", f"""
+        INSERT INTO public.chat_sessions (user_id, is_completed, created_at, updated_at)
+        SELECT md5('patient' || (g % {patients}))::uuid, random() < 0.95, ts, ts
+        FROM (SELECT g, NOW() - random() * INTERVAL '280 days' AS ts FROM generate_series(1, {session_rows}) g) s
+    """)
+    bench.seed("audit_logs", f"""
+        INSERT INTO public.audit_logs (user_id, action, metadata, created_at)
+        SELECT md5('patient' || (g % {patients}))::uuid, 'RISK_ASSESSMENT', '{{}}'::jsonb,
+               NOW() - random() * INTERVAL '280 days'
+        FROM generate_series(1, {audit_rows}) g
+    """)
+    bench.analyze()
+
+
+def run_queries(bench: Bench, sample: list) -> dict:
+    return {
+        name: bench.explain(sql, [params(p) for p in sample])
+        for name, (sql, params) in QUERIES.items()
+    }
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--history-rows", type=int, default=2_000_000)
+    parser.add_argument("--alert-rows", type=int, default=1_000_000)
+    parser.add_argument("--session-rows", type=int, default=400_000)
+    parser.add_argument("--audit-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    bench = Bench(args.dsn, force=args.force)
+    print("Loading schema with the pre-migration indexes...")
+    bench.reset()
+    bench.execute(LEGACY_INDEXES)
+    seed(bench, args.patients, args.history_rows, args.alert_rows, args.session_rows, args.audit_rows)
+
+    sample = [stable_uuid("patient", random.randrange(args.patients)) for _ in range(args.runs)]
+    print("Timing queries before the migration...")
+    before = run_queries(bench, sample)
+    print(f"Applying {MIGRATION}...")
+    bench.apply_migration(MIGRATION)
+    print("Timing queries after the migration...")
+    after = run_queries(bench, sample)
+    print_comparison(before, after)
+    bench.close()
+
+
+if __name__ == "__main__":
+    main()
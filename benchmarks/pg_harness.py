@@ -0,0 +1,181 @@
+"""
+Shared helpers for the Postgres plan benchmarks.
+
+The benchmarks load `backend/database_schema.sql` into a throwaway local
+Postgres (14+) with a minimal stand-in for Supabase's `auth` schema, seed it
+with synthetic rows and time the hot queries with EXPLAIN ANALYZE. They need
+`psycopg` (or `psycopg2`), which is not part of the API's requirements.
+"""
+import os
+import sys
+import json
+import uuid
+import time
+import hashlib
+import argparse
+import statistics
+from urllib.parse import urlparse
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+    try:
+        import psycopg2
+    except ImportError:
+        psycopg2 = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_PATH = os.path.join(ROOT, "backend", "database_schema.sql")
+MIGRATIONS_DIR = os.path.join(ROOT, "backend", "migrations")
+
+# Just enough of Supabase's auth schema for the public schema, its triggers and
+# its RLS policies to load and evaluate. auth.uid()/role()/jwt() read the same
+# request.jwt.* settings PostgREST sets per request.
+AUTH_STUB = """
+CREATE SCHEMA IF NOT EXISTS auth;
+CREATE TABLE IF NOT EXISTS auth.users (
+    id UUID PRIMARY KEY,
+    raw_user_meta_data JSONB DEFAULT '{}'
+);
+CREATE OR REPLACE FUNCTION auth.uid() RETURNS UUID LANGUAGE sql STABLE AS $$
+  SELECT NULLIF(current_setting('request.jwt.claim.sub', true), '')::uuid
+$$;
+CREATE OR REPLACE FUNCTION auth.role() RETURNS TEXT LANGUAGE sql STABLE AS $$
+  SELECT NULLIF(current_setting('request.jwt.claim.role', true), '')
+$$;
+CREATE OR REPLACE FUNCTION auth.jwt() RETURNS JSONB LANGUAGE sql STABLE AS $$
+  SELECT COALESCE(NULLIF(current_setting('request.jwt.claims', true), ''), '{}')::jsonb
+$$;
+DO $$ BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN
+    CREATE ROLE authenticated NOLOGIN;
+  END IF;
+END $$;
+"""
+
+
+def base_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--dsn", default=os.getenv("BENCH_DATABASE_URL", "postgresql://postgres@localhost/littleheart_bench"),
+                        help="Local Postgres to (re)build; its database name must contain 'bench' unless --force")
+    parser.add_argument("--force", action="store_true", help="Allow a database whose name does not contain 'bench'")
+    parser.add_argument("--runs", type=int, default=20, help="EXPLAIN ANALYZE runs per query")
+    return parser
+
+
+def stable_uuid(kind: str, n: int) -> str:
+    """Python twin of the SQL md5(kind || n)::uuid used when seeding."""
+    return str(uuid.UUID(hashlib.md5(f"{kind}{n}".encode()).hexdigest()))
+
+
+class Bench:
+    def __init__(self, dsn: str, force: bool = False):
+        if psycopg is None and psycopg2 is None:
+            sys.exit("The benchmarks need psycopg: pip install 'psycopg[binary]'")
+        dbname = urlparse(dsn).path.lstrip("/")
+        if "bench" not in dbname and not force:
+            sys.exit(f"Refusing to rebuild '{dbname}': point --dsn at a throwaway *bench* database or pass --force")
+        if psycopg is not None:
+            self.conn = psycopg.connect(dsn, autocommit=True)
+        else:
+            self.conn = psycopg2.connect(dsn)
+            self.conn.autocommit = True
+
+    def execute(self, sql: str, params: Optional[Sequence[Any]] = None):
+        with self.conn.cursor() as cur:
+            cur.execute(sql, params)
+
+    def fetchall(self, sql: str, params: Optional[Sequence[Any]] = None) -> List[tuple]:
+        with self.conn.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall()
+
+    def reset(self):
+        """Drops and reloads the auth stub and the full application schema."""
+        self.execute("DROP SCHEMA IF EXISTS public CASCADE; DROP SCHEMA IF EXISTS auth CASCADE; CREATE SCHEMA public;")
+        self.execute(AUTH_STUB)
+        with open(SCHEMA_PATH, encoding="utf-8") as f:
+            self.execute(f.read())
+
+    def apply_migration(self, name: str):
+        """Runs a migration one statement at a time so CONCURRENTLY works under autocommit."""
+        with open(os.path.join(MIGRATIONS_DIR, name), encoding="utf-8") as f:
+            sql = f.read()
+        if "$$" in sql:
+            self.execute(sql)
+            return
+        for statement in split_statements(sql):
+            self.execute(statement)
+
+    def seed_users(self, patients: int, doctors: int = 0, admins: int = 1):
+        """Creates profiles with deterministic IDs: md5('patient'||n), md5('doctor'||n), md5('admin'||n)."""
+        self.execute("SET session_replication_role = replica")
+        for kind, count in (("patient", patients), ("doctor", doctors), ("admin", admins)):
+            if not count:
+                continue
+            self.execute(f"""
+                INSERT INTO auth.users (id)
+                SELECT md5('{kind}' || g)::uuid FROM generate_series(0, {count - 1}) g;
+                INSERT INTO public.user_profiles (id, role, full_name)
+                SELECT md5('{kind}' || g)::uuid, '{kind}', '{kind} ' || g FROM generate_series(0, {count - 1}) g;
+            """)
+        self.execute("SET session_replication_role = DEFAULT")
+
+    def seed(self, label: str, sql: str):
+        """Bulk-loads with triggers and FK checks off, reporting the elapsed time."""
+        start = time.perf_counter()
+        self.execute("SET session_replication_role = replica")
+        try:
+            self.execute(sql)
+        finally:
+            self.execute("SET session_replication_role = DEFAULT")
+        print(f"  seeded {label:<28} {time.perf_counter() - start:8.1f}s")
+
+    def analyze(self):
+        self.execute("VACUUM ANALYZE")
+
+    def explain(self, sql: str, params_list: Iterable[Sequence[Any]], setup: Optional[Callable[[Sequence[Any]], None]] = None) -> Dict[str, Any]:
+        """Median/p95 execution time over the given parameter sets, plus the plan's node types."""
+        timings, nodes = [], set()
+        for params in params_list:
+            if setup:
+                setup(params)
+            row = self.fetchall(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)[0][0]
+            plan = row if isinstance(row, list) else json.loads(row)
+            timings.append(plan[0]["Execution Time"])
+            _collect_nodes(plan[0]["Plan"], nodes)
+        timings.sort()
+        return {
+            "median_ms": statistics.median(timings),
+            "p95_ms": timings[max(0, int(len(timings) * 0.95) - 1)],
+            "nodes": sorted(nodes)
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+def split_statements(sql: str) -> List[str]:
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [s.strip() for s in "\n".join(lines).split(";") if s.strip()]
+
+
+def _collect_nodes(plan: Dict[str, Any], nodes: set):
+    name = plan["Node Type"]
+    if plan.get("Index Name"):
+        name = f"{name}({plan['Index Name']})"
+    nodes.add(name)
+    for child in plan.get("Plans", []):
+        _collect_nodes(child, nodes)
+
+
+def print_comparison(before: Dict[str, Dict[str, Any]], after: Dict[str, Dict[str, Any]]):
+    print(f"\n{'query':<28} {'before p50':>11} {'after p50':>10} {'before p95':>11} {'after p95':>10} {'speedup':>8}")
+    for name in before:
+        b, a = before[name], after[name]
+        speedup = b["median_ms"] / a["median_ms"] if a["median_ms"] else float("inf")
+        print(f"{name:<28} {b['median_ms']:>9.2f}ms {a['median_ms']:>8.2f}ms {b['p95_ms']:>9.2f}ms {a['p95_ms']:>8.2f}ms {speedup:>7.1f}x")
+    for name in before:
+        print(f"\n{name}\n  before: {', '.join(before[name]['nodes'])}\n  after:  {', '.join(after[name]['nodes'])}")
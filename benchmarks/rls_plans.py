@@ -0,0 +1,174 @@
+"""
+Before/after RLS timings for backend/migrations/002_rls_initplan_policies.sql.
+
+    python -m benchmarks.rls_plans --dsn postgresql://postgres@localhost/littleheart_bench
+
+Seeds patients, doctors with assignments and a large engine_results /
+patient_risk_history / alerts history, then runs admin and doctor reads as the
+`authenticated` role under the original per-row policies and the rewritten ones.
+"""
+import random
+from benchmarks.pg_harness import Bench, base_parser, print_comparison, stable_uuid
+
+MIGRATION = "002_rls_initplan_policies.sql"
+
+# The policies (and check_is_admin) as they were before the migration. The
+# original schema had no SELECT policy on patient_assignments, so every doctor
+# check matched nothing; the legacy baseline gets the same assignment policy as
+# the migration so both runs return the same rows.
+LEGACY_POLICIES = """
+DROP INDEX IF EXISTS public.idx_results_created;
+DROP POLICY IF EXISTS "Participants view own assignments" ON public.patient_assignments;
+CREATE POLICY "Participants view own assignments" ON public.patient_assignments FOR SELECT USING (auth.uid() IN (doctor_id, patient_id) OR (SELECT role FROM public.user_profiles WHERE id = auth.uid()) = 'admin');
+
+CREATE OR REPLACE FUNCTION public.check_is_admin()
+RETURNS BOOLEAN AS $$
+BEGIN
+  RETURN (SELECT (role = 'admin') FROM public.user_profiles WHERE id = auth.uid());
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP POLICY IF EXISTS "Users view own inputs" ON public.patient_inputs;
+CREATE POLICY "Users view own inputs" ON public.patient_inputs FOR SELECT USING (auth.uid() = user_id);
+DROP POLICY IF EXISTS "Doctors view assigned patients" ON public.patient_inputs;
+CREATE POLICY "Doctors view assigned patients" ON public.patient_inputs FOR SELECT USING (EXISTS (SELECT 1 FROM public.patient_assignments pa WHERE pa.patient_id = patient_inputs.user_id AND pa.doctor_id = auth.uid()) OR (SELECT role FROM public.user_profiles WHERE id = auth.uid()) = 'admin');
+DROP POLICY IF EXISTS "Users view own results" ON public.engine_results;
+CREATE POLICY "Users view own results" ON public.engine_results FOR SELECT USING (EXISTS (SELECT 1 FROM public.patient_inputs i WHERE i.id = engine_results.input_id AND i.user_id = auth.uid()));
+DROP POLICY IF EXISTS "Doctors view assigned results" ON public.engine_results;
+CREATE POLICY "Doctors view assigned results" ON public.engine_results FOR SELECT USING (EXISTS (SELECT 1 FROM public.patient_inputs i JOIN public.patient_assignments pa ON pa.patient_id = i.user_id WHERE i.id = engine_results.input_id AND pa.doctor_id = auth.uid()) OR (SELECT role FROM public.user_profiles WHERE id = auth.uid()) = 'admin');
+DROP POLICY IF EXISTS "Users view own alerts" ON public.alerts;
+CREATE POLICY "Users view own alerts" ON public.alerts FOR SELECT USING (auth.uid() = user_id);
+DROP POLICY IF EXISTS "Doctors view assigned alerts" ON public.alerts;
+CREATE POLICY "Doctors view assigned alerts" ON public.alerts FOR SELECT USING (EXISTS (SELECT 1 FROM public.patient_assignments pa WHERE pa.patient_id = alerts.user_id AND pa.doctor_id = auth.uid()) OR (SELECT role FROM public.user_profiles WHERE id = auth.uid()) = 'admin');
+DROP POLICY IF EXISTS "Users view own history" ON public.patient_risk_history;
+CREATE POLICY "Users view own history" ON public.patient_risk_history FOR SELECT USING (auth.uid() = user_id);
+DROP POLICY IF EXISTS "Doctors view assigned history" ON public.patient_risk_history;
+CREATE POLICY "Doctors view assigned history" ON public.patient_risk_history FOR SELECT USING (EXISTS (SELECT 1 FROM public.patient_assignments pa WHERE pa.patient_id = patient_risk_history.user_id AND pa.doctor_id = auth.uid()) OR (SELECT role FROM public.user_profiles WHERE id = auth.uid()) = 'admin');
+DROP POLICY IF EXISTS "Admins view drift" ON public.model_drift_logs;
+CREATE POLICY "Admins view drift" ON public.model_drift_logs FOR SELECT USING ((SELECT role FROM public.user_profiles WHERE id = auth.uid()) = 'admin');
+"""
+
+GRANTS = """
+GRANT USAGE ON SCHEMA public, auth TO authenticated;
+GRANT SELECT ON ALL TABLES IN SCHEMA public TO authenticated;
+GRANT EXECUTE ON ALL FUNCTIONS IN SCHEMA public, auth TO authenticated;
+"""
+
+QUERIES = {
+    "admin_recent_results": (
+        "admin",
+        "SELECT id, input_id, final_risk, created_at FROM public.engine_results "
+        "WHERE created_at > NOW() - INTERVAL '30 days' ORDER BY created_at DESC LIMIT 100"
+    ),
+    "admin_risk_breakdown": (
+        "admin",
+        "SELECT final_risk, count(*) FROM public.engine_results GROUP BY final_risk"
+    ),
+    "admin_drift_log": (
+        "admin",
+        "SELECT * FROM public.model_drift_logs ORDER BY recorded_at DESC LIMIT 20"
+    ),
+    "doctor_results": (
+        "doctor",
+        "SELECT id, input_id, final_risk, created_at FROM public.engine_results "
+        "ORDER BY created_at DESC LIMIT 100"
+    ),
+    "doctor_history": (
+        "doctor",
+        "SELECT user_id, final_risk, recorded_at FROM public.patient_risk_history "
+        "ORDER BY recorded_at DESC LIMIT 100"
+    ),
+    "doctor_pending_alerts": (
+        "doctor",
+        "SELECT id, user_id, alert_type, created_at FROM public.alerts "
+        "WHERE status = 'pending' ORDER BY created_at DESC LIMIT 50"
+    ),
+}
+
+
+def seed(bench: Bench, patients: int, doctors: int, results: int):
+    bench.seed_users(patients, doctors=doctors, admins=1)
+    bench.seed("patient_assignments", f"""
+        INSERT INTO public.patient_assignments (patient_id, doctor_id)
+        SELECT md5('patient' || g)::uuid, md5('doctor' || (g % {doctors}))::uuid
+        FROM generate_series(0, {patients - 1}) g
+    """)
+    bench.seed("patient_inputs + engine_results", f"""
+        INSERT INTO public.patient_inputs (id, user_id, age, trimester, trimester_weeks, blood_pressure, hemoglobin, heart_rate, headache_severity, created_at)
+        SELECT md5('input' || g)::uuid, md5('patient' || (g % {patients}))::uuid, 30, 2, 20, 0, 11.5, 80, 0,
+               NOW() - (g % 400000) * INTERVAL '1 minute'
+        FROM generate_series(1, {results}) g;
+        INSERT INTO public.engine_results (input_id, rule_risk, final_risk, created_at)
+        SELECT md5('input' || g)::uuid, r, r, NOW() - (g % 400000) * INTERVAL '1 minute'
+        FROM (SELECT g, (ARRAY['LOW', 'LOW', 'MEDIUM', 'HIGH', 'CRITICAL'])[1 + floor(random() * 5)::int] AS r
+              FROM generate_series(1, {results}) g) s;
+    """)
+    bench.seed("patient_risk_history", """
+        INSERT INTO public.patient_risk_history (user_id, final_risk, input_id, recorded_at)
+        SELECT i.user_id, r.final_risk, i.id, r.created_at
+        FROM public.engine_results r JOIN public.patient_inputs i ON i.id = r.input_id
+    """)
+    bench.seed("alerts", f"""
+        INSERT INTO public.alerts (user_id, input_id, alert_type, status, created_at)
+        SELECT i.user_id, i.id, r.final_risk || '_RISK_DETECTED',
+               CASE WHEN random() < 0.05 THEN 'pending' ELSE 'acknowledged' END, r.created_at
+        FROM public.engine_results r JOIN public.patient_inputs i ON i.id = r.input_id
+        WHERE r.final_risk IN ('HIGH', 'CRITICAL')
+    """)
+    bench.seed("model_drift_logs", """
+        INSERT INTO public.model_drift_logs (model_version, accuracy, ece, recorded_at)
+        SELECT 'xgb-maternal-v1.4', 0.9, 0.05, NOW() - g * INTERVAL '1 hour' FROM generate_series(1, 2000) g
+    """)
+    bench.execute(GRANTS)
+    bench.analyze()
+
+
+def run_queries(bench: Bench, doctors: int, runs: int) -> dict:
+    def as_user(params):
+        bench.execute("RESET ROLE")
+        bench.execute("SELECT set_config('request.jwt.claim.sub', %s, false)", (as_user.sub,))
+        bench.execute("SET ROLE authenticated")
+
+    timings = {}
+    for name, (who, sql) in QUERIES.items():
+        subs = [stable_uuid("admin", 0) if who == "admin" else stable_uuid("doctor", random.randrange(doctors)) for _ in range(runs)]
+        per_run = []
+        for sub in subs:
+            as_user.sub = sub
+            per_run.append(bench.explain(sql, [()], setup=as_user))
+        bench.execute("RESET ROLE")
+        per_run.sort(key=lambda r: r["median_ms"])
+        timings[name] = {
+            "median_ms": per_run[len(per_run) // 2]["median_ms"],
+            "p95_ms": per_run[max(0, int(len(per_run) * 0.95) - 1)]["median_ms"],
+            "nodes": sorted({n for r in per_run for n in r["nodes"]})
+        }
+    return timings
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--results", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    bench = Bench(args.dsn, force=args.force)
+    print("Loading schema with the original policies...")
+    bench.reset()
+    bench.execute(LEGACY_POLICIES)
+    seed(bench, args.patients, args.doctors, args.results)
+
+    print("Timing admin/doctor reads before the migration...")
+    before = run_queries(bench, args.doctors, args.runs)
+    print(f"Applying {MIGRATION}...")
+    bench.apply_migration(MIGRATION)
+    bench.execute(GRANTS)
+    print("Timing admin/doctor reads after the migration...")
+    after = run_queries(bench, args.doctors, args.runs)
+    print_comparison(before, after)
+    bench.close()
+
+
+if __name__ == "__main__":
+    main()
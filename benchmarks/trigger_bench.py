@@ -0,0 +1,135 @@
+"""
+Bulk-insert cost of the engine_results AFTER INSERT triggers, row-level vs.
+statement-level (backend/migrations/003_statement_level_result_triggers.sql).
+
+    python -m benchmarks.trigger_bench --dsn postgresql://postgres@localhost/littleheart_bench
+
+Each run inserts a batch of engine_results in one statement inside a
+transaction, records the elapsed time and the alert/history rows the triggers
+produced, then rolls back so every run starts from the same state.
+"""
+import time
+import statistics
+from benchmarks.pg_harness import Bench, base_parser
+
+MIGRATION = "003_statement_level_result_triggers.sql"
+
+# The FOR EACH ROW triggers as they were before the migration.
+ROW_LEVEL_TRIGGERS = """
+CREATE OR REPLACE FUNCTION public.create_alert_if_high_row()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_user_id UUID;
+  v_alert_id UUID;
+BEGIN
+  IF NEW.final_risk IN ('HIGH', 'CRITICAL') THEN
+    v_user_id := (SELECT user_id FROM public.patient_inputs WHERE id = NEW.input_id);
+    SELECT id INTO v_alert_id
+    FROM public.alerts
+    WHERE user_id = v_user_id
+      AND status = 'pending'
+      AND alert_type = ANY (CASE NEW.final_risk
+            WHEN 'HIGH' THEN ARRAY['HIGH_RISK_DETECTED', 'CRITICAL_RISK_DETECTED']
+            ELSE ARRAY['CRITICAL_RISK_DETECTED'] END)
+      AND created_at > NOW() - public.alert_coalesce_window()
+    ORDER BY created_at DESC
+    LIMIT 1;
+    IF v_alert_id IS NOT NULL THEN
+      UPDATE public.alerts SET occurrence_count = occurrence_count + 1, last_seen_at = NOW() WHERE id = v_alert_id;
+    ELSE
+      INSERT INTO public.alerts (input_id, user_id, alert_type) VALUES (NEW.input_id, v_user_id, NEW.final_risk || '_RISK_DETECTED');
+    END IF;
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.insert_risk_history_row()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO public.patient_risk_history (user_id, final_risk, input_id)
+  VALUES ((SELECT user_id FROM public.patient_inputs WHERE id = NEW.input_id), NEW.final_risk, NEW.input_id);
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS on_high_risk_detected ON public.engine_results;
+CREATE TRIGGER on_high_risk_detected AFTER INSERT ON public.engine_results
+FOR EACH ROW EXECUTE FUNCTION public.create_alert_if_high_row();
+DROP TRIGGER IF EXISTS on_result_insert_populate_history ON public.engine_results;
+CREATE TRIGGER on_result_insert_populate_history AFTER INSERT ON public.engine_results
+FOR EACH ROW EXECUTE FUNCTION public.insert_risk_history_row();
+"""
+
+BULK_INSERT = """
+INSERT INTO public.engine_results (input_id, rule_risk, final_risk)
+SELECT id, risk, risk FROM bench_inputs WHERE batch = %s
+"""
+
+
+def seed(bench: Bench, patients: int, batch_size: int, batches: int):
+    bench.seed_users(patients)
+    # One pre-existing pending alert for a tenth of the patients so the
+    # coalescing path is exercised alongside inserts.
+    bench.seed("pending alerts", f"""
+        INSERT INTO public.alerts (user_id, alert_type, status)
+        SELECT md5('patient' || g)::uuid, 'HIGH_RISK_DETECTED', 'pending'
+        FROM generate_series(0, {patients - 1}, 10) g
+    """)
+    bench.seed("patient_inputs", f"""
+        CREATE TABLE bench_inputs AS
+        SELECT md5('input' || g)::uuid AS id, md5('patient' || (g % {patients}))::uuid AS user_id,
+               g / {batch_size} AS batch,
+               (ARRAY['LOW', 'LOW', 'LOW', 'MEDIUM', 'MEDIUM', 'HIGH', 'HIGH', 'CRITICAL'])[1 + (g * 7919 % 8)] AS risk
+        FROM generate_series(0, {batch_size * batches - 1}) g;
+        INSERT INTO public.patient_inputs (id, user_id, age, trimester, trimester_weeks, blood_pressure, hemoglobin, heart_rate, headache_severity)
+        SELECT id, user_id, 30, 2, 20, 0, 11.5, 80, 0 FROM bench_inputs;
+    """)
+    bench.analyze()
+
+
+def time_batches(bench: Bench, batches: int) -> dict:
+    timings, produced = [], None
+    for batch in range(batches):
+        bench.execute("BEGIN")
+        start = time.perf_counter()
+        bench.execute(BULK_INSERT, (batch,))
+        timings.append((time.perf_counter() - start) * 1000)
+        counts = bench.fetchall("""
+            SELECT (SELECT count(*) FROM public.patient_risk_history),
+                   (SELECT count(*) FROM public.alerts),
+                   (SELECT sum(occurrence_count) FROM public.alerts)
+        """)[0]
+        produced = produced or counts
+        bench.execute("ROLLBACK")
+    return {"median_ms": statistics.median(timings), "max_ms": max(timings), "produced": produced}
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--batches", type=int, default=5)
+    args = parser.parse_args()
+
+    bench = Bench(args.dsn, force=args.force)
+    bench.reset()
+    bench.execute(ROW_LEVEL_TRIGGERS)
+    seed(bench, args.patients, args.batch_size, args.batches)
+
+    print(f"Inserting {args.batches} x {args.batch_size} engine_results with FOR EACH ROW triggers...")
+    row = time_batches(bench, args.batches)
+    bench.apply_migration(MIGRATION)
+    print(f"Inserting {args.batches} x {args.batch_size} engine_results with FOR EACH STATEMENT triggers...")
+    stmt = time_batches(bench, args.batches)
+
+    print(f"\n{'design':<12} {'median':>10} {'max':>10}   history / alerts / alert occurrences (first batch)")
+    for name, result in (("row", row), ("statement", stmt)):
+        history, alerts, occurrences = result["produced"]
+        print(f"{name:<12} {result['median_ms']:>8.1f}ms {result['max_ms']:>8.1f}ms   {history} / {alerts} / {occurrences}")
+    print(f"\nspeedup: {row['median_ms'] / stmt['median_ms']:.1f}x")
+    bench.close()
+
+
+if __name__ == "__main__":
+    main()
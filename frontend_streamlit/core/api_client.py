@@ -92,28 +92,25 @@ def fetch_alerts(limit: int = 20) -> List[Dict]:
         return []
 
 
-def fetch_assigned_patients(doctor_id: str) -> List[Dict]:
-    db = _get_supabase()
-    if not db:
-        return []
+def fetch_assigned_patients(doctor_id: str = "", token: str = "", sort: str = "risk") -> List[Dict]:
+    """Assigned patients for the signed-in doctor, one backend round trip per page of 200."""
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    params: Dict[str, Any] = {"limit": 200, "offset": 0, "sort": sort}
+    patients: List[Dict] = []
     try:
-        assignments = db.table("patient_assignments").select("patient_id").eq("doctor_id", doctor_id).execute().data or []
-        patient_ids = [a["patient_id"] for a in assignments]
-        if not patient_ids:
-            return []
-        patients = []
-        for pid in patient_ids:
-            profile = db.table("user_profiles").select("id, full_name, role").eq("id", pid).single().execute()
-            history = db.table("patient_risk_history").select("risk_level, recorded_at").eq("user_id", pid).order("recorded_at", desc=True).limit(1).execute()
-            alerts = db.table("alerts").select("id").eq("user_id", pid).eq("status", "pending").execute()
-            latest = history.data[0] if history.data else {}
-            patients.append({
-                "id": pid,
-                "full_name": profile.data.get("full_name", "Unknown") if profile.data else "Unknown",
-                "latest_risk": latest.get("risk_level", "N/A"),
-                "last_assessed": latest.get("recorded_at", "Never")[:16] if latest.get("recorded_at") else "Never",
-                "pending_alerts": len(alerts.data) if alerts.data else 0
-            })
+        while params["offset"] is not None:
+            r = httpx.get(f"{API_BASE}/doctor/patients", headers=headers, params=params, timeout=10)
+            r.raise_for_status()
+            page = r.json()
+            for row in page.get("items", []):
+                patients.append({
+                    "id": row["patient_id"],
+                    "full_name": row.get("full_name") or "Unknown",
+                    "latest_risk": row.get("latest_risk") or "N/A",
+                    "last_assessed": row["last_assessed"][:16] if row.get("last_assessed") else "Never",
+                    "pending_alerts": row.get("pending_alerts", 0)
+                })
+            params["offset"] = page.get("next_offset")
         return patients
     except Exception as e:
         logger.error(f"Patients fetch error: {e}")
@@ -125,17 +122,13 @@ def fetch_admin_stats() -> Dict[str, Any]:
     if not db:
         return {}
     try:
-        results = db.table("engine_results").select("final_risk, created_at").execute().data or []
-        alerts = db.table("alerts").select("id").execute().data or []
-        total = len(results)
-        high = sum(1 for r in results if r.get("final_risk") in ["HIGH", "CRITICAL"])
-        pct = round((high / total * 100), 1) if total > 0 else 0
+        metrics = db.rpc("get_admin_metrics", {"p_days": 7}).execute().data or {}
         drift = db.table("model_drift_logs").select("*").order("created_at", desc=True).limit(20).execute().data or []
         return {
-            "total_assessments": total,
-            "high_risk_count": high,
-            "high_risk_pct": pct,
-            "total_alerts": len(alerts),
+            "total_assessments": metrics.get("total", 0),
+            "high_risk_count": metrics.get("high_risk_count", 0),
+            "high_risk_pct": metrics.get("high_percent", 0),
+            "total_alerts": metrics.get("total_alerts", 0),
             "drift_logs": drift
         }
     except Exception as e:
@@ -148,7 +141,7 @@ def fetch_recent_assessments(limit: int = 25) -> List[Dict]:
     if not db:
         return []
     try:
-        return db.table("engine_results").select("*").order("created_at", desc=True).limit(limit).execute().data or []
+        return db.table("engine_results_explained").select("*").order("created_at", desc=True).limit(limit).execute().data or []
     except Exception as e:
         logger.error(f"Assessments fetch error: {e}")
         return []
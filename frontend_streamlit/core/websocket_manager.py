@@ -1,13 +1,33 @@
 import json
 import threading
 import logging
+import time
 from typing import Optional
 
 logger = logging.getLogger("StreamlitWebSocket")
 
+WS_URL = "ws://localhost:8000/ws/alerts"
+RECONNECT_DELAY = 5
+# Message types on /ws/alerts that are alerts; anything else is ignored.
+ALERT_TYPES = {"HIGH_RISK_ALERT", "ALERT_COALESCED"}
+
 _alert_store = []
 _ws_lock = threading.Lock()
 _ws_thread_started = False
+_last_seq: Optional[int] = None
+
+
+def _record(data):
+    global _alert_store, _last_seq
+    with _ws_lock:
+        if data.get("type") == "ALERT_SNAPSHOT":
+            _alert_store = list(data.get("alerts", []))[:50]
+        elif data.get("type") in ALERT_TYPES:
+            _alert_store.insert(0, data)
+            if len(_alert_store) > 50:
+                _alert_store = _alert_store[:50]
+        if data.get("seq") is not None:
+            _last_seq = data["seq"]
 
 
 def _ws_listener():
@@ -18,13 +38,8 @@ def _ws_listener():
         return
 
     def on_message(ws, message):
-        global _alert_store
         try:
-            data = json.loads(message)
-            with _ws_lock:
-                _alert_store.insert(0, data)
-                if len(_alert_store) > 50:
-                    _alert_store = _alert_store[:50]
+            _record(json.loads(message))
         except Exception as e:
             logger.error(f"WS parse error: {e}")
 
@@ -35,16 +50,19 @@ def _ws_listener():
         logger.info("WS connection closed")
 
     def on_open(ws):
-        logger.info("WS connected to backend alerts")
-
-    ws = websocket.WebSocketApp(
-        "ws://localhost:8000/ws/alerts",
-        on_message=on_message,
-        on_error=on_error,
-        on_close=on_close,
-        on_open=on_open
-    )
-    ws.run_forever(reconnect=5)
+        logger.info(f"WS connected to backend alerts (since={_last_seq})")
+
+    while True:
+        url = WS_URL if _last_seq is None else f"{WS_URL}?since={_last_seq}"
+        ws = websocket.WebSocketApp(
+            url,
+            on_message=on_message,
+            on_error=on_error,
+            on_close=on_close,
+            on_open=on_open
+        )
+        ws.run_forever()
+        time.sleep(RECONNECT_DELAY)
 
 
 def init_websocket():
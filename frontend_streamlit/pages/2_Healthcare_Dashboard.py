@@ -9,7 +9,7 @@ project_root = str(Path(__file__).resolve().parent.parent.parent)
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from frontend_streamlit.services.api_client import fetch_alerts, fetch_admin_metrics
+from frontend_streamlit.services.api_client import fetch_alerts, fetch_department_metrics, wait_for_alerts
 
 st.set_page_config(page_title="Healthcare Dashboard", page_icon="🏥", layout="wide")
 
@@ -21,7 +21,7 @@ st.markdown('<div class="page-header"><h1>🏥 Healthcare Provider Dashboard</h1
 
 # --- Live Alert Banner ---
 st.subheader("🚨 Live Alerts Feed")
-st.caption("Real-time WebSocket Push · Auto-refreshing via Polling Buffer")
+st.caption("Real-time WebSocket Push · Resumes from last alert sequence on reconnect")
 
 placeholder_banner = st.empty()
 
@@ -31,10 +31,19 @@ st.subheader("📊 Department Overview")
 
 col_charts = st.empty()
 
+last_seq = None
+# The loop wakes on every pushed alert; the rollups behind the charts only change every few minutes.
+METRICS_REFRESH = 60.0
+metrics = {}
+metrics_at = 0.0
 
 while True:
     alerts = fetch_alerts()
-    metrics = fetch_admin_metrics()
+    if time.monotonic() - metrics_at >= METRICS_REFRESH:
+        fresh = fetch_department_metrics()
+        if fresh is not None:
+            metrics = fresh
+        metrics_at = time.monotonic()
     
     # 1. Update Banner & Table
     with placeholder_banner.container():
@@ -94,4 +103,5 @@ while True:
                 st.plotly_chart(fig_weekly, width="stretch")
             st.markdown('</div>', unsafe_allow_html=True)
 
-    time.sleep(3)
+    # Re-render only when a new alert is pushed (or periodically for the charts)
+    last_seq = wait_for_alerts(last_seq)
@@ -49,8 +49,8 @@ if metrics:
     with col_l:
         st.markdown('<div class="glass-card">', unsafe_allow_html=True)
         st.subheader("📈 Assessment Volume (Weekly)")
-        if "weekly_alerts" in metrics:
-             df_weekly = metrics["weekly_alerts"]
+        if "weekly_assessments" in metrics:
+             df_weekly = metrics["weekly_assessments"]
              fig_vol = px.area(df_weekly, x="day", y="count", title="Assessment Throughput", markers=True)
              fig_vol.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
              st.plotly_chart(fig_vol, width="stretch")
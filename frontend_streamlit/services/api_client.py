@@ -3,12 +3,15 @@ import os
 import websocket
 import threading
 import json
+import time
 import streamlit as st
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 # Hardcode to 127.0.0.1 for stability on local Windows
 API_BASE = "http://127.0.0.1:8000"
 WS_URL = "ws://127.0.0.1:8000/ws/alerts"
+# Message types on /ws/alerts that are alerts; anything else is ignored.
+ALERT_TYPES = {"HIGH_RISK_ALERT", "ALERT_COALESCED"}
 
 def analyze_patient(data: Dict[str, Any]) -> Dict[str, Any]:
     """Sends patient data to the backend risk assessment engine."""
@@ -39,20 +42,27 @@ def analyze_patient(data: Dict[str, Any]) -> Dict[str, Any]:
             "engine_results": {"ml": {}}
         }
 
-def fetch_risk_history() -> List[Dict]:
-    """Fetches real past assessments from the backend."""
+def fetch_risk_history(max_pages: int = 20) -> List[Dict]:
+    """Fetches the full assessment timeline from the backend, following keyset pages."""
+    headers = {}
+    token = st.session_state.get("access_token")
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    history: List[Dict] = []
+    params: Dict[str, Any] = {"limit": 200}
     try:
-        headers = {}
-        token = st.session_state.get("access_token")
-        if token:
-            headers["Authorization"] = f"Bearer {token}"
-            
-        response = httpx.get(f"{API_BASE}/history", headers=headers, timeout=10.0)
-        response.raise_for_status()
-        return response.json()
+        for _ in range(max_pages):
+            response = httpx.get(f"{API_BASE}/history", headers=headers, params=params, timeout=10.0)
+            response.raise_for_status()
+            page = response.json()
+            history = page.get("items", []) + history
+            if not page.get("next_before"):
+                break
+            params["before"] = page["next_before"]
+        return history
     except Exception as e:
-        # Fallback to empty list or minimal log
-        return []
+        # Keep whatever pages already arrived
+        return history
 
 def init_chat_session() -> Dict[str, Any]:
     """Initializes a new or existing chat session for the user."""
@@ -81,47 +91,64 @@ def call_chatbot_api(session_id: str, message: str) -> Dict[str, Any]:
     except Exception as e:
         return {"response": f"Assistant is having connection issues: {str(e)}", "next_state": "START"}
 
-def fetch_admin_metrics() -> Dict[str, Any]:
-    """Fetches system-wide metrics for admin dashboard."""
-    # Mocking for immediate UI rendering if backend endpoint differs
-    return {
-        "total": 1240, 
-        "high_percent": 14.5, 
-        "latency": 0.45,
-        "distribution": [
-            {"risk": "LOW", "count": 800}, 
-            {"risk": "MEDIUM", "count": 300}, 
-            {"risk": "HIGH", "count": 100}, 
-            {"risk": "CRITICAL", "count": 40}
-        ],
-        "weekly_alerts": [
-            {"day": "Mon", "count": 12},
-            {"day": "Tue", "count": 19},
-            {"day": "Wed", "count": 3},
-            {"day": "Thu", "count": 5},
-            {"day": "Fri", "count": 2},
-            {"day": "Sat", "count": 20},
-            {"day": "Sun", "count": 15}
-        ]
-    }
+def fetch_admin_metrics(days: int = 7) -> Dict[str, Any]:
+    """Fetches system-wide metrics for admin dashboard from the backend rollups."""
+    headers = {}
+    token = st.session_state.get("access_token")
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    try:
+        response = httpx.get(f"{API_BASE}/admin/metrics", headers=headers, params={"days": days}, timeout=10.0)
+        response.raise_for_status()
+        return response.json()
+    except Exception:
+        return {}
+
+def fetch_department_metrics(days: int = 7, timeout: float = 3.0) -> Optional[Dict[str, Any]]:
+    """Department overview for the provider dashboard (doctor or admin); None if the backend did not answer."""
+    headers = {}
+    token = st.session_state.get("access_token")
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    try:
+        response = httpx.get(f"{API_BASE}/doctor/metrics", headers=headers, params={"days": days}, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    except Exception:
+        return None
 
 def fetch_alerts() -> List[Dict]:
-    """Fetches recent alerts (polling fallback or WS buffer)."""
-    if "live_alerts" in st.session_state:
-        return st.session_state["live_alerts"]
-    return []
+    """Returns alerts pushed over the WebSocket (replayed from the server on reconnect)."""
+    with _alerts_changed:
+        return list(_live_alerts)
+
+def wait_for_alerts(seq: Optional[int], timeout: float = 60.0) -> Optional[int]:
+    """Blocks until an alert newer than `seq` arrives or the timeout expires; returns the latest seq."""
+    with _alerts_changed:
+        _alerts_changed.wait_for(lambda: _last_seq != seq, timeout=timeout)
+        return _last_seq
 
 # --- WebSocket Logic ---
 
+_live_alerts: List[Dict] = []
+_last_seq: Optional[int] = None
+_alerts_changed = threading.Condition()
+
 def _on_message(ws, message):
+    global _live_alerts, _last_seq
     try:
         data = json.loads(message)
-        if "live_alerts" not in st.session_state:
-            st.session_state["live_alerts"] = []
-        st.session_state["live_alerts"].insert(0, data)
-        # Keep only last 50
-        if len(st.session_state["live_alerts"]) > 50:
-            st.session_state["live_alerts"].pop()
+        with _alerts_changed:
+            if data.get("type") == "ALERT_SNAPSHOT":
+                _live_alerts = list(data.get("alerts", []))[:50]
+            elif data.get("type") in ALERT_TYPES:
+                _live_alerts.insert(0, data)
+                # Keep only last 50
+                if len(_live_alerts) > 50:
+                    _live_alerts.pop()
+            if data.get("seq") is not None:
+                _last_seq = data["seq"]
+            _alerts_changed.notify_all()
     except Exception:
         pass
 
@@ -132,11 +159,14 @@ def _on_close(ws, close_status_code, close_msg):
     pass
 
 def _start_listener():
-    ws = websocket.WebSocketApp(WS_URL,
-                                on_message=_on_message,
-                                on_error=_on_error,
-                                on_close=_on_close)
-    ws.run_forever()
+    while True:
+        url = WS_URL if _last_seq is None else f"{WS_URL}?since={_last_seq}"
+        ws = websocket.WebSocketApp(url,
+                                    on_message=_on_message,
+                                    on_error=_on_error,
+                                    on_close=_on_close)
+        ws.run_forever()
+        time.sleep(5)
 
 def init_websocket():
     """Starts the WebSocket listener in a background thread if not already running."""
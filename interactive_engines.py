@@ -121,8 +121,8 @@ class DiagnosticCLI:
                 logger.error(f"[{correlation_id}] Gemini Error: {e}")
                 explanation = {"reasoning": f"Explanation failed: {str(e)}"}
         if final_risk in [RiskLevel.HIGH, RiskLevel.CRITICAL]:
-            self.alerts.trigger_clinical_alert(input_id, simulation_user, final_risk)
-            self.notifications.check_and_alert(input_id, simulation_user, req, final_risk)
+            if await self.alerts.trigger_clinical_alert(input_id, simulation_user, final_risk):
+                self.notifications.check_and_alert(input_id, simulation_user, req, final_risk)
         import hashlib
         payload_str = f"{input_id}|{final_risk.value}|{clinical_conf}|{correlation_id}"
         integrity_hash = hashlib.sha256(payload_str.encode()).hexdigest()
@@ -205,7 +205,7 @@ class DiagnosticCLI:
         print("\n[AUDIT] FORENSIC AUDIT DASHBOARD")
         print("Polling recent clinical events...")
         try:
-            logs = self.db.client.table("audit_logs").select("*").order("created_at", desc=True).limit(5).execute()
+            logs = self.db.read("audit_logs.recent", lambda client: client.table("audit_logs").select("*").order("created_at", desc=True).limit(5).execute())
             print("\nRecent Traces:")
             for log in logs.data:
                 print(f" - [{log['created_at']}] ID: {log['id']} | Action: {log['action']} | IP: {log['ip_address']}")
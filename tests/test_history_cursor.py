@@ -0,0 +1,64 @@
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api import analyze
+from backend.utils.auth import get_access_token, get_user_id
+
+
+def make_rows(user_id):
+    # Two rows share a recorded_at so the page boundary has to fall back to the id tiebreak.
+    stamps = ["2026-03-05T09:00:00.5+00:00", "2026-03-04T09:00:00.25+00:00", "2026-03-04T09:00:00.25+00:00",
+              "2026-03-03T09:00:00+00:00", "2026-03-02T09:00:00.123+00:00"]
+    rows = [{"id": str(uuid.uuid4()), "recorded_at": stamp, "final_risk": "HIGH", "input_id": str(uuid.uuid4()), "user_id": user_id}
+            for stamp in stamps]
+    return sorted(rows, key=lambda r: (r["recorded_at"], r["id"]), reverse=True)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    user_id = str(uuid.uuid4())
+    rows = make_rows(user_id)
+
+    def fetch_page(uid, limit, before=None, access_token=None):
+        page = [r for r in rows if r["user_id"] == uid]
+        if before:
+            page = [r for r in page if (r["recorded_at"], r["id"]) < before]
+        return page[:limit]
+
+    monkeypatch.setattr(analyze.supabase, "fetch_risk_history_page", fetch_page)
+    app = FastAPI()
+    app.include_router(analyze.router)
+    app.dependency_overrides[get_user_id] = lambda: user_id
+    app.dependency_overrides[get_access_token] = lambda: "token"
+    return TestClient(app), rows
+
+
+def test_next_before_crosses_page_boundaries(client):
+    http, rows = client
+    seen, before = [], None
+    while True:
+        params = {"limit": 2, **({"before": before} if before else {})}
+        response = http.get("/history", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        seen.extend(item["input_id"] for item in reversed(body["items"]))
+        before = body["next_before"]
+        if before is None:
+            break
+        assert ":" not in before and "," not in before
+    assert seen == [r["input_id"] for r in rows]
+
+
+def test_cursor_round_trips_any_fraction_length():
+    row_id = str(uuid.uuid4())
+    for stamp in ["2026-03-04T09:00:00+00:00", "2026-03-04T09:00:00.1+00:00", "2026-03-04T09:00:00.12345+00:00", "2026-03-04T09:00:00.123456Z"]:
+        assert analyze.decode_history_cursor(analyze.encode_history_cursor(stamp, row_id)) == (stamp, row_id)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "2026-03-04T09:00:00+00:00,abc", analyze.encode_history_cursor('2026-03-04") or (x', str(uuid.uuid4()))])
+def test_invalid_cursor_is_rejected(client, cursor):
+    http, _ = client
+    assert http.get("/history", params={"before": cursor}).status_code == 400
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.services.worklist_index import WorklistIndex, _epoch
+
+
+def row(patient_id, risk, assessed, pending=0):
+    return {"patient_id": patient_id, "full_name": patient_id.upper(), "latest_risk": risk,
+            "last_assessed": assessed, "pending_alerts": pending}
+
+
+@pytest.fixture
+def index():
+    index = WorklistIndex(reseed_interval=3600)
+    index.load("doc", [
+        row("low", "LOW", "2026-03-01T09:00:00+00:00"),
+        row("high_old", "HIGH", "2026-03-01T09:00:00+00:00"),
+        row("high_new", "HIGH", "2026-03-04T09:00:00+00:00"),
+        row("medium_alert", "MEDIUM", "2026-03-04T09:00:00+00:00", pending=1),
+        row("critical", "CRITICAL", "2026-03-04T09:00:00+00:00"),
+    ])
+    return index
+
+
+def order(index, n=10):
+    return [item["patient_id"] for item in index.peek("doc", n)]
+
+
+def test_heap_orders_critical_then_alerts_then_longest_wait(index):
+    # An unacknowledged alert outranks a higher risk level without one.
+    assert order(index) == ["critical", "medium_alert", "high_old", "high_new", "low"]
+    assert [item["rank"] for item in index.peek("doc", 2)] == [1, 2]
+
+
+def test_peek_leaves_heap_intact(index):
+    assert order(index, 2) == order(index, 2) == ["critical", "medium_alert"]
+    assert len(order(index)) == 5
+
+
+def test_superseded_entries_are_skipped_and_compacted(index):
+    index.apply_event({"type": "WORKLIST_UPDATE", "updates": [
+        {"patient_id": "low", "risk": "CRITICAL", "assessed_at": "2026-03-05T09:00:00+00:00"}]})
+    index.apply_event({"type": "WORKLIST_UPDATE", "updates": [
+        {"patient_id": "critical", "risk": "LOW", "assessed_at": "2026-03-05T10:00:00+00:00"}]})
+    assert order(index) == ["low", "medium_alert", "high_old", "high_new", "critical"]
+    for hour in range(200):
+        index.apply_event({"type": "WORKLIST_UPDATE", "updates": [
+            {"patient_id": "high_new", "risk": "HIGH", "assessed_at": f"2026-03-06T00:00:{hour % 60:02d}.{hour:03d}+00:00"}]})
+    assert len(index._heaps["doc"]) <= 2 * 5 + 64
+    assert order(index) == ["low", "medium_alert", "high_old", "high_new", "critical"]
+
+
+def test_older_assessment_does_not_overwrite_newer(index):
+    index.apply_event({"type": "WORKLIST_UPDATE", "updates": [
+        {"patient_id": "critical", "risk": "LOW", "assessed_at": "2026-03-02T09:00:00+00:00"}]})
+    assert order(index)[0] == "critical"
+
+
+def test_alert_moves_patient_ahead_of_unalerted(index):
+    index.apply_event({"type": "HIGH_RISK_ALERT", "patient_id": "high_new"})
+    assert order(index)[:4] == ["critical", "high_new", "medium_alert", "high_old"]
+
+
+def test_reseed_drops_unassigned_patients(index):
+    index.load("doc", [row("critical", "CRITICAL", "2026-03-04T09:00:00+00:00")])
+    assert order(index) == ["critical"]
+    assert "low" not in index._patients
+
+
+def test_alerts_during_seed_survive_load(monkeypatch):
+    index = WorklistIndex(reseed_interval=3600)
+    index.load("doc", [row("p1", "HIGH", "2026-03-01T09:00:00+00:00")])
+    index._seeded_at["doc"] = 0.0
+    query_started, release = threading.Event(), threading.Event()
+
+    def fetch(doctor_id):
+        query_started.set()
+        release.wait(5)
+        # The snapshot predates the alert and the assessment below.
+        return [row("p1", "HIGH", "2026-03-01T09:00:00+00:00"), row("p2", "LOW", "2026-03-01T09:00:00+00:00")]
+
+    monkeypatch.setattr(WorklistIndex, "_fetch_assigned", staticmethod(fetch))
+
+    async def scenario():
+        seed = asyncio.create_task(index.top("doc", 10))
+        while not query_started.is_set():
+            await asyncio.sleep(0.01)
+        index.apply_event({"type": "HIGH_RISK_ALERT", "patient_id": "p1"})
+        index.apply_event({"type": "HIGH_RISK_ALERT", "patient_id": "p2"})
+        index.apply_event({"type": "WORKLIST_UPDATE", "updates": [
+            {"patient_id": "p1", "risk": "CRITICAL", "assessed_at": "2026-03-05T09:00:00.5+00:00"}]})
+        release.set()
+        return await seed
+
+    items = asyncio.run(scenario())
+    by_id = {item["patient_id"]: item for item in items}
+    assert by_id["p1"]["pending_alerts"] == 1 and by_id["p1"]["latest_risk"] == "CRITICAL"
+    assert by_id["p2"]["pending_alerts"] == 1
+    assert index._seed_alerts == {}
+
+
+def test_failed_first_seed_returns_none(monkeypatch):
+    index = WorklistIndex(reseed_interval=3600)
+    monkeypatch.setattr(WorklistIndex, "_fetch_assigned", staticmethod(lambda doctor_id: None))
+    assert asyncio.run(index.top("doc", 10)) is None
+
+
+def test_failed_reseed_serves_last_good_order(index, monkeypatch):
+    index._seeded_at["doc"] = -1e9
+    monkeypatch.setattr(WorklistIndex, "_fetch_assigned", staticmethod(lambda doctor_id: None))
+    assert [item["patient_id"] for item in asyncio.run(index.top("doc", 1))] == ["critical"]
+
+
+@pytest.mark.parametrize("value", [
+    "2026-03-04T09:00:00+00:00", "2026-03-04T09:00:00.5+00:00", "2026-03-04T09:00:00.12345+00:00",
+    "2026-03-04T09:00:00.123456Z", "2026-03-04 09:00:00.1+00", "2026-03-04T09:00:00",
+])
+def test_epoch_accepts_postgrest_timestamps(value):
+    assert abs(_epoch(value) - 1772614800.0) < 1.0
+
+
+def test_epoch_rejects_garbage():
+    assert _epoch("yesterday") == 0.0 and _epoch(None) == 0.0